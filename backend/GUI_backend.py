@@ -2,49 +2,61 @@
 
 import subprocess
 import psutil
-import json
 import os
+import sqlite3
 import requests
 from write_report import send_email_with_zip, load_smtp_credentials
 from get_systemID import get_system_id
 from credentials import (
-    VERSION_URL, RELEASES_URL, ACTIVATION_PATH,
-    LOCAL_VERSION_FILE, CONFIG_PATH, WHITELIST_FILE, BLOCKLIST_FILE,
-    WHITELIST_JSON, USER_ID_PATH, SMTP_CREDENTIALS_FILE
+    VERSION_URL, RELEASES_URL,
+    LOCAL_VERSION_FILE, WHITELIST_FILE, BLOCKLIST_FILE,
+    SMTP_CREDENTIALS_FILE
 )
+from settings_store import (get_settings_store, CONFIG, WHITELIST_SITES, BLOCKLIST_SITES,
+                            INSTALLER_WHITELIST, ACTIVATION, USER_INFO)
 
 # === CONFIG HANDLING ===
 def load_config():
-    try:
-        with open(CONFIG_PATH, "r") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        # Return an empty dict if file not found or if it's invalid JSON
-        return {}
+    return get_settings_store().get(CONFIG)
 
 def save_config(config):
-    print("Saving configuration to", CONFIG_PATH)
+    print("Saving configuration to the settings store")
     try:
-        with open(CONFIG_PATH, "w") as f:
-            json.dump(config, f, indent=4)
+        get_settings_store().set(CONFIG, config)
         print("Configuration saved successfully.", config)
-    except IOError as e:
+    except sqlite3.Error as e:
         print(f"Error saving configuration: {e}")
-        raise IOError(f"Failed to save configuration to {CONFIG_PATH}: {e}")
+        raise IOError(f"Failed to save configuration: {e}")
+
+# Enabling one feature of a pair switches the other off
+MUTUALLY_EXCLUSIVE = [("Website Whitelisting", "Website Blocking")]
+
+def toggle_features(features):
+    """
+    Applies {feature: enabled} as one config change: the constraints are checked for the
+    whole batch and the result is committed as a single settings generation, so the
+    activator sees (and applies) one change however many features were toggled.
+    Raises ValueError if the batch enables both features of an exclusive pair.
+    """
+    requested = {feature: bool(enabled) for feature, enabled in features.items()}
+    for first, second in MUTUALLY_EXCLUSIVE:
+        if requested.get(first) and requested.get(second):
+            raise ValueError(f"'{first}' and '{second}' cannot both be enabled")
+
+    # Read-modify-write in one transaction, so concurrent toggles cannot undo each other
+    with get_settings_store().transaction() as tx:
+        config = tx.get(CONFIG)
+        config.update(requested)
+        for first, second in MUTUALLY_EXCLUSIVE:
+            if requested.get(first) and config.get(second):
+                config[second] = False
+            elif requested.get(second) and config.get(first):
+                config[first] = False
+        tx.set(CONFIG, config)
+    return config
 
 def toggle_feature(feature, enabled):
-    config = load_config()
-
-    if feature == "Website Whitelisting" and enabled:
-        if config.get("Website Blocking"):
-            config["Website Blocking"] = False
-    elif feature == "Website Blocking" and enabled:
-        if config.get("Website Whitelisting"):
-            config["Website Whitelisting"] = False
-
-    config[feature] = bool(enabled)
-    save_config(config)
-    return config
+    return toggle_features({feature: enabled})
 
 
 # === MONITORING CONTROL ===
@@ -102,21 +114,16 @@ def is_monitoring_running():
 
 # === ACTIVATION KEY ===
 def load_activation_key():
-    if os.path.exists(ACTIVATION_PATH):
-        try:
-            with open(ACTIVATION_PATH, 'r') as f:
-                data = json.load(f)
-                return data.get("activationKey", "")
-        except:
-            return ""
-    return ""
+    try:
+        return get_settings_store().get(ACTIVATION).get("activationKey", "")
+    except:
+        return ""
 
 def save_activation_key(key):
     system_id = get_system_id()
     data = {"activationKey": key, "systemId": system_id}
     try:
-        with open(ACTIVATION_PATH, 'w') as f:
-            json.dump(data, f, indent=2)
+        get_settings_store().set(ACTIVATION, data)
         return True
     except Exception as e:
         print(f"Error saving activation key: {e}")
@@ -232,83 +239,61 @@ import logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 app_logger = logging.getLogger('api_logger')
 # === WEBSITE WHITELIST / BLOCKLIST ===
+# The routes still name the lists by their old file paths
+SITE_LIST_KEYS = {WHITELIST_FILE: WHITELIST_SITES, BLOCKLIST_FILE: BLOCKLIST_SITES}
+
 def load_sites(file_path):
     try:
-        if not os.path.exists(file_path):
-            with open(file_path, "w") as f:
-                json.dump([], f)
-        with open(file_path, "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        app_logger.error(f"File not found: {file_path}")
-        raise IOError(f"File not found: {file_path}")
-    except json.JSONDecodeError:
-        app_logger.error(f"Error decoding JSON from {file_path}. File might be corrupted.")
-        # Optionally, you could try to back up the corrupted file and start with an empty list
-        raise ValueError(f"Invalid JSON in file: {file_path}")
-    except IOError as e:
-        app_logger.error(f"Permission error or other I/O issue when loading {file_path}: {e}")
-        raise IOError(f"Permission denied or I/O error for {file_path}")
+        return get_settings_store().get(SITE_LIST_KEYS.get(file_path, file_path), [])
+    except sqlite3.Error as e:
+        app_logger.error(f"Settings store error when loading {file_path}: {e}")
+        raise IOError(f"Could not read the site list: {e}")
 
 def save_sites(file_path, sites):
     try:
-        with open(file_path, "w") as f:
-            json.dump(sites, f, indent=4)
-    except IOError as e:
-        app_logger.error(f"Permission error or other I/O issue when saving to {file_path}: {e}")
-        raise IOError(f"Permission denied or I/O error for {file_path}")
+        get_settings_store().set(SITE_LIST_KEYS.get(file_path, file_path), sites)
+    except sqlite3.Error as e:
+        app_logger.error(f"Settings store error when saving {file_path}: {e}")
+        raise IOError(f"Could not save the site list: {e}")
 
-def add_site(file_path, site):
+def _edit_sites(file_path, edit):
     try:
-        sites = load_sites(file_path)
-        if site not in sites:
-            sites.append(site)
-            save_sites(file_path, sites)
+        key = SITE_LIST_KEYS.get(file_path, file_path)
+        with get_settings_store().transaction() as tx:
+            sites = edit(tx.get(key, []))
+            tx.set(key, sites)
         return sites
-    except (IOError, ValueError) as e:
-        raise e # Re-raise exceptions from helper functions
+    except sqlite3.Error as e:
+        app_logger.error(f"Settings store error when updating {file_path}: {e}")
+        raise IOError(f"Could not update the site list: {e}")
+
+def add_site(file_path, site):
+    return _edit_sites(file_path, lambda sites: sites if site in sites else sites + [site])
 
 def remove_site(file_path, site):
-    try:
-        sites = load_sites(file_path)
-        initial_len = len(sites)
-        sites = [s for s in sites if s != site]
-        if len(sites) < initial_len: # Check if a site was actually removed
-            save_sites(file_path, sites)
-        return sites
-    except (IOError, ValueError) as e:
-        raise e # Re-raise exceptions from helper functions
+    return _edit_sites(file_path, lambda sites: [s for s in sites if s != site])
         
 # === INSTALLER WHITELIST ===
 def load_whitelisted_installers():
-    if os.path.exists(WHITELIST_JSON):
-        with open(WHITELIST_JSON, "r") as f:
-            data = json.load(f)
-            return data.get("WHITELISTED_PROCESSES", [])
-    return []
+    return get_settings_store().get(INSTALLER_WHITELIST)
 
 def add_whitelisted_installer(name):
-    installers = load_whitelisted_installers()
-    if name not in installers:
-        installers.append(name)
-        with open(WHITELIST_JSON, "w") as f:
-            json.dump({"WHITELISTED_PROCESSES": installers}, f, indent=4)
+    with get_settings_store().transaction() as tx:
+        installers = tx.get(INSTALLER_WHITELIST)
+        if name not in installers:
+            installers.append(name)
+            tx.set(INSTALLER_WHITELIST, installers)
     return installers
 
 def remove_whitelisted_installer(name):
-    installers = load_whitelisted_installers()
-    installers = [i for i in installers if i != name]
-    with open(WHITELIST_JSON, "w") as f:
-        json.dump({"WHITELISTED_PROCESSES": installers}, f, indent=4)
+    with get_settings_store().transaction() as tx:
+        installers = [i for i in tx.get(INSTALLER_WHITELIST) if i != name]
+        tx.set(INSTALLER_WHITELIST, installers)
     return installers
 
 # === USER INFO ===
 def load_user_info():
-    if os.path.exists(USER_ID_PATH):
-        with open(USER_ID_PATH, "r") as f:
-            data = json.load(f)
-            return data.get("user", {})
-    return {}
+    return get_settings_store().get(USER_INFO).get("user", {})
 
 def get_system_info():
     print("Gathering system information...")
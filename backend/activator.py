@@ -1,41 +1,42 @@
 # -*- coding: utf-8 -*-
 import os
-import json
 import requests
 import sys
 import ctypes
 import time
 import threading
-import socket
+import multiprocessing
 from datetime import datetime
 
-from credentials import ACTIVATION_PATH, REPORT_DIR
+from credentials import REPORT_DIR
 from main import start_main
 from get_systemID import get_system_id
 from write_report import write_report
+from event_journal import journal_event
+from connectivity import wait_until_connected
+from outbox import start_outbox_drainer
+from settings_store import get_settings_store, ACTIVATION
 
 # API_URL = "https://api-keygen.obzentechnolabs.com/api/sadmin/check-activation"
 API_URL = "https://cubiview.onrender.com/api/sadmin/check-activation"
 HEALTH_LOG_FILE = os.path.join(REPORT_DIR, "health.log")
 
 def is_activated():
-    if not os.path.exists(ACTIVATION_PATH):
-        return False
     try:
-        with open(ACTIVATION_PATH, 'r') as f:
-            data = json.load(f)
+        data = get_settings_store().get(ACTIVATION)
     except Exception as e:
-        print("[!] Failed to load activation file:", e)
+        print("[!] Failed to load activation data:", e)
+        return False
+    if not data:
         return False
 
     system_id = get_system_id()
     data["systemId"] = system_id
 
     try:
-        with open(ACTIVATION_PATH, 'w') as f:
-            json.dump(data, f, indent=4)
+        get_settings_store().set(ACTIVATION, data)
     except Exception as e:
-        print("[!] Failed to update activation file:", e)
+        print("[!] Failed to update activation data:", e)
 
     payload = {
         "systemId": system_id,
@@ -70,6 +71,9 @@ def run_as_admin():
 def run_start_main_forever():
     print("[+] Starting monitoring in background...")
 
+    # Delivers queued report e-mails/uploads, including ones left over from earlier runs
+    start_outbox_drainer()
+
     # Start monitoring in thread
     t = threading.Thread(target=start_main, daemon=False)
     t.start()
@@ -79,31 +83,25 @@ def run_start_main_forever():
         while True:
             # write_health_log("Monitoring alive for debugging")
             write_report(REPORT_DIR, "health_log", f"Monitoring alive at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", title="Health Log", with_timestamp=True)
+            journal_event("health", message="alive")
             time.sleep(60)
     except Exception as e:
         print("[!] Unexpected exception in health loop:", e)
         # write_health_log(f"Unexpected exception: {e}")
         write_report(REPORT_DIR, "health_log", f"Unexpected exception: {e} at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", title="Health Log", with_timestamp=True)
+        journal_event("health", message=f"Unexpected exception: {e}")
 
 
-def is_connected():
-    try:
-        # Try to resolve a DNS (like Google)
-        socket.create_connection(("8.8.8.8", 53), timeout=3)
-        return True
-    except OSError:
-        return False
-
 if __name__ == "__main__":
+    # Report generation uses a process pool; frozen (PyInstaller) workers need this first.
+    multiprocessing.freeze_support()
     if not run_as_admin():
         sys.exit()
     # run_start_main_forever()
     # print("[DEBUG] Activation success, starting monitoring...")
             # Wait for internet connection
     print("Checking for internet connection...")
-    while not is_connected():
-        print("No internet connection. Retrying in 5 seconds...")
-        time.sleep(5)
+    wait_until_connected()
     print("Internet connected!")
     if is_activated():
         print("[DEBUG] Activation success, starting monitoring...")
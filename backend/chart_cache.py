@@ -0,0 +1,162 @@
+"""
+File: chart_cache.py
+
+Description:
+------------
+Content-addressed cache for the report charts drawn by html_report.py.
+
+A chart is identified by a hash of its chart type, its input data (top-N lists or
+active/idle totals) and its style parameters. Rendered charts are kept in
+<day dir>/.chart_cache/<key>.<ext>; on a hit the cached file is copied to the output
+path (or left alone when the output already holds that chart), so matplotlib is not
+touched at all. Cache directories of days older than KEEP_DAYS are removed, and each
+day keeps at most MAX_ENTRIES_PER_DAY charts.
+
+Functions Defined:
+------------------
+chart_key()             -> cache key for (chart type, data, style)
+restore_cached_chart()  -> put a cached chart at its output path, if one exists
+store_cached_chart()    -> add a freshly rendered chart to the cache
+evict_chart_caches()    -> drop caches of old days and trim oversized ones
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import threading
+from datetime import datetime, timedelta
+
+CHART_CACHE_DIRNAME = ".chart_cache"
+CHART_CACHE_VERSION = 1    # bump when the rendering code changes its output
+INDEX_FILENAME = "index.json"
+KEEP_DAYS = 7
+MAX_ENTRIES_PER_DAY = 32
+
+_lock = threading.Lock()
+
+
+def chart_key(chart_type, data, style):
+    """Returns a stable hash of everything that affects how a chart looks."""
+    payload = json.dumps([CHART_CACHE_VERSION, chart_type, data, style], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _cache_dir(output_path):
+    return os.path.join(os.path.dirname(output_path), CHART_CACHE_DIRNAME)
+
+
+def _cache_path(output_path, key):
+    return os.path.join(_cache_dir(output_path), f"{key}{os.path.splitext(output_path)[1]}")
+
+
+def _load_index(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, INDEX_FILENAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    except Exception as e:
+        print(f"[WARNING] Could not read chart cache index in {cache_dir}: {e}")
+        return {}
+
+
+def _save_index(cache_dir, index):
+    path = os.path.join(cache_dir, INDEX_FILENAME)
+    try:
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(f"{path}.tmp", path)
+    except Exception as e:
+        print(f"[WARNING] Could not save chart cache index in {cache_dir}: {e}")
+
+
+def restore_cached_chart(output_path, key):
+    """
+    Makes output_path hold the chart cached under key.
+    Returns True on a cache hit, False when the chart has to be rendered.
+    """
+    cached = _cache_path(output_path, key)
+    if not os.path.exists(cached):
+        return False
+
+    with _lock:
+        cache_dir = _cache_dir(output_path)
+        index = _load_index(cache_dir)
+        name = os.path.basename(output_path)
+        try:
+            if index.get(name) != key or not os.path.exists(output_path):
+                shutil.copyfile(cached, output_path)
+                index[name] = key
+                _save_index(cache_dir, index)
+            os.utime(cached)  # keeps recently used entries from being trimmed
+        except OSError as e:
+            print(f"[WARNING] Chart cache hit for {output_path} could not be restored: {e}")
+            return False
+    print(f"[DEBUG] Chart cache hit for {output_path}")
+    return True
+
+
+def store_cached_chart(output_path, key):
+    """Copies a freshly rendered chart into the day's cache under key."""
+    with _lock:
+        cache_dir = _cache_dir(output_path)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            shutil.copyfile(output_path, _cache_path(output_path, key))
+            index = _load_index(cache_dir)
+            index[os.path.basename(output_path)] = key
+            _save_index(cache_dir, index)
+        except OSError as e:
+            print(f"[WARNING] Could not cache chart {output_path}: {e}")
+            return
+        _trim_cache_dir(cache_dir)
+
+
+def _trim_cache_dir(cache_dir, max_entries=MAX_ENTRIES_PER_DAY):
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.is_file() and entry.name != INDEX_FILENAME and not entry.name.endswith(".tmp"):
+            entries.append((entry.stat().st_mtime, entry.path))
+    entries.sort(reverse=True)
+    for _, path in entries[max_entries:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def evict_chart_caches(report_root, keep_days=KEEP_DAYS):
+    """Removes the chart caches of day directories (and their user directories) older than keep_days."""
+    cutoff = datetime.now() - timedelta(days=keep_days)
+    removed = 0
+    try:
+        day_dirs = list(os.scandir(report_root))
+    except FileNotFoundError:
+        return 0
+    for entry in day_dirs:
+        if not entry.is_dir():
+            continue
+        try:
+            day = datetime.strptime(entry.name, "%d-%m-%Y")
+        except ValueError:
+            continue
+        if day >= cutoff:
+            continue
+        # Per-user reports keep their cache in <day>/<user>/.chart_cache
+        cache_dirs = [os.path.join(entry.path, CHART_CACHE_DIRNAME)]
+        try:
+            cache_dirs += [os.path.join(sub.path, CHART_CACHE_DIRNAME) for sub in os.scandir(entry.path)
+                           if sub.is_dir() and sub.name != CHART_CACHE_DIRNAME]
+        except OSError:
+            pass
+        evicted = False
+        for cache_dir in cache_dirs:
+            if os.path.isdir(cache_dir):
+                shutil.rmtree(cache_dir, ignore_errors=True)
+                evicted = True
+        if evicted:
+            removed += 1
+    if removed:
+        print(f"[+] Evicted chart caches for {removed} old report day(s)")
+    return removed
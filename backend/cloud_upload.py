@@ -0,0 +1,384 @@
+"""
+File: cloud_upload.py
+
+Description:
+------------
+Streaming, resumable upload of report archives to the CubiView cloud.
+
+The archive is sent in fixed-size chunks through the resumable upload endpoints:
+
+    POST  /api/device/report/uploads                {systemId, filename, size, sha256}
+          -> {"uploadId", "offset"}                 (an unfinished session for the same
+                                                     file is resumed, not restarted)
+    PUT   /api/device/report/uploads/<id>           one chunk, headers
+          Content-Range: bytes <start>-<end>/<size>  and  X-Chunk-SHA256: <hex>
+          -> {"offset"}                             (409 carries the server's offset)
+    GET   /api/device/report/uploads/<id>           -> {"offset"}
+    POST  /api/device/report/uploads/<id>/complete  -> same response as the legacy upload
+
+After a timeout or connection error the uploader asks the server for the last
+acknowledged offset and continues from there, retrying with exponential backoff and
+jitter. The session (upload id, checksum, offset) is also saved next to the archive
+(<archive>.upload.json), so an upload interrupted by a shutdown resumes on the next
+attempt. At most one chunk is in memory at a time.
+
+Servers without the resumable endpoints (404/405 on create) get the legacy multipart
+POST to /api/device/report, streamed from disk, with the same retry policy.
+
+CUBIVIEW_CLOUD_URL overrides the server (e.g. tools/stub_ingest_server.py).
+
+Functions Defined:
+------------------
+upload_archive() -> upload one archive, returning the cloud response dict
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import hashlib
+import logging
+
+import requests
+
+CLOUD_BASE_URL = os.environ.get("CUBIVIEW_CLOUD_URL", "https://cubiview.onrender.com").rstrip("/")
+LEGACY_UPLOAD_PATH = "/api/device/report"
+RESUMABLE_UPLOAD_PATH = "/api/device/report/uploads"
+SESSION_SUFFIX = ".upload.json"
+
+CHUNK_SIZE = 4 * 1024 * 1024
+READ_SIZE = 256 * 1024
+TIMEOUT = (10, 60)                    # (connect, read) seconds per request
+MAX_RETRIES = 8                       # consecutive failures before giving up
+MAX_UPLOAD_CYCLES = 3                 # send/complete rounds before giving up on a rejected archive
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+HEADERS = {"User-Agent": "CubiView-Client/1.0", "Accept": "application/json"}
+
+cloud_upload_logger = logging.getLogger('cloud_upload_logger')
+
+
+class UploadError(Exception):
+    pass
+
+
+class ResumableUnsupported(Exception):
+    pass
+
+
+class SourceChanged(UploadError):
+    """The archive was replaced or modified while it was being uploaded."""
+
+
+def _backoff(attempt):
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(READ_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _response_json(response):
+    try:
+        return response.json()
+    except ValueError:
+        return response.text
+
+
+class _MultipartFileStream:
+    """
+    File-like multipart/form-data body that streams the file from disk, so requests
+    sends it with a Content-Length instead of building the body in memory.
+    """
+
+    def __init__(self, path, filename, fields, file_field):
+        self.boundary = uuid.uuid4().hex
+        head = b"".join(
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+            for name, value in fields.items()
+        )
+        head += (f'--{self.boundary}\r\nContent-Disposition: form-data; name="{file_field}"; '
+                 f'filename="{filename}"\r\nContent-Type: application/zip\r\n\r\n').encode()
+        self._parts = [head, None, f"\r\n--{self.boundary}--\r\n".encode()]
+        self._path = path
+        self._length = len(head) + os.path.getsize(path) + len(self._parts[2])
+        self._file = None
+        self._index = 0
+        self._buffer = b""
+
+    @property
+    def content_type(self):
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        while True:
+            block = self.read(READ_SIZE)
+            if not block:
+                return
+            yield block
+
+    def read(self, size=-1):
+        size = self._length if size is None or size < 0 else size
+        while len(self._buffer) < size and self._index < len(self._parts):
+            part = self._parts[self._index]
+            if part is not None:
+                self._buffer += part
+                self._index += 1
+                continue
+            if self._file is None:
+                self._file = open(self._path, "rb")
+            block = self._file.read(max(size - len(self._buffer), READ_SIZE))
+            if block:
+                self._buffer += block
+            else:
+                self._file.close()
+                self._index += 1
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def close(self):
+        if self._file and not self._file.closed:
+            self._file.close()
+
+
+class ResumableUploader:
+    def __init__(self, path, system_id, filename=None, base_url=None, chunk_size=CHUNK_SIZE,
+                 max_retries=MAX_RETRIES, session=None, progress=None):
+        """
+        :param filename: Name the server stores the archive under.
+        :param progress: Optional callback(bytes acknowledged, total bytes).
+        """
+        self.path = path
+        self.system_id = system_id
+        self.filename = filename or os.path.basename(path)
+        self.base_url = (base_url or CLOUD_BASE_URL).rstrip("/")
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.http = session or requests.Session()
+        self.progress = progress
+        self.size = os.path.getsize(path)
+        self.source_state = None      # (size, mtime_ns, inode) of the file self.sha256 was computed from
+        self.sha256 = None
+        self.upload_id = None
+        self.offset = 0
+
+    # --- local session state -------------------------------------------------
+
+    def _session_path(self):
+        return self.path + SESSION_SUFFIX
+
+    def _load_session(self):
+        try:
+            with open(self._session_path(), "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get("sha256") == self.sha256 and state.get("size") == self.size and state.get("base_url") == self.base_url:
+            self.upload_id = state.get("upload_id")
+            self.offset = state.get("offset", 0)
+
+    def _save_session(self):
+        state = {"upload_id": self.upload_id, "sha256": self.sha256, "size": self.size,
+                 "offset": self.offset, "base_url": self.base_url}
+        try:
+            with open(self._session_path() + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(self._session_path() + ".tmp", self._session_path())
+        except OSError as e:
+            cloud_upload_logger.warning(f"Could not save upload session for {self.path}: {e}")
+
+    def _clear_session(self):
+        try:
+            os.remove(self._session_path())
+        except FileNotFoundError:
+            pass
+
+    def _file_state(self):
+        st = os.stat(self.path)
+        return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+    def _source_changed(self):
+        try:
+            return self._file_state() != self.source_state
+        except OSError:
+            return True
+
+    # --- protocol ------------------------------------------------------------
+
+    def _url(self, *parts):
+        return "/".join([self.base_url + RESUMABLE_UPLOAD_PATH, *parts])
+
+    def _create(self):
+        response = self.http.post(self._url(), json={
+            "systemId": self.system_id, "filename": self.filename, "size": self.size, "sha256": self.sha256,
+            "uploadId": self.upload_id,
+        }, headers=HEADERS, timeout=TIMEOUT)
+        if response.status_code in (404, 405, 501):
+            raise ResumableUnsupported(f"{response.status_code} from {self._url()}")
+        response.raise_for_status()
+        body = response.json()
+        self.upload_id = body["uploadId"]
+        self.offset = int(body.get("offset", 0))
+        self._save_session()
+
+    def _sync_offset(self):
+        response = self.http.get(self._url(self.upload_id), headers=HEADERS, timeout=TIMEOUT)
+        if response.status_code == 404:
+            # Session expired on the server: start a new one.
+            self.upload_id, self.offset = None, 0
+            self._create()
+            return
+        response.raise_for_status()
+        self.offset = int(response.json().get("offset", 0))
+        self._save_session()
+
+    def _send_chunk(self, f):
+        f.seek(self.offset)
+        chunk = f.read(self.chunk_size)
+        if not chunk:
+            raise SourceChanged(f"{self.path} is shorter than the {self.size} bytes being uploaded")
+        end = self.offset + len(chunk) - 1
+        headers = dict(HEADERS)
+        headers.update({
+            "Content-Type": "application/octet-stream",
+            "Content-Range": f"bytes {self.offset}-{end}/{self.size}",
+            "X-Chunk-SHA256": hashlib.sha256(chunk).hexdigest(),
+        })
+        response = self.http.put(self._url(self.upload_id), data=chunk, headers=headers, timeout=TIMEOUT)
+        if response.status_code == 409:
+            # Server holds a different offset (a chunk was acknowledged but the reply lost).
+            self.offset = int(response.json().get("offset", self.offset))
+        elif response.status_code == 404:
+            self.upload_id, self.offset = None, 0
+            self._create()
+            return
+        else:
+            response.raise_for_status()
+            self.offset = int(response.json().get("offset", end + 1))
+        self._save_session()
+        if self.progress:
+            self.progress(self.offset, self.size)
+
+    def _complete(self):
+        response = self.http.post(self._url(self.upload_id, "complete"), json={"sha256": self.sha256},
+                                  headers=HEADERS, timeout=TIMEOUT)
+        if response.status_code == 409:
+            self.offset = int(response.json().get("offset", 0))
+            self._save_session()
+            return None
+        response.raise_for_status()
+        return _response_json(response)
+
+    def _retrying(self, action, what):
+        """Runs action until it succeeds, backing off on transient errors."""
+        failures = 0
+        while True:
+            try:
+                return action()
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                reason = e
+            except requests.exceptions.HTTPError as e:
+                status = e.response.status_code if e.response is not None else 0
+                if status and status < 500 and status != 429:
+                    raise UploadError(f"{what} rejected with status {status}: {e.response.text[:200]}")
+                reason = e
+            failures += 1
+            if failures > self.max_retries:
+                raise UploadError(f"{what} failed after {self.max_retries} retries: {reason}")
+            delay = _backoff(failures - 1)
+            cloud_upload_logger.warning(f"{what} failed ({reason}); retry {failures}/{self.max_retries} in {delay:.1f}s")
+            time.sleep(delay)
+            if self.upload_id:
+                try:
+                    self._sync_offset()
+                except (requests.exceptions.RequestException, ValueError, KeyError):
+                    pass            # server still unreachable; the next attempt re-syncs through 409
+
+    def _start(self):
+        """Hashes the archive as it is now and creates (or resumes) its upload session."""
+        self.source_state = self._file_state()
+        self.size = self.source_state[0]
+        self.sha256 = file_sha256(self.path)
+        self.upload_id, self.offset = None, 0
+        self._load_session()
+        if self.upload_id:
+            cloud_upload_logger.info(f"Resuming upload {self.upload_id} of {self.path} at byte {self.offset}")
+        self._retrying(self._create, "Creating upload session")
+
+    def upload(self):
+        """
+        Sends the archive and completes the upload. A completion the server rejects
+        (checksum mismatch) is retried at most MAX_UPLOAD_CYCLES times. If the archive
+        changed on disk, the session is dropped and the upload restarts with a fresh
+        checksum instead of resending bytes that can never match.
+        """
+        self._start()
+        for cycle in range(1, MAX_UPLOAD_CYCLES + 1):
+            try:
+                with open(self.path, "rb") as f:
+                    if self._source_changed():
+                        raise SourceChanged(f"{self.path} changed before it was opened")
+                    while self.offset < self.size:
+                        self._retrying(lambda: self._send_chunk(f), f"Chunk at byte {self.offset}")
+                    result = self._retrying(self._complete, "Completing upload")
+                if result is not None:
+                    self._clear_session()
+                    return result
+                if not self._source_changed():
+                    cloud_upload_logger.warning(f"Server reports upload {self.upload_id} incomplete at byte "
+                                                f"{self.offset}; resending ({cycle}/{MAX_UPLOAD_CYCLES})")
+                    continue
+            except SourceChanged as e:
+                cloud_upload_logger.warning(f"{e}")
+            if cycle == MAX_UPLOAD_CYCLES:
+                break
+            cloud_upload_logger.warning(f"{self.path} changed during upload; restarting with a fresh checksum "
+                                        f"({cycle}/{MAX_UPLOAD_CYCLES})")
+            self._clear_session()
+            self._start()
+        self._clear_session()
+        raise UploadError(f"Upload of {self.path} was not accepted after {MAX_UPLOAD_CYCLES} attempts")
+
+    def upload_legacy(self):
+        """Single multipart POST to the legacy endpoint, streamed from disk; restarts from zero on failure."""
+        def post():
+            body = _MultipartFileStream(self.path, self.filename, {"systemId": self.system_id}, "reportZip")
+            try:
+                headers = dict(HEADERS)
+                headers["Content-Type"] = body.content_type
+                response = self.http.post(self.base_url + LEGACY_UPLOAD_PATH, data=body, headers=headers, timeout=TIMEOUT)
+            finally:
+                body.close()
+            response.raise_for_status()
+            return _response_json(response)
+        return self._retrying(post, "Legacy upload")
+
+
+def upload_archive(path, system_id, filename=None, base_url=None, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Uploads an archive with the resumable protocol, falling back to the legacy
+    multipart endpoint. Returns {"success", "message", "response", "resumable"}.
+    """
+    uploader = ResumableUploader(path, system_id, filename, base_url, chunk_size, progress=progress)
+    try:
+        try:
+            response = uploader.upload()
+            resumable = True
+        except ResumableUnsupported as e:
+            cloud_upload_logger.info(f"Resumable uploads not supported by the server ({e}); using multipart upload")
+            response = uploader.upload_legacy()
+            resumable = False
+    except UploadError as e:
+        return {"success": False, "message": str(e), "resumable": uploader.upload_id is not None}
+    return {"success": True, "message": "Report uploaded successfully to cloud", "response": response,
+            "resumable": resumable}
@@ -0,0 +1,107 @@
+"""
+File: connectivity.py
+
+Description:
+------------
+Network connectivity checks and change notifications.
+
+On Windows a daemon thread blocks in iphlpapi.NotifyAddrChange(), which returns
+whenever the IPv4 address table changes (cable plugged, Wi-Fi joined, VPN up/down),
+so waiters wake on the change itself instead of polling. Elsewhere, or if the call
+is unavailable, the thread polls is_connected() and reports transitions.
+
+Functions Defined:
+------------------
+is_connected()             -> True if an outside host is reachable
+wait_for_network_change()  -> block until the network changes (or timeout)
+wait_until_connected()     -> block until is_connected(), waking on network changes
+on_network_change()        -> register a callback run after every change
+"""
+
+import sys
+import socket
+import threading
+
+POLL_INTERVAL = 30          # seconds between checks when change notifications are unavailable
+
+_condition = threading.Condition()
+_generation = 0
+_callbacks = []
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def is_connected():
+    try:
+        # Try to reach a public DNS server (like Google)
+        socket.create_connection(("8.8.8.8", 53), timeout=3).close()
+        return True
+    except OSError:
+        return False
+
+
+def _notify():
+    global _generation
+    with _condition:
+        _generation += 1
+        _condition.notify_all()
+    for callback in list(_callbacks):
+        try:
+            callback()
+        except Exception as e:
+            print(f"[ERROR] Network change callback failed: {e}")
+
+
+def _watch_addr_changes():
+    try:
+        import ctypes
+        notify_addr_change = ctypes.windll.iphlpapi.NotifyAddrChange
+    except (ImportError, AttributeError, OSError):
+        notify_addr_change = None
+
+    if notify_addr_change is not None:
+        while True:
+            # Synchronous form: blocks until the address table changes.
+            if notify_addr_change(None, None) != 0:
+                print("[WARNING] NotifyAddrChange failed; falling back to polling connectivity.")
+                break
+            _notify()
+
+    connected = is_connected()
+    while True:
+        threading.Event().wait(POLL_INTERVAL)
+        now_connected = is_connected()
+        if now_connected != connected:
+            connected = now_connected
+            _notify()
+
+
+def _ensure_watcher():
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = threading.Thread(target=_watch_addr_changes, name="NetworkWatcher", daemon=True)
+            _watcher.start()
+
+
+def on_network_change(callback):
+    _ensure_watcher()
+    _callbacks.append(callback)
+
+
+def wait_for_network_change(timeout=None):
+    """Returns True if the network changed within timeout seconds."""
+    _ensure_watcher()
+    with _condition:
+        start = _generation
+        return _condition.wait_for(lambda: _generation != start, timeout)
+
+
+def wait_until_connected(recheck=60):
+    """
+    Blocks until is_connected(). Re-checks on every network change and at least every
+    `recheck` seconds (a change can precede DHCP/DNS being ready).
+    """
+    while not is_connected():
+        print("No internet connection. Waiting for a network change...")
+        wait_for_network_change(timeout=recheck if sys.platform == "win32" else min(recheck, POLL_INTERVAL))
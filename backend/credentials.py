@@ -46,6 +46,9 @@ BLOCKLIST_FILE = os.path.join(APP_DATA_COMMON_DIR, "blocklist_sites.json")
 WHITELIST_JSON = os.path.join(APP_DATA_COMMON_DIR,"whitelist_installs.json")
 BACKUP_FILE_PATH = os.path.join(APP_DATA_COMMON_DIR,"monitor_config_backup.json")
 SMTP_CREDENTIALS_FILE = os.path.join(APP_DATA_COMMON_DIR, "smtp_credentials.txt")
+# Config, site lists, installer whitelist, lunch backup, activation and user info live here
+# (settings_store.py); the JSON paths above are only read once, to import existing installs.
+SETTINGS_DB_PATH = os.path.join(APP_DATA_COMMON_DIR, "settings.db")
 
 # Read-only assets that are deployed with the application (e.g., images)
 # These can stay relative to BASE_DIR if they are truly static and not written to.
@@ -59,6 +62,10 @@ RELEASES_URL = "https://github.com/Tanya-M-Vattathil/CuBIT_employee_final/main/d
 LOG_DIR = APP_DATA_COMMON_DIR # Reusing the new variable
 REPORT_DIR = os.path.join(LOG_DIR,"Reports")
 
+# Largest e-mail attachment the report packager builds. Gmail's 25 MB limit applies to the
+# encoded message and base64 adds about 35%, so 18 MB of zip is what reliably fits.
+EMAIL_ATTACHMENT_BUDGET = 18 * 1024 * 1024
+
 BLOCKED_EXE = [
     # Generic terms
     "setup", "setup.exe", "setup.msi",
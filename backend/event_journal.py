@@ -0,0 +1,249 @@
+"""
+File: event_journal.py
+
+Description:
+------------
+Structured, append-only event journal kept next to the human-readable .txt reports.
+
+Every tracker and logger that calls write_report() also emits a typed record here.
+Records are JSON Lines in REPORT_DIR/<dd-mm-yyyy>/<user>/events.jsonl and always
+carry:
+
+    v        schema version (SCHEMA_VERSION)
+    ts       epoch seconds when the event was recorded
+    type     record type (see RECORD_TYPES)
+    session  id of the process that wrote the record
+
+Counter records ("activity", "keystrokes", "clicks", ...) are cumulative snapshots of
+an in-memory counter, so a summary keeps only the latest snapshot per
+(session, type, stream) and sums across them. Usage records ("app_usage",
+"browser_usage") are individual window/URL switches and are summed directly.
+
+Functions Defined:
+------------------
+journal_event()         -> queue one record on the background report writer
+read_journal()          -> iterate over the records of a journal file
+fold_journal()          -> add the records after a byte offset to a JournalSummary
+load_journal_summary()  -> aggregate a day directory's journal into a JournalSummary
+"""
+
+import os
+import json
+import time
+from collections import defaultdict
+
+from credentials import REPORT_DIR
+from report_writer import get_report_writer
+
+SCHEMA_VERSION = 1
+JOURNAL_FILENAME = "events.jsonl"
+SESSION_ID = f"{os.getpid()}-{int(time.time())}"
+
+# Counter records: type -> fields holding cumulative values
+SNAPSHOT_TYPES = {
+    "activity": ("active", "idle"),
+    "keystrokes": ("keystrokes", "words"),
+    "clicks": ("clicks",),
+    "mouse_moves": ("moves",),
+    "screenshots": ("total",),
+    "clipboard": ("entries",),
+    "keylogger": ("chars",),
+}
+
+# Everything else is an individual event
+EVENT_TYPES = (
+    "app_usage",          # process, title, duration
+    "browser_usage",      # process, url, duration
+    "install",            # action (allowed/blocked/killed/kill_failed/monitor), process, message
+    "print_job",          # printer, document, user
+    "screen_lock",        # state
+    "location",           # city, region, country, ip
+    "capture",            # kind (audio/video), action (recording/saved/error), file, message
+    "incognito",          # message
+    "chrome_extension",   # message
+    "website_whitelist",  # status, sites
+    "website_blocking",   # status, sites
+    "lunch_restore",      # delay_seconds, features
+    "config_apply",       # events, transitions, latency_ms, timings, errors, not_finished
+    "health",             # message
+)
+
+RECORD_TYPES = tuple(SNAPSHOT_TYPES) + EVENT_TYPES
+
+
+def journal_event(record_type, stream="", **fields):
+    """
+    Queues one typed record for today's journal.
+
+    :param record_type: One of RECORD_TYPES.
+    :param stream: Distinguishes independent counters of the same type within a session
+                   (e.g. a KeystrokeCounter that was re-created after a toggle).
+    :param fields: Record payload; must be JSON serialisable.
+    """
+    record = {"v": SCHEMA_VERSION, "ts": round(time.time(), 3), "type": record_type, "session": SESSION_ID}
+    if stream:
+        record["stream"] = stream
+    record.update(fields)
+    get_report_writer().submit_record(REPORT_DIR, JOURNAL_FILENAME, record)
+
+
+def read_journal(path):
+    """Yields the records of a journal file, skipping torn lines and newer schema versions."""
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # partially written tail, picked up on the next read
+                record = _decode_record(line)
+                if record:
+                    yield record
+    except FileNotFoundError:
+        return
+
+
+def _decode_record(line):
+    try:
+        record = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    if not isinstance(record, dict) or record.get("v", 0) > SCHEMA_VERSION:
+        return None
+    return record
+
+
+def fold_journal(path, summary, offset=0, chunk_size=1 << 20):
+    """
+    Adds every complete record at or after byte `offset` of a journal to `summary`.
+    Returns the offset just past the last complete line, so a torn tail is re-read next time.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        pending = b""
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            data = pending + chunk
+            end = data.rfind(b"\n")
+            if end < 0:
+                pending = data
+                continue
+            for line in data[:end].split(b"\n"):
+                record = _decode_record(line) if line else None
+                if record:
+                    summary.add(record)
+            offset += end + 1
+            pending = data[end + 1:]
+    return offset
+
+
+class JournalSummary:
+    """Mergeable aggregate of journal records for one (date, user) directory."""
+
+    def __init__(self):
+        self.snapshots = {}                 # "session|type|stream" -> [ts, {field: value}]
+        self.app_usage = defaultdict(float)  # "process - title" -> seconds
+        self.url_usage = defaultdict(float)  # "process - url" -> seconds
+        self.counts = defaultdict(int)       # record type (and "install:<action>") -> count
+        self.records = 0
+
+    def add(self, record):
+        record_type = record.get("type")
+        self.records += 1
+        self.counts[record_type] += 1
+
+        if record_type in SNAPSHOT_TYPES:
+            key = f"{record.get('session', '')}|{record_type}|{record.get('stream', '')}"
+            ts = record.get("ts", 0)
+            current = self.snapshots.get(key)
+            if current is None or ts >= current[0]:
+                values = {field: record.get(field, 0) for field in SNAPSHOT_TYPES[record_type]}
+                self.snapshots[key] = [ts, values]
+        elif record_type == "app_usage":
+            process = record.get("process", "")
+            title = record.get("title", "")
+            key = f"{process} - {title}" if title else process
+            self.app_usage[key] += float(record.get("duration", 0))
+        elif record_type == "browser_usage":
+            key = f"{record.get('process', '')} - {record.get('url', '')}"
+            self.url_usage[key] += float(record.get("duration", 0))
+        elif record_type == "install":
+            self.counts[f"install:{record.get('action', '')}"] += 1
+
+    def merge(self, other):
+        """Folds another summary into this one (used for partial and hourly aggregates)."""
+        for key, (ts, values) in other.snapshots.items():
+            current = self.snapshots.get(key)
+            if current is None or ts >= current[0]:
+                self.snapshots[key] = [ts, dict(values)]
+        for key, value in other.app_usage.items():
+            self.app_usage[key] += value
+        for key, value in other.url_usage.items():
+            self.url_usage[key] += value
+        for key, value in other.counts.items():
+            self.counts[key] += value
+        self.records += other.records
+        return self
+
+    def snapshot_total(self, record_type, field):
+        total = 0
+        for key, (_, values) in self.snapshots.items():
+            if key.split("|")[1] == record_type:
+                total += int(values.get(field, 0))
+        return total
+
+    @property
+    def active_time(self):
+        return self.snapshot_total("activity", "active")
+
+    @property
+    def idle_time(self):
+        return self.snapshot_total("activity", "idle")
+
+    @property
+    def total_keystrokes(self):
+        return self.snapshot_total("keystrokes", "keystrokes")
+
+    @property
+    def total_words(self):
+        return self.snapshot_total("keystrokes", "words")
+
+    @property
+    def total_clicks(self):
+        return self.snapshot_total("clicks", "clicks")
+
+    def top_applications(self, top_n=5):
+        return sorted(self.app_usage.items(), key=lambda x: x[1], reverse=True)[:top_n]
+
+    def top_urls(self, top_n=5):
+        return sorted(self.url_usage.items(), key=lambda x: x[1], reverse=True)[:top_n]
+
+    def to_dict(self):
+        return {
+            "v": SCHEMA_VERSION,
+            "snapshots": self.snapshots,
+            "app_usage": dict(self.app_usage),
+            "url_usage": dict(self.url_usage),
+            "counts": dict(self.counts),
+            "records": self.records,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        summary = cls()
+        summary.snapshots = {k: [v[0], dict(v[1])] for k, v in data.get("snapshots", {}).items()}
+        summary.app_usage.update(data.get("app_usage", {}))
+        summary.url_usage.update(data.get("url_usage", {}))
+        summary.counts.update(data.get("counts", {}))
+        summary.records = data.get("records", 0)
+        return summary
+
+
+def load_journal_summary(report_dir):
+    """Aggregates <report_dir>/events.jsonl. Returns None when the day has no journal."""
+    path = os.path.join(report_dir, JOURNAL_FILENAME)
+    if not os.path.exists(path):
+        return None
+    summary = JournalSummary()
+    fold_journal(path, summary)
+    return summary
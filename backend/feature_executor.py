@@ -0,0 +1,183 @@
+"""
+File: feature_executor.py
+
+Description:
+------------
+Runs the enable/disable calls for a config change concurrently instead of one after
+another on the watcher thread.
+
+Most features only start or stop a tracker thread. A few do slow system work: they
+close browsers, rewrite the hosts file and flush DNS, or run netsh and PowerShell.
+Features that touch the same resource are in one group (FEATURE_GROUPS). A group has
+its own single worker, so its transitions run one at a time, in order. Everything else
+runs on a shared pool. Within a change, disables are queued before enables, so
+switching from Website Whitelisting to Website Blocking removes the proxy before the
+hosts file is written.
+
+Each transition has a timeout (FEATURE_TIMEOUTS, default DEFAULT_TIMEOUT) counted
+from when it starts. run() stops waiting for a transition that overruns and reports
+it as "timeout". The call itself cannot be interrupted and finishes in the
+background. Later transitions of its group stay queued behind it, so the group is
+never applied out of order. They are reported as "queued". The group stays marked
+stalled on the executor until the overrunning call returns, so a later run() does not
+wait on it either. A transition that has not started within its timeout of run()
+being called is reported as "queued" as well. How a call that run() gave up on
+eventually ended is in Transition.outcome, and on_done still fires for it.
+
+Functions Defined:
+------------------
+FeatureExecutor.run()  -> apply {feature: enabled} and return one Transition per feature
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+feature_executor_logger = logging.getLogger('feature_executor_logger')
+
+MAX_WORKERS = 8                 # ungrouped transitions running at once
+DEFAULT_TIMEOUT = 30.0          # seconds a transition may run before run() stops waiting for it
+
+# Features that touch the same resource run serially, in order.
+FEATURE_GROUPS = {
+    # Browser policy keys under HKLM\SOFTWARE\Policies and browser restarts
+    "browsers": ["Incognito Mode Blocking", "Chrome Extension Restrictions",
+                 "Download Enable / Disable", "Block print"],
+    # Proxy settings, the hosts file and the DNS cache
+    "web_filter": ["Website Whitelisting", "Website Blocking"],
+    # netsh firewall rules and adapters
+    "network": ["VPN Detection & Blocking"],
+}
+
+FEATURE_TIMEOUTS = {
+    "Incognito Mode Blocking": 60.0,       # closes every browser process (up to 5 s each)
+    "Chrome Extension Restrictions": 60.0,
+    "Website Blocking": 60.0,              # hosts file + ipconfig /flushdns
+    "VPN Detection & Blocking": 60.0,      # netsh per port / adapter
+}
+
+
+class Transition:
+    def __init__(self, feature, enabled, group, timeout):
+        self.feature = feature
+        self.enabled = enabled
+        self.group = group
+        self.timeout = timeout
+        self.status = "queued"     # queued -> running -> ok | error | timeout
+        self.outcome = None        # "ok" | "error" once the call has returned, even after a timeout
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self.started = threading.Event()
+        self.done = threading.Event()
+
+    @property
+    def seconds(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    def to_dict(self):
+        return {"feature": self.feature, "enabled": self.enabled, "group": self.group,
+                "status": self.status, "outcome": self.outcome, "error": self.error,
+                "seconds": round(self.seconds, 3)}
+
+
+class FeatureExecutor:
+    def __init__(self, enable_funcs, disable_funcs, groups=FEATURE_GROUPS, timeouts=FEATURE_TIMEOUTS,
+                 default_timeout=DEFAULT_TIMEOUT, max_workers=MAX_WORKERS):
+        self.enable_funcs = enable_funcs
+        self.disable_funcs = disable_funcs
+        self.group_of = {feature: group for group, features in groups.items() for feature in features}
+        self.timeouts = timeouts
+        self.default_timeout = default_timeout
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="Feature")
+        self.group_executors = {}   # group -> single-worker executor
+        self.stalled = {}           # group -> Transition that overran its timeout and is still running
+        self.lock = threading.Lock()
+
+    def _executor_for(self, group):
+        if not group:
+            return self.pool
+        with self.lock:
+            if group not in self.group_executors:
+                self.group_executors[group] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"Feature-{group}")
+            return self.group_executors[group]
+
+    def _run_one(self, transition, func):
+        status = "error"
+        transition.started_at = time.monotonic()
+        transition.status = "running"
+        transition.started.set()
+        try:
+            func()
+            status = "ok"
+        except Exception as e:
+            status = "error"
+            transition.error = str(e)
+            print(f"[!] Error {'enabling' if transition.enabled else 'disabling'} {transition.feature}: {e}")
+        finally:
+            # Under the lock, so run() cannot mark the group stalled after this returned
+            with self.lock:
+                transition.finished_at = time.monotonic()
+                transition.outcome = status
+                # A transition run() gave up on stays reported as "timeout" (its seconds show the real duration)
+                if transition.status != "timeout":
+                    transition.status = status
+                if self.stalled.get(transition.group) is transition:
+                    del self.stalled[transition.group]
+                transition.done.set()
+        if status == "ok":
+            print(f"{'Enabled' if transition.enabled else 'Disabled'} Function: {transition.feature} "
+                  f"({transition.seconds:.2f} s)")
+
+    def run(self, transitions, on_done=None):
+        """
+        Applies {feature: enabled} and waits until every transition has finished or
+        overrun its timeout. Features without an enable/disable function are skipped.
+
+        :param on_done: Optional callback(transition), called on the worker when a
+                        transition finishes (also after run() returned for a timed-out one).
+        :returns: List of Transition, in the order they were queued.
+        """
+        run_started = time.monotonic()
+        queued = []
+        # Disables first (False sorts before True); sorted() keeps config order otherwise.
+        for feature, enabled in sorted(transitions.items(), key=lambda item: item[1]):
+            func = (self.enable_funcs if enabled else self.disable_funcs).get(feature)
+            if func is None:
+                continue
+            group = self.group_of.get(feature)
+            transition = Transition(feature, enabled, group, self.timeouts.get(feature, self.default_timeout))
+
+            def task(transition=transition, func=func):
+                self._run_one(transition, func)
+                if on_done:
+                    on_done(transition)
+
+            self._executor_for(group).submit(task)
+            queued.append(transition)
+
+        skipped_groups = set()
+        for transition in queued:
+            with self.lock:
+                stalled = transition.group in self.stalled
+            if stalled or transition.group in skipped_groups:
+                continue                  # stays "queued" behind the transition that overran
+            if not transition.started.wait(max(0.0, run_started + transition.timeout - time.monotonic())):
+                print(f"[WARNING] {transition.feature} did not start within {transition.timeout:g} s; it stays queued")
+                if transition.group:
+                    skipped_groups.add(transition.group)
+                continue
+            if not transition.done.wait(max(0.0, transition.timeout - transition.seconds)):
+                with self.lock:
+                    if transition.done.is_set():
+                        continue          # finished just now
+                    transition.status = "timeout"
+                    if transition.group:
+                        self.stalled[transition.group] = transition
+                feature_executor_logger.warning(f"{transition.feature} still running after {transition.timeout:g} s")
+                print(f"[WARNING] {transition.feature} did not finish within {transition.timeout:g} s; "
+                      f"it keeps running in the background")
+        return queued
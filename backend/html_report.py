@@ -1,14 +1,17 @@
 import os
 import re
+import sys
 import json
+import mmap
+import heapq
+from operator import itemgetter
 from datetime import datetime
 from collections import defaultdict
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import numpy as np
 import time
 import math
+import threading
+from html import escape
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import zipfile
 import requests
 import logging
@@ -37,75 +40,119 @@ except ImportError:
     def get_system_id():
         return "unknown"
 
+from rollups import load_day_summary
+from summary_scanner import scan_summary_counters
+from report_packager import package_report
+from cloud_upload import upload_archive
+from outbox import enqueue
+from chart_cache import CHART_CACHE_DIRNAME, chart_key, restore_cached_chart, store_cached_chart, evict_chart_caches
+from svg_charts import render_bar_chart_svg, render_donut_chart_svg
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 html_report_logger = logging.getLogger('html_report_logger')
 
 
-# === Global Variables for Report Data ===
-# These globals are primarily updated by parse_reports and then used by main_html_report
-# to pass specific values to chart generation functions.
-active_time = 0
-idle_time = 0
-total_keystrokes = 0
-total_words = 0
-total_clicks = 0
-application_data = []
-browser_data = []
-
-def extract_value(text, keyword):
-    """Extracts an integer value following a keyword from a string."""
-    match = re.search(rf"{re.escape(keyword)}\D*(\d+)", text)
-    return int(match.group(1)) if match else 0
-
-def parse_reports(current_report_dir):
-    """Parses activity, keystroke, and click reports to update global totals."""
-    global active_time, idle_time, total_keystrokes, total_words, total_clicks
-
-    activity_path = os.path.join(current_report_dir, "activity_report.txt")
-    keystroke_path = os.path.join(current_report_dir, "keystroke_report.txt")
-    click_path = os.path.join(current_report_dir, "mouse_click_report.txt")
-
-    # Reset totals before parsing to avoid accumulation on multiple calls
-    active_time = 0
-    idle_time = 0
-    total_keystrokes = 0
-    total_words = 0
-    total_clicks = 0
-
-    if os.path.exists(activity_path):
-        try:
-            with open(activity_path, "r", encoding="utf-8", errors="ignore") as f:
-                for line in f:
-                    if "Working Time" in line:
-                        active_time += extract_value(line, "Working Time")
-                    elif "Idle Time" in line:
-                        idle_time += extract_value(line, "Idle Time")
-        except Exception as e:
-            print(f"[ERROR] Could not read activity report {activity_path}: {e}")
-    else:
-        print(f"[WARNING] Activity report not found: {activity_path}")
+# Chart backend: "svg" draws the charts inline without extra dependencies,
+# "matplotlib" (opt-in) renders PNG files next to the report.
+CHART_BACKEND = os.environ.get("CUBIVIEW_CHART_BACKEND", "svg").strip().lower()
 
-    if os.path.exists(keystroke_path):
-        try:
-            with open(keystroke_path, "r", encoding="utf-8", errors="ignore") as f:
-                for line in f:
-                    total_keystrokes += extract_value(line, "Total Keystrokes")
-                    total_words += extract_value(line, "Total Words Typed")
-        except Exception as e:
-            print(f"[ERROR] Could not read keystroke report {keystroke_path}: {e}")
-    else:
-        print(f"[WARNING] Keystroke report not found: {keystroke_path}")
+ACTIVITY_LABELS = ['Active Time', 'Idle Time']
+ACTIVITY_COLORS = ['#4CAF50', '#F44336'] # Green for active, Red for idle
 
-    if os.path.exists(click_path):
-        try:
-            with open(click_path, "r", encoding="utf-8", errors="ignore") as f:
-                for line in f:
-                    total_clicks += extract_value(line, "Total Clicks")
-        except Exception as e:
-            print(f"[ERROR] Could not read mouse click report {click_path}: {e}")
-    else:
-        print(f"[WARNING] Mouse click report not found: {click_path}")
+# Upper bound on per-user reports generated in parallel for one day
+MAX_REPORT_WORKERS = 4
+SUMMARY_HTML_NAME = "CubiView_Summary_Report.html"
+EMPTY_PACKAGE_NOTES = {
+    "full": "This report directory was empty at the time of zip creation.",
+    "email": "This email report contains only essential files. No monitoring data was available at the time of creation.",
+}
+# Sub-directories of a day/user directory that never hold a user's reports
+NON_USER_DIRS = {CHART_CACHE_DIRNAME, "Screenshots", "ScreenRecordings", "Videos", "Images", "Recordings"}
+
+# Serialises pyplot, whose state machine is not thread-safe, when contexts run in threads.
+_pyplot_lock = threading.Lock()
+
+
+class ReportContext:
+    """
+    Parsed metrics and output paths for one (date, user) report.
+    Parsing, charting and HTML emission only read and write their own context, so
+    several reports can be generated at once in a thread or process pool.
+    """
+
+    def __init__(self, report_dir, date_str, user=None, top_n=5):
+        self.report_dir = report_dir
+        self.date_str = date_str
+        self.user = user
+        self.top_n = top_n
+
+        self.output_html = os.path.join(report_dir, SUMMARY_HTML_NAME)
+        self.app_bar_path = os.path.join(report_dir, "app_bar.png")
+        self.browser_bar_path = os.path.join(report_dir, "browser_bar.png")
+        self.pie_chart_path = os.path.join(report_dir, "active_idle_pie.png")
+        self.zip_path = os.path.join(report_dir, f"CubiView_Report_{date_str}.zip")
+
+        self.source = None
+        self.parse_timings = {}     # source file -> seconds spent parsing it
+        self.reset_metrics()
+
+    def reset_metrics(self):
+        self.active_time = 0
+        self.idle_time = 0
+        self.total_keystrokes = 0
+        self.total_words = 0
+        self.total_clicks = 0
+        self.application_data = []
+        self.browser_data = []
+
+    @property
+    def has_data(self):
+        return (self.active_time > 0 or self.idle_time > 0 or self.total_keystrokes > 0 or self.total_words > 0 or
+                self.total_clicks > 0 or len(self.application_data) > 0 or len(self.browser_data) > 0)
+
+    @classmethod
+    def for_date(cls, date_str=None, user=None, top_n=5):
+        """Context for REPORT_DIR/<date>[/<user>]; date defaults to today."""
+        date_str = date_str or datetime.now().strftime("%d-%m-%Y")
+        report_dir = os.path.join(REPORT_DIR, date_str, user) if user else os.path.join(REPORT_DIR, date_str)
+        return cls(report_dir, date_str, user, top_n)
+
+def parse_reports(context):
+    """Scans the activity, keystroke, and click reports into the totals of a ReportContext."""
+    totals, timings = scan_summary_counters(context.report_dir)
+    for field, value in totals.items():
+        setattr(context, field, value)
+    context.parse_timings.update(timings)
+    print("[DEBUG] Summary scan timings: " + ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in timings.items()))
+
+def load_report_data(context):
+    """
+    Fills a ReportContext with the metrics of its report directory.
+    Reads the typed event journal when present, merging its hourly rollups and parsing
+    only the bytes appended since; days recorded before the journal existed fall back
+    to scraping the .txt reports. Returns the source used.
+    """
+    context.reset_metrics()
+    current_report_dir = context.report_dir
+
+    summary = load_day_summary(current_report_dir)
+    if summary is None:
+        parse_reports(context)
+        context.application_data = parse_application_report(os.path.join(current_report_dir, "application_report.txt"), context.top_n)
+        context.browser_data = parse_browser_report(os.path.join(current_report_dir, "browser_report.txt"), context.top_n)
+        context.source = "text"
+        return context.source
+
+    context.active_time = summary.active_time
+    context.idle_time = summary.idle_time
+    context.total_keystrokes = summary.total_keystrokes
+    context.total_words = summary.total_words
+    context.total_clicks = summary.total_clicks
+    context.application_data = summary.top_applications(context.top_n)
+    context.browser_data = summary.top_urls(context.top_n)
+    context.source = "journal"
+    return context.source
 
 def read_text_file_if_exists(current_report_dir, filename):
     """Reads content of a text file if it exists, otherwise returns None."""
@@ -133,81 +180,86 @@ def extract_location_details(text):
             result["Country"] = line.strip().split("Country:")[-1].strip()
     return result
 
-def parse_application_report(file_path, top_n=5):
-    """Parses application usage report and returns top N applications by duration."""
-    usage = defaultdict(float)
-    if not os.path.exists(file_path):
-        print(f"[INFO] Application report not found: {file_path}")
-        return []
-
-    try:
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            lines = f.readlines()
-    except Exception as e:
-        print(f"[ERROR] Could not read application report {file_path}: {e}")
-        return []
+# Usage report lines: "Process: <p>, Title: <t>, Duration: <s> seconds" / "Process: <p>, URL: <u>, Duration: ..."
+APP_USAGE_PATTERN = re.compile(r"Process:\s+(.*?),\s+Title:\s+(.*?),\s+Duration:\s+([\d.]+)")
+URL_USAGE_PATTERN = re.compile(r"Process:\s+(.*?),\s+URL:\s+(.*?),\s+Duration:\s+([\d.]+)")
+READ_BUFFER_SIZE = 1 << 20            # read reports in 1 MB chunks
+MMAP_THRESHOLD = 64 * 1024 * 1024     # scan larger reports through mmap instead
 
-    merged_lines = []
+def iter_report_lines(file_path, use_mmap=None):
+    """
+    Yields the lines of a report file without loading it into memory.
+    Files above MMAP_THRESHOLD (or any file with use_mmap=True) are scanned through an
+    mmap-backed byte view and decoded line by line.
+    """
+    if use_mmap is None:
+        use_mmap = os.path.getsize(file_path) >= MMAP_THRESHOLD
+    if use_mmap and os.path.getsize(file_path) > 0:
+        with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for raw in iter(mm.readline, b""):
+                yield raw.decode("utf-8", errors="ignore")
+        return
+    with open(file_path, "r", encoding="utf-8", errors="ignore", buffering=READ_BUFFER_SIZE) as f:
+        yield from f
+
+def iter_usage_lines(lines):
+    """Re-joins usage entries that textwrap split between a 'Process:' line and its 'Duration:' line."""
     temp_line = ""
     for line in lines:
         if "Process:" in line and "Duration:" in line:
-            merged_lines.append(line.strip())
+            yield line.strip()
         elif "Process:" in line:
             temp_line = line.strip()
         elif "Duration:" in line and temp_line:
-            merged_lines.append(f"{temp_line} {line.strip()}")
+            yield f"{temp_line} {line.strip()}"
             temp_line = ""
 
-    pattern = r"Process:\s+(.*?),\s+Title:\s+(.*?),\s+Duration:\s+([\d.]+)"
-    for line in merged_lines:
-        match = re.search(pattern, line)
+def aggregate_usage(file_path, pattern, title_optional=False, use_mmap=None):
+    """
+    Sums durations per "process - title/url" key in one streaming pass.
+    Keys are interned, so memory grows with the number of distinct keys, not lines.
+    """
+    usage = defaultdict(float)
+    search = pattern.search
+    for line in iter_usage_lines(iter_report_lines(file_path, use_mmap)):
+        match = search(line)
         if match:
-            # Clean up process and title to avoid extraneous data (e.g., trailing commas)
+            # Clean up process and title/url to avoid extraneous data (e.g., trailing commas)
             process = match.group(1).strip().split(',')[0].strip()
-            title = match.group(2).strip().split(',')[0].strip()
-            duration = float(match.group(3))
-            key = f"{process} - {title}" if title else process # Use process only if title is empty
-            usage[key] += duration
+            detail = match.group(2).strip().split(',')[0].strip()
+            key = f"{process} - {detail}" if detail or not title_optional else process
+            usage[sys.intern(key)] += float(match.group(3))
+    return usage
 
-    return sorted(usage.items(), key=lambda x: x[1], reverse=True)[:top_n]
+def top_usage(usage, top_n=5):
+    """Top N (key, seconds) pairs, largest first, without sorting every key."""
+    return heapq.nlargest(top_n, usage.items(), key=itemgetter(1))
 
-def parse_browser_report(file_path, top_n=5):
+def parse_application_report(file_path, top_n=5, use_mmap=None):
+    """Parses application usage report and returns top N applications by duration."""
+    if not os.path.exists(file_path):
+        print(f"[INFO] Application report not found: {file_path}")
+        return []
+    try:
+        # Use process only if title is empty
+        usage = aggregate_usage(file_path, APP_USAGE_PATTERN, title_optional=True, use_mmap=use_mmap)
+    except Exception as e:
+        print(f"[ERROR] Could not read application report {file_path}: {e}")
+        return []
+    return top_usage(usage, top_n)
+
+def parse_browser_report(file_path, top_n=5, use_mmap=None):
     """Parses browser usage report and returns top N URLs by duration."""
-    usage = defaultdict(float)
     if not os.path.exists(file_path):
         print(f"[INFO] Browser report not found: {file_path}")
         return []
-
     try:
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            lines = f.readlines()
+        # Keep both process and URL for browser context
+        usage = aggregate_usage(file_path, URL_USAGE_PATTERN, use_mmap=use_mmap)
     except Exception as e:
         print(f"[ERROR] Could not read browser report {file_path}: {e}")
         return []
-
-    merged_lines = []
-    temp_line = ""
-    for line in lines:
-        if "Process:" in line and "Duration:" in line:
-            merged_lines.append(line.strip())
-        elif "Process:" in line:
-            temp_line = line.strip()
-        elif "Duration:" in line and temp_line:
-            merged_lines.append(f"{temp_line} {line.strip()}")
-            temp_line = ""
-
-    pattern = r"Process:\s+(.*?),\s+URL:\s+(.*?),\s+Duration:\s+([\d.]+)"
-    for line in merged_lines:
-        match = re.search(pattern, line)
-        if match:
-            # Clean up process and URL to avoid extraneous data
-            process = match.group(1).strip().split(',')[0].strip()
-            url = match.group(2).strip().split(',')[0].strip()
-            duration = float(match.group(3))
-            key = f"{process} - {url}" # Keep both for browser context
-            usage[key] += duration
-
-    return sorted(usage.items(), key=lambda x: x[1], reverse=True)[:top_n]
+    return top_usage(usage, top_n)
 
 def format_duration(seconds):
     """Formats duration in seconds to Hh Mm Ss string."""
@@ -243,6 +295,31 @@ def make_unique_labels(data, max_length=40):
         result.append(short)
     return result
 
+def _load_pyplot():
+    """Imports matplotlib on first use; only the matplotlib chart backend needs it."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+def get_chart_backend():
+    """Returns the chart backend to use, falling back to SVG when matplotlib is unavailable."""
+    if CHART_BACKEND == "matplotlib":
+        try:
+            _load_pyplot()
+            return "matplotlib"
+        except ImportError as e:
+            print(f"[WARNING] matplotlib chart backend unavailable ({e}). Falling back to SVG charts.")
+    return "svg"
+
+def chart_markup(chart_backend, image_path, svg_markup, alt, width):
+    """Returns the HTML for one chart: inline SVG, an <img> next to the report, or None."""
+    if chart_backend == "svg":
+        return svg_markup or None
+    if os.path.exists(image_path):
+        return f"<img src='{os.path.basename(image_path)}' alt='{alt}' width='{width}'>"
+    return None
+
 def generate_bar_chart(data, output_path, title, label_type="full"):
     """Generates and saves a horizontal bar chart."""
     if not data:
@@ -262,21 +339,29 @@ def generate_bar_chart(data, output_path, title, label_type="full"):
             print(f"[ERROR] Failed to create directory for bar chart {output_dir}: {e}")
             return False
 
-    fig, ax = plt.subplots(figsize=(10, max(5, len(labels) * 0.5))) # Adjust figure size based on number of bars, min 5
-    ax.barh(labels, values, color='skyblue')
-    ax.set_xlabel("Duration (seconds)")
-    ax.set_title(title)
-    ax.invert_yaxis() # Puts the highest value at the top
-    plt.tight_layout()
-    try:
-        plt.savefig(output_path)
-        print(f"[DEBUG] Bar chart generated at: {output_path}")
+    style = {"title": title, "label_type": label_type, "color": "skyblue", "xlabel": "Duration (seconds)"}
+    cache_key = chart_key("bar", data, style)
+    if restore_cached_chart(output_path, cache_key):
         return True
-    except Exception as e:
-        print(f"[ERROR] Could not save bar chart {output_path}: {e}")
-        return False
-    finally:
-        plt.close(fig) # Always close the figure to free up memory
+
+    plt = _load_pyplot()
+    with _pyplot_lock:
+        fig, ax = plt.subplots(figsize=(10, max(5, len(labels) * 0.5))) # Adjust figure size based on number of bars, min 5
+        ax.barh(labels, values, color='skyblue')
+        ax.set_xlabel("Duration (seconds)")
+        ax.set_title(title)
+        ax.invert_yaxis() # Puts the highest value at the top
+        plt.tight_layout()
+        try:
+            plt.savefig(output_path)
+            print(f"[DEBUG] Bar chart generated at: {output_path}")
+        except Exception as e:
+            print(f"[ERROR] Could not save bar chart {output_path}: {e}")
+            return False
+        finally:
+            plt.close(fig) # Always close the figure to free up memory
+    store_cached_chart(output_path, cache_key)
+    return True
 
 def generate_pie_activity_track(current_pie_chart_path, active_time_val, idle_time_val):
     """Generates and saves a pie chart for active vs. idle time."""
@@ -292,9 +377,9 @@ def generate_pie_activity_track(current_pie_chart_path, active_time_val, idle_ti
         print("[INFO] No activity data to generate pie chart (active_time + idle_time is zero).")
         return False
 
-    labels = ['Active Time', 'Idle Time']
+    labels = ACTIVITY_LABELS
     times = [active_time_val, idle_time_val]
-    colors = ['#4CAF50', '#F44336'] # Green for active, Red for idle
+    colors = ACTIVITY_COLORS
 
     # Calculate percentages safely
     total_time = sum(times)
@@ -314,77 +399,85 @@ def generate_pie_activity_track(current_pie_chart_path, active_time_val, idle_ti
             print(f"[ERROR] Failed to create directory for pie chart {output_dir}: {e}")
             return False
 
-    fig, ax = plt.subplots(figsize=(4, 4)) # Use object-oriented interface
-    # wedgeprops=dict(width=0.4) creates a donut chart.
-    wedges, texts = ax.pie(times, labels=None, colors=colors, startangle=140, wedgeprops=dict(width=0.4))
-    ax.axis('equal') # Equal aspect ratio ensures that pie is drawn as a circle.
-
-    # Add text labels manually to avoid overlap
-    bbox_props = dict(boxstyle="square,pad=0.3", fc="w", ec="k", lw=0.72)
-    kw = dict(xycoords='data', textcoords='data', arrowprops=dict(arrowstyle="-"),
-              bbox=bbox_props, zorder=0, va="center")
-
-    for i, p in enumerate(wedges):
-        ang = (p.theta2 - p.theta1)/2. + p.theta1
-        y = np.sin(np.deg2rad(ang))
-        x = np.cos(np.deg2rad(ang))
-
-        # --- FIX for horizontalalignment ---
-        if x > 0:
-            horizontalalignment = "left"
-        elif x < 0:
-            horizontalalignment = "right"
-        else: # x is 0 (vertical line)
-            # You can choose 'center', 'right', or 'left' here based on preference
-            # For donut charts, 'center' might work well or align based on y
-            horizontalalignment = "center" # Default to center for vertical lines
-            # Alternatively, if you want to align based on y for a vertical line:
-            # horizontalalignment = "right" if y > 0 else "left"
-        # --- END FIX ---
-
-        connectionstyle = "angle,angleA=0,angleB={}".format(ang)
-
-        # Check for NaN in coordinates, which can happen with certain data distributions
-        if math.isnan(x) or math.isnan(y):
-            continue # Skip annotating this wedge if coordinates are NaN
-
-        kw["arrowprops"].update({"connectionstyle": connectionstyle})
-        ax.annotate(percentages[i], xy=(x, y), xytext=(1.35*x, 1.35*y),
-                                horizontalalignment=horizontalalignment, **kw)
-
-
-    # Place the summary text below the pie chart
-    plt.figtext(0.5, 0.01, f"{percentages[0]} Active on PC and {percentages[1]} Idle",
-                ha="center", fontsize=10, fontweight='bold', wrap=True)
-
-    plt.tight_layout(rect=[0, 0.1, 1, 1]) # Adjust layout to make space for figtext
-    try:
-        plt.savefig(current_pie_chart_path)
-        print(f"[DEBUG] Pie chart generated at: {current_pie_chart_path}")
+    cache_key = chart_key("donut", times, {"colors": colors, "labels": labels})
+    if restore_cached_chart(current_pie_chart_path, cache_key):
         return True
-    except Exception as e:
-        print(f"[ERROR] Could not save pie chart {current_pie_chart_path}: {e}")
-        return False
-    finally:
-        plt.close(fig) # Always close the figure to free up memory
 
+    plt = _load_pyplot()
+    with _pyplot_lock:
+        fig, ax = plt.subplots(figsize=(4, 4)) # Use object-oriented interface
+        # wedgeprops=dict(width=0.4) creates a donut chart.
+        wedges, texts = ax.pie(times, labels=None, colors=colors, startangle=140, wedgeprops=dict(width=0.4))
+        ax.axis('equal') # Equal aspect ratio ensures that pie is drawn as a circle.
+
+        # Add text labels manually to avoid overlap
+        bbox_props = dict(boxstyle="square,pad=0.3", fc="w", ec="k", lw=0.72)
+        kw = dict(xycoords='data', textcoords='data', arrowprops=dict(arrowstyle="-"),
+                  bbox=bbox_props, zorder=0, va="center")
+
+        for i, p in enumerate(wedges):
+            ang = (p.theta2 - p.theta1)/2. + p.theta1
+            y = math.sin(math.radians(ang))
+            x = math.cos(math.radians(ang))
+
+            # --- FIX for horizontalalignment ---
+            if x > 0:
+                horizontalalignment = "left"
+            elif x < 0:
+                horizontalalignment = "right"
+            else: # x is 0 (vertical line)
+                # You can choose 'center', 'right', or 'left' here based on preference
+                # For donut charts, 'center' might work well or align based on y
+                horizontalalignment = "center" # Default to center for vertical lines
+                # Alternatively, if you want to align based on y for a vertical line:
+                # horizontalalignment = "right" if y > 0 else "left"
+            # --- END FIX ---
+
+            connectionstyle = "angle,angleA=0,angleB={}".format(ang)
+
+            # Check for NaN in coordinates, which can happen with certain data distributions
+            if math.isnan(x) or math.isnan(y):
+                continue # Skip annotating this wedge if coordinates are NaN
+
+            kw["arrowprops"].update({"connectionstyle": connectionstyle})
+            ax.annotate(percentages[i], xy=(x, y), xytext=(1.35*x, 1.35*y),
+                                    horizontalalignment=horizontalalignment, **kw)
+
+
+        # Place the summary text below the pie chart
+        plt.figtext(0.5, 0.01, f"{percentages[0]} Active on PC and {percentages[1]} Idle",
+                    ha="center", fontsize=10, fontweight='bold', wrap=True)
+
+        plt.tight_layout(rect=[0, 0.1, 1, 1]) # Adjust layout to make space for figtext
+        try:
+            plt.savefig(current_pie_chart_path)
+            print(f"[DEBUG] Pie chart generated at: {current_pie_chart_path}")
+        except Exception as e:
+            print(f"[ERROR] Could not save pie chart {current_pie_chart_path}: {e}")
+            return False
+        finally:
+            plt.close(fig) # Always close the figure to free up memory
+    store_cached_chart(current_pie_chart_path, cache_key)
+    return True
+
+
+def generate_html_report(context, chart_backend="svg"):
+    """
+    Generates the main HTML summary report for a ReportContext.
 
-def generate_html_report(current_report_dir, current_output_html, current_app_bar_path, current_browser_bar_path, current_pie_chart_path):
-    """Generates the main HTML summary report."""
+    :param chart_backend: "svg" inlines the charts; "matplotlib" links the PNG files next to the report.
+    """
+    current_report_dir = context.report_dir
+    current_output_html = context.output_html
     now = datetime.now()
     date_time_str = now.strftime('%d-%m-%Y %I:%M %p')
 
     config_data = {}
-    if os.path.exists(CONFIG_PATH):
-        try:
-            with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-                config_data = json.load(f)
-        except json.JSONDecodeError as e:
-            print(f"[ERROR] Error decoding JSON from config file {CONFIG_PATH}: {e}")
-        except Exception as e:
-            print(f"[ERROR] Error reading config file {CONFIG_PATH}: {e}")
-    else:
-        print(f"[WARNING] Configuration file not found at: {CONFIG_PATH}")
+    try:
+        from settings_store import get_settings_store, CONFIG
+        config_data = get_settings_store().get(CONFIG)
+    except Exception as e:
+        print(f"[ERROR] Error reading the feature config from the settings store: {e}")
 
     # Ensure the output directory for the HTML report exists
     output_html_dir = os.path.dirname(current_output_html)
@@ -410,7 +503,7 @@ def generate_html_report(current_report_dir, current_output_html, current_app_ba
                     li {{ margin-bottom: 5px; }}
                     .status-enabled {{ color: green; font-weight: bold; }}
                     .status-disabled {{ color: red; font-weight: bold; }}
-                    img {{ display: block; margin: 10px auto; border: 1px solid #ddd; border-radius: 6px; max-width: 100%; height: auto; }}
+                    img, svg {{ display: block; margin: 10px auto; border: 1px solid #ddd; border-radius: 6px; max-width: 100%; height: auto; background: #fff; }}
                     pre {{ background-color: #eee; padding: 10px; border-radius: 5px; overflow-x: auto; }}
                 </style>
             </head><body>
@@ -438,33 +531,39 @@ def generate_html_report(current_report_dir, current_output_html, current_app_ba
 
             f.write(f"""
             <details open><summary>Activity Summary</summary>
-            <p><b>Active Time:</b> {format_duration(active_time)}</p>
-            <p><b>Idle Time:</b> {format_duration(idle_time)}</p>
+            <p><b>Active Time:</b> {format_duration(context.active_time)}</p>
+            <p><b>Idle Time:</b> {format_duration(context.idle_time)}</p>
             """)
-            # Check if the pie chart file actually exists before embedding
-            if os.path.exists(current_pie_chart_path):
-                # Use a relative path if possible, or 'file:///' for absolute path if needed.
-                # For local viewing, file:/// is generally reliable.
-                f.write(f"<img src='file:///{os.path.abspath(current_pie_chart_path).replace(os.sep, '/')}' alt='Active vs Idle Pie Chart' width='300'>")
+            pie_svg = ""
+            if chart_backend == "svg":
+                pie_svg = render_donut_chart_svg([context.active_time, context.idle_time], ACTIVITY_LABELS, ACTIVITY_COLORS,
+                                                 summary=lambda p: f"{p[0]:.1f}% Active on PC and {p[1]:.1f}% Idle")
+            pie_html = chart_markup(chart_backend, context.pie_chart_path, pie_svg, "Active vs Idle Pie Chart", 300)
+            if pie_html:
+                f.write(pie_html)
             else:
                 f.write("<p><i>No active vs idle chart available.</i></p>")
             f.write("</details>")
 
             f.write(f"""
             <details open><summary>Input Summary</summary>
-            <p><b>Keystrokes:</b> {total_keystrokes}</p>
-            <p><b>Words Typed:</b> {total_words}</p>
-            <p><b>Mouse Clicks:</b> {total_clicks}</p>
+            <p><b>Keystrokes:</b> {context.total_keystrokes}</p>
+            <p><b>Words Typed:</b> {context.total_words}</p>
+            <p><b>Mouse Clicks:</b> {context.total_clicks}</p>
             </details>
 
             <details open><summary>Top Applications</summary><ul>
             """)
-            if application_data:
-                for app, dur in application_data:
+            if context.application_data:
+                for app, dur in context.application_data:
                     f.write(f"<li>{app}: <b>{format_duration(dur)}</b></li>")
-                # Check if the app bar chart file actually exists before embedding
-                if os.path.exists(current_app_bar_path):
-                    f.write(f"</ul><img src='file:///{os.path.abspath(current_app_bar_path).replace(os.sep, '/')}' alt='Top Applications' width='500'>")
+                app_svg = ""
+                if chart_backend == "svg":
+                    app_svg = render_bar_chart_svg(make_unique_labels(context.application_data), [dur for _, dur in context.application_data],
+                                                   "Top 5 Applications", value_format=format_duration)
+                app_html = chart_markup(chart_backend, context.app_bar_path, app_svg, "Top Applications", 500)
+                if app_html:
+                    f.write(f"</ul>{app_html}")
                 else:
                     f.write("<p><i>Top applications bar chart not available.</i></p>")
             else:
@@ -474,12 +573,16 @@ def generate_html_report(current_report_dir, current_output_html, current_app_ba
             f.write(f"""
             <details open><summary>Top URLs</summary><ul>
             """)
-            if browser_data:
-                for url, dur in browser_data:
+            if context.browser_data:
+                for url, dur in context.browser_data:
                     f.write(f"<li>{url}: <b>{format_duration(dur)}</b></li>")
-                # Check if the browser bar chart file actually exists before embedding
-                if os.path.exists(current_browser_bar_path):
-                    f.write(f"</ul><img src='file:///{os.path.abspath(current_browser_bar_path).replace(os.sep, '/')}' alt='Top URLs' width='500'>")
+                browser_svg = ""
+                if chart_backend == "svg":
+                    browser_svg = render_bar_chart_svg(make_unique_labels(context.browser_data), [dur for _, dur in context.browser_data],
+                                                       "Top 5 URLs", value_format=format_duration)
+                browser_html = chart_markup(chart_backend, context.browser_bar_path, browser_svg, "Top URLs", 500)
+                if browser_html:
+                    f.write(f"</ul>{browser_html}")
                 else:
                     f.write("<p><i>Top URLs bar chart not available.</i></p>")
             else:
@@ -514,212 +617,62 @@ def generate_html_report(current_report_dir, current_output_html, current_app_ba
     except Exception as e:
         print(f"[ERROR] Failed to write HTML report {current_output_html}: {e}")
 
-def create_report_zip(report_dir, zip_filename):
+def create_report_zip(report_dir, zip_filename, profile="full"):
     """
-    Creates a zip file containing all files from the report directory.
-    
+    Creates (or incrementally updates) a zip of the report directory.
+
     Args:
         report_dir (str): Path to the report directory to zip
         zip_filename (str): Path where the zip file should be created
-    
+        profile (str): report_packager profile: "full" (everything), "cloud" (dashboard
+            upload, no raw journal) or "email" (lightweight, size-budgeted)
+
     Returns:
         bool: True if zip creation was successful, False otherwise
     """
     try:
-        html_report_logger.info(f"Creating zip file: {zip_filename} from directory: {report_dir}")
-        
+        html_report_logger.info(f"Creating {profile} zip file: {zip_filename} from directory: {report_dir}")
+
         # Check if source directory exists
         if not os.path.exists(report_dir):
             html_report_logger.error(f"Source directory does not exist: {report_dir}")
             return False
-        
-        # Count files to be zipped
-        file_count = 0
-        files_to_zip = []
-        zip_filename_base = os.path.basename(zip_filename)
-        
-        for root, dirs, files in os.walk(report_dir):
-            for file in files:
-                file_path = os.path.join(root, file)
-                # Skip any zip files to avoid recursion
-                if not file.endswith('.zip') and file_path != zip_filename:
-                    files_to_zip.append((file_path, os.path.relpath(file_path, report_dir)))
-                    file_count += 1
-        
-        html_report_logger.info(f"Found {file_count} files to zip")
-        
-        if file_count == 0:
-            html_report_logger.warning(f"No files found in directory {report_dir} to zip")
-            # Create an empty zip file with a note
+
+        package = package_report(report_dir, zip_filename, profile)
+        if not package["members"]:
+            html_report_logger.warning(f"No files found in directory {report_dir} for the {profile} zip")
+            # Create a zip file with a note
             with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                zipf.writestr('README.txt', 'This report directory was empty at the time of zip creation.')
+                zipf.writestr('README.txt', EMPTY_PACKAGE_NOTES.get(profile, EMPTY_PACKAGE_NOTES["full"]))
             return True
-        
-        # Create the zip file
-        with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for file_path, arcname in files_to_zip:
-                try:
-                    zipf.write(file_path, arcname)
-                    file_size = os.path.getsize(file_path)
-                    html_report_logger.info(f"Added to zip: {arcname} ({file_size} bytes)")
-                except Exception as e:
-                    html_report_logger.error(f"Failed to add file {file_path} to zip: {e}")
-                    continue
-        
-        # Verify the zip file was created and has content
-        if os.path.exists(zip_filename):
-            zip_size = os.path.getsize(zip_filename)
-            html_report_logger.info(f"Successfully created zip file: {zip_filename} (Size: {zip_size} bytes)")
-            
-            # Verify zip file integrity
-            try:
-                with zipfile.ZipFile(zip_filename, 'r') as zipf:
-                    zip_contents = zipf.namelist()
-                    html_report_logger.info(f"Zip file contains {len(zip_contents)} files: {zip_contents}")
-                return True
-            except zipfile.BadZipFile:
-                html_report_logger.error(f"Created zip file is corrupted: {zip_filename}")
-                return False
-        else:
-            html_report_logger.error(f"Zip file was not created: {zip_filename}")
-            return False
-        
+
+        html_report_logger.info(
+            f"Zip file {zip_filename} ({profile}) {package['mode']}: {len(package['members'])} files, "
+            f"{len(package['dropped'])} dropped and {len(package['downscaled'])} downscaled for the budget, "
+            f"Size: {package['size']} bytes"
+        )
+        if not package["within_budget"]:
+            html_report_logger.warning(f"Zip file {zip_filename} exceeds its {package['budget']} byte budget")
+        return True
+
     except Exception as e:
         html_report_logger.error(f"Failed to create zip file {zip_filename}: {e}")
         return False
 
 def create_email_report_zip(report_dir, zip_filename):
     """
-    Creates a lightweight zip file containing only essential files for email reports.
-    Excludes screenshots, screen recordings, and other large files.
-    
+    Creates a lightweight zip file for email reports: summary, text reports, charts and
+    small images, without screenshots, recordings or other media, kept under
+    EMAIL_ATTACHMENT_BUDGET.
+
     Args:
         report_dir (str): Path to the report directory to zip
         zip_filename (str): Path where the zip file should be created
-    
+
     Returns:
         bool: True if zip creation was successful, False otherwise
     """
-    try:
-        html_report_logger.info(f"Creating email-optimized zip file: {zip_filename} from directory: {report_dir}")
-        
-        # Check if source directory exists
-        if not os.path.exists(report_dir):
-            html_report_logger.error(f"Source directory does not exist: {report_dir}")
-            return False
-        
-        # Define files to include for email reports (only essential files)
-        essential_files = [
-            'CubiView_Summary_Report.html',  # Main HTML report
-            'app_bar_chart.png',             # Application usage chart
-            'browser_bar_chart.png',         # Browser usage chart  
-            'pie_chart.png',                 # Activity pie chart
-            'activity_report.txt',           # Activity tracking data
-            'application_report.txt',        # Application usage data
-            'browser_report.txt',            # Browser usage data
-            'keystroke_report.txt',          # Keystroke data
-            'mouse_click_report.txt',        # Mouse click data
-            'location_report.txt',           # Location data
-            'capture_report.txt',            # Audio/video capture log
-            'clipboard_report.txt',          # Clipboard activity
-            'install-uninstall.txt',         # Install/uninstall log
-            'keylogger_report.txt',          # Keylogger data
-            'lunch_restore_report.txt',      # Lunch restore activity
-            'print_job_report.txt'           # Print jobs log
-        ]
-        
-        # Folders to exclude completely
-        excluded_folders = [
-            'Screenshots',
-            'ScreenRecordings', 
-            'Videos',
-            'Images',
-            'Recordings'
-        ]
-        
-        files_to_zip = []
-        file_count = 0
-        
-        for root, dirs, files in os.walk(report_dir):
-            # Skip excluded folders
-            relative_root = os.path.relpath(root, report_dir)
-            if any(excluded_folder in relative_root for excluded_folder in excluded_folders):
-                html_report_logger.info(f"Skipping excluded folder: {relative_root}")
-                continue
-                
-            for file in files:
-                file_path = os.path.join(root, file)
-                arcname = os.path.relpath(file_path, report_dir)
-                
-                # Skip zip files and large media files
-                if (file.endswith('.zip') or 
-                    file_path == zip_filename or
-                    file.lower().endswith(('.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv')) or  # Video files
-                    file.lower().endswith(('.wav', '.mp3', '.aac', '.flac', '.ogg')) or        # Audio files
-                    file.lower().endswith(('.bmp', '.tiff', '.raw')) or                       # Large image formats
-                    file.startswith('screenshot_') or                                         # Screenshot files
-                    file.startswith('recording_')):                                          # Recording files
-                    html_report_logger.info(f"Skipping large/media file: {arcname}")
-                    continue
-                
-                # Include essential files or small files (< 5MB)
-                if file in essential_files:
-                    files_to_zip.append((file_path, arcname))
-                    file_count += 1
-                    html_report_logger.info(f"Including essential file: {arcname}")
-                elif file.endswith('.txt') or file.endswith('.html') or file.endswith('.css') or file.endswith('.js'):
-                    # Include all text-based files
-                    files_to_zip.append((file_path, arcname))
-                    file_count += 1
-                    html_report_logger.info(f"Including text file: {arcname}")
-                elif file.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')) and os.path.getsize(file_path) < 5 * 1024 * 1024:  # Images under 5MB
-                    files_to_zip.append((file_path, arcname))
-                    file_count += 1
-                    html_report_logger.info(f"Including small image file: {arcname}")
-                else:
-                    html_report_logger.info(f"Skipping non-essential file: {arcname}")
-        
-        html_report_logger.info(f"Found {file_count} essential files to zip for email")
-        
-        if file_count == 0:
-            html_report_logger.warning(f"No essential files found in directory {report_dir} for email zip")
-            # Create a zip file with a note
-            with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                zipf.writestr('README.txt', 'This email report contains only essential files. No monitoring data was available at the time of creation.')
-            return True
-        
-        # Create the zip file
-        with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for file_path, arcname in files_to_zip:
-                try:
-                    zipf.write(file_path, arcname)
-                    file_size = os.path.getsize(file_path)
-                    html_report_logger.info(f"Added to email zip: {arcname} ({file_size} bytes)")
-                except Exception as e:
-                    html_report_logger.error(f"Failed to add file {file_path} to email zip: {e}")
-                    continue
-        
-        # Verify the zip file was created and has content
-        if os.path.exists(zip_filename):
-            zip_size = os.path.getsize(zip_filename)
-            html_report_logger.info(f"Successfully created email zip file: {zip_filename} (Size: {zip_size} bytes)")
-            
-            # Verify zip file integrity
-            try:
-                with zipfile.ZipFile(zip_filename, 'r') as zipf:
-                    zip_contents = zipf.namelist()
-                    html_report_logger.info(f"Email zip file contains {len(zip_contents)} files: {zip_contents}")
-                return True
-            except zipfile.BadZipFile:
-                html_report_logger.error(f"Created email zip file is corrupted: {zip_filename}")
-                return False
-        else:
-            html_report_logger.error(f"Email zip file was not created: {zip_filename}")
-            return False
-        
-    except Exception as e:
-        html_report_logger.error(f"Failed to create email zip file {zip_filename}: {e}")
-        return False
+    return create_report_zip(report_dir, zip_filename, profile="email")
 
 def upload_report_to_cloud(zip_file_path, system_id):
     """
@@ -743,7 +696,11 @@ def upload_report_to_cloud(zip_file_path, system_id):
         # Verify the file is actually a zip file
         zip_size = os.path.getsize(zip_file_path)
         html_report_logger.info(f"Zip file size: {zip_size} bytes")
-        
+        if zip_size == 0:
+            error_msg = f"Zip file is empty: {zip_file_path}"
+            html_report_logger.error(error_msg)
+            return {"success": False, "message": error_msg}
+
         try:
             with zipfile.ZipFile(zip_file_path, 'r') as zipf:
                 file_list = zipf.namelist()
@@ -753,76 +710,20 @@ def upload_report_to_cloud(zip_file_path, system_id):
             html_report_logger.error(error_msg)
             return {"success": False, "message": error_msg}
         
-        upload_url = "https://cubiview.onrender.com/api/device/report"
-        
-        # Prepare the files and data for upload with proper headers
-        with open(zip_file_path, 'rb') as zip_file:
-            # Read the file content to verify it's not empty
-            zip_content = zip_file.read()
-            if len(zip_content) == 0:
-                error_msg = f"Zip file is empty: {zip_file_path}"
-                html_report_logger.error(error_msg)
-                return {"success": False, "message": error_msg}
-            
-            # Reset file pointer for upload
-            zip_file.seek(0)
-            
-            # Use proper filename with timestamp for uniqueness
-            from datetime import datetime
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"CubiView_Report_{system_id}_{timestamp}.zip"
-            
-            files = {
-                'reportZip': (filename, zip_file, 'application/zip')
-            }
-            data = {
-                'systemId': system_id
-            }
-            
-            # Add proper headers
-            headers = {
-                'User-Agent': 'CubiView-Client/1.0',
-                'Accept': 'application/json'
-            }
-            
-            html_report_logger.info(f"Uploading to {upload_url} with systemId: {system_id}")
-            html_report_logger.info(f"Upload filename: {filename}")
-            html_report_logger.info(f"Upload data size: {len(zip_content)} bytes")
-            
-            # Upload with timeout
-            response = requests.post(
-                upload_url,
-                files=files,
-                data=data,
-                headers=headers,
-                timeout=120  # 2 minute timeout for large files
-            )
-            
-            html_report_logger.info(f"Upload response status: {response.status_code}")
-            html_report_logger.info(f"Upload response headers: {dict(response.headers)}")
-            
-            if response.status_code == 200:
-                try:
-                    response_data = response.json()
-                    html_report_logger.info(f"Upload successful: {response_data}")
-                    return {
-                        "success": True, 
-                        "message": "Report uploaded successfully to cloud",
-                        "response": response_data
-                    }
-                except json.JSONDecodeError:
-                    html_report_logger.info("Upload successful (non-JSON response)")
-                    html_report_logger.info(f"Response text: {response.text[:500]}...")
-                    return {
-                        "success": True, 
-                        "message": "Report uploaded successfully to cloud",
-                        "response": response.text
-                    }
-            else:
-                error_msg = f"Upload failed with status {response.status_code}: {response.text}"
-                html_report_logger.error(error_msg)
-                return {"success": False, "message": error_msg}
-                
+        # Use proper filename with timestamp for uniqueness
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"CubiView_Report_{system_id}_{timestamp}.zip"
+        html_report_logger.info(f"Uploading {filename} ({zip_size} bytes) with systemId: {system_id}")
+
+        # Chunked and resumable: retries with backoff and continues from the last
+        # acknowledged byte instead of starting over
+        result = upload_archive(zip_file_path, system_id, filename=filename)
+        if result["success"]:
+            html_report_logger.info(f"Upload successful: {result['response']}")
+        else:
+            html_report_logger.error(f"Upload failed: {result['message']}")
+        return result
+
     except requests.exceptions.Timeout:
         error_msg = "Upload timeout: Request to cloud server timed out"
         html_report_logger.error(error_msg)
@@ -836,121 +737,312 @@ def upload_report_to_cloud(zip_file_path, system_id):
         html_report_logger.exception(error_msg)
         return {"success": False, "message": error_msg}
 
-def main_html_report():
+def generate_report(context, progress=None, package=True):
     """
-    Main function to orchestrate the generation of the daily HTML report.
-    Resets global report data, creates necessary directories, parses reports,
-    generates charts, generates the HTML report, creates zip file, and uploads to cloud.
-    Returns a dictionary with status, report path, report date, and a new 'has_data' flag.
+    Parses, charts, writes, zips and (optionally) uploads the report described by a
+    ReportContext. Only touches the given context, so it can run concurrently for
+    different (date, user) pairs.
+    Returns a dictionary with status, report path, report date, and a 'has_data' flag.
+
+    :param progress: Optional callback(percent, stage) used by report_jobs to expose progress.
+    :param package: Zip the report directory and upload the zip to the cloud. Per-user
+                    reports of a day skip this; the whole day is packaged once.
     """
-    global application_data, browser_data, active_time, idle_time # Ensure active_time and idle_time are globally accessible for parse_reports
-
-    # Calculate report directory and file paths for the current date
-    date_str = datetime.now().strftime("%d-%m-%Y")
-    report_dir_for_today = os.path.join(REPORT_DIR, date_str)
-    output_html_for_today = os.path.join(report_dir_for_today, "CubiView_Summary_Report.html")
+    def report_progress(percent, stage):
+        if progress:
+            progress(percent, stage)
 
-    app_bar_path = os.path.join(report_dir_for_today, "app_bar.png")
-    browser_bar_path = os.path.join(report_dir_for_today, "browser_bar.png")
-    pie_chart_path = os.path.join(report_dir_for_today, "active_idle_pie.png")
-    
-    # Zip file path
-    zip_file_path = os.path.join(report_dir_for_today, f"CubiView_Report_{date_str}.zip")
-
-    try:
-        os.makedirs(report_dir_for_today, exist_ok=True)
-        print(f"[DEBUG] Ensured report directory exists: {report_dir_for_today}")
-    except OSError as e:
-        print(f"[ERROR] Failed to create report directory {report_dir_for_today}: {e}")
+    def error_result(message, cloud_message):
         return {
             "status": "error",
-            "message": f"Failed to create report directory: {e}",
+            "message": message,
             "html_path": None,
-            "report_date": date_str,
+            "report_date": context.date_str,
+            "user": context.user,
             "has_data": False,
             "zip_path": None,
-            "cloud_upload": {"success": False, "message": "Report directory creation failed"}
+            "cloud_upload": {"success": False, "message": cloud_message}
         }
 
     try:
-        parse_reports(report_dir_for_today)
-        print(f"[DEBUG] Parsed general activity. Active: {active_time}s, Idle: {idle_time}s, Keystrokes: {total_keystrokes}")
+        os.makedirs(context.report_dir, exist_ok=True)
+        print(f"[DEBUG] Ensured report directory exists: {context.report_dir}")
+    except OSError as e:
+        print(f"[ERROR] Failed to create report directory {context.report_dir}: {e}")
+        return error_result(f"Failed to create report directory: {e}", "Report directory creation failed")
 
-        application_data[:] = parse_application_report(os.path.join(report_dir_for_today, "application_report.txt"))
-        browser_data[:] = parse_browser_report(os.path.join(report_dir_for_today, "browser_report.txt"))
-        print(f"[DEBUG] Parsed application data ({len(application_data)} entries) and browser data ({len(browser_data)} entries).")
+    try:
+        report_progress(10, "Parsing reports")
+        source = load_report_data(context)
+        print(f"[DEBUG] Parsed general activity from {source}. Active: {context.active_time}s, Idle: {context.idle_time}s, Keystrokes: {context.total_keystrokes}")
+        print(f"[DEBUG] Parsed application data ({len(context.application_data)} entries) and browser data ({len(context.browser_data)} entries).")
     except Exception as e:
         print(f"[ERROR] Failed to parse reports: {e}")
-        return {
-            "status": "error",
-            "message": f"Failed to parse reports: {e}",
-            "html_path": None,
-            "report_date": date_str,
-            "has_data": False,
-            "zip_path": None,
-            "cloud_upload": {"success": False, "message": "Report parsing failed"}
-        }
-
-    # Determine if any meaningful data was found
-    has_data = (active_time > 0 or idle_time > 0 or total_keystrokes > 0 or total_words > 0 or total_clicks > 0 or
-                len(application_data) > 0 or len(browser_data) > 0)
+        return error_result(f"Failed to parse reports: {e}", "Report parsing failed")
 
     try:
-        # Pass the actual active_time and idle_time values to the pie chart function
-        bar_app_generated = generate_bar_chart(application_data, app_bar_path, "Top 5 Applications", label_type="title")
-        bar_browser_generated = generate_bar_chart(browser_data, browser_bar_path, "Top 5 URLs", label_type="url")
-        pie_chart_generated = generate_pie_activity_track(pie_chart_path, active_time, idle_time)
-
-        generate_html_report(report_dir_for_today, output_html_for_today, app_bar_path, browser_bar_path, pie_chart_path)
+        report_progress(35, "Generating charts")
+        chart_backend = get_chart_backend()
+        if chart_backend == "matplotlib":
+            evict_chart_caches(REPORT_DIR)
+            generate_bar_chart(context.application_data, context.app_bar_path, "Top 5 Applications", label_type="title")
+            generate_bar_chart(context.browser_data, context.browser_bar_path, "Top 5 URLs", label_type="url")
+            generate_pie_activity_track(context.pie_chart_path, context.active_time, context.idle_time)
+
+        report_progress(60, "Writing HTML report")
+        generate_html_report(context, chart_backend)
+
+        if not package:
+            return {
+                "status": "success",
+                "message": "Report generation process completed.",
+                "html_path": context.output_html,
+                "report_date": context.date_str,
+                "user": context.user,
+                "has_data": context.has_data,
+                "metrics": report_metrics(context),
+                "parse_timings": context.parse_timings,
+                "zip_path": None,
+                "cloud_upload": {"success": False, "message": "Not attempted"}
+            }
 
         # Create zip file containing all report files
         html_report_logger.info("Starting zip file creation and cloud upload process...")
-        
-        # Ensure zip file doesn't already exist to avoid conflicts
-        if os.path.exists(zip_file_path):
-            try:
-                os.remove(zip_file_path)
-                html_report_logger.info(f"Removed existing zip file: {zip_file_path}")
-            except Exception as e:
-                html_report_logger.warning(f"Could not remove existing zip file: {e}")
-        
-        zip_success = create_report_zip(report_dir_for_today, zip_file_path)
-        
+        zip_file_path = context.zip_path
+
+        # An existing zip is updated in place: only new or changed files are compressed
+        report_progress(75, "Creating zip archive")
+        zip_success = create_report_zip(context.report_dir, zip_file_path, profile="cloud")
+
         # Upload to cloud if zip creation was successful
-        cloud_upload_result = {"success": False, "message": "Zip creation failed"}
-        if zip_success:
-            try:
-                system_id = get_system_id()
-                html_report_logger.info(f"Uploading report with system ID: {system_id}")
-                cloud_upload_result = upload_report_to_cloud(zip_file_path, system_id)
-                html_report_logger.info(f"Cloud upload result: {cloud_upload_result}")
-            except Exception as e:
-                cloud_upload_result = {"success": False, "message": f"Cloud upload error: {e}"}
-                html_report_logger.error(f"Cloud upload failed: {e}")
-        else:
-            html_report_logger.error("Zip file creation failed, skipping cloud upload")
+        report_progress(90, "Uploading to cloud")
+        cloud_upload_result = upload_report_zip(zip_file_path) if zip_success else {"success": False, "message": "Zip creation failed"}
 
         return {
             "status": "success",
             "message": "Report generation process completed.",
-            "html_path": output_html_for_today,
-            "report_date": date_str,
-            "has_data": has_data,
+            "html_path": context.output_html,
+            "report_date": context.date_str,
+            "user": context.user,
+            "has_data": context.has_data,
+            "metrics": report_metrics(context),
+            "parse_timings": context.parse_timings,
             "zip_path": zip_file_path if zip_success else None,
             "cloud_upload": cloud_upload_result
         }
     except Exception as e:
         print(f"[ERROR] Failed to generate charts or HTML report: {e}")
+        return error_result(f"Failed to generate charts or HTML report: {e}", "Chart/HTML generation failed")
+
+def report_metrics(context):
+    """Plain-dict metrics of a ReportContext, used for the day index page."""
+    return {
+        "active_time": context.active_time,
+        "idle_time": context.idle_time,
+        "total_keystrokes": context.total_keystrokes,
+        "total_words": context.total_words,
+        "total_clicks": context.total_clicks,
+        "top_application": context.application_data[0][0] if context.application_data else None,
+    }
+
+def upload_report_zip(zip_file_path):
+    """
+    Queues a finished report zip for cloud upload and returns at once; the outbox
+    drainer uploads it (retrying while offline). A newer zip at the same path replaces
+    a queued upload that has not started yet.
+    """
+    try:
+        job_id = enqueue("cloud_upload", {"zip_path": os.path.abspath(zip_file_path)},
+                         key=f"cloud_upload:{os.path.abspath(zip_file_path)}")
+        html_report_logger.info(f"Cloud upload of {zip_file_path} queued as job {job_id}")
+        return {"success": True, "queued": True, "job_id": job_id, "message": "Report queued for cloud upload"}
+    except Exception as e:
+        html_report_logger.error(f"Could not queue cloud upload: {e}")
+        return {"success": False, "message": f"Cloud upload error: {e}"}
+
+def discover_report_users(day_dir):
+    """Returns the user sub-directories of a day directory that hold report data."""
+    users = []
+    try:
+        entries = sorted(os.scandir(day_dir), key=lambda e: e.name.lower())
+    except FileNotFoundError:
+        return users
+    for entry in entries:
+        if not entry.is_dir() or entry.name.startswith(".") or entry.name in NON_USER_DIRS:
+            continue
+        try:
+            has_reports = any(f.is_file() and f.name.endswith((".txt", ".jsonl")) for f in os.scandir(entry.path))
+        except OSError:
+            continue
+        if has_reports:
+            users.append(entry.name)
+    return users
+
+def _generate_user_report(date_str, user):
+    """Process pool entry point: generates one user's report for a day without packaging it."""
+    return generate_report(ReportContext.for_date(date_str, user), package=False)
+
+def _run_user_reports(date_str, users, max_workers, on_done):
+    """Generates per-user reports in a bounded process pool, falling back to threads."""
+    results = {}
+    if max_workers <= 1:
+        for user in users:
+            results[user] = _generate_user_report(date_str, user)
+            on_done(user, results[user])
+        return results
+
+    try:
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+    except (OSError, NotImplementedError) as e:
+        print(f"[WARNING] Process pool unavailable ({e}); generating user reports in threads.")
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    try:
+        with executor:
+            futures = {executor.submit(_generate_user_report, date_str, user): user for user in users}
+            for future in as_completed(futures):
+                user = futures[future]
+                try:
+                    results[user] = future.result()
+                except Exception as e:
+                    print(f"[ERROR] Report generation failed for user {user}: {e}")
+                    results[user] = {"status": "error", "message": str(e), "user": user, "has_data": False}
+                on_done(user, results[user])
+    except Exception as e:
+        # A broken pool (e.g. a worker killed at shutdown) must not lose the day's report.
+        print(f"[WARNING] Parallel report generation failed ({e}); finishing remaining users serially.")
+        for user in users:
+            if user not in results or results[user].get("status") != "success":
+                results[user] = _generate_user_report(date_str, user)
+                on_done(user, results[user])
+    return results
+
+def generate_day_index(day_dir, date_str, user_results):
+    """Writes the combined index page linking every user's report for a day."""
+    output_html = os.path.join(day_dir, SUMMARY_HTML_NAME)
+    rows = []
+    for user, result in user_results.items():
+        metrics = result.get("metrics") or {}
+        if result.get("status") == "success":
+            link = f"<a href='{escape(user)}/{SUMMARY_HTML_NAME}'>{escape(user)}</a>"
+        else:
+            link = f"{escape(user)} <span class='status-disabled'>({escape(result.get('message', 'failed'))})</span>"
+        rows.append(
+            f"<tr><td>{link}</td>"
+            f"<td>{format_duration(metrics.get('active_time', 0))}</td>"
+            f"<td>{format_duration(metrics.get('idle_time', 0))}</td>"
+            f"<td>{metrics.get('total_keystrokes', 0)}</td>"
+            f"<td>{metrics.get('total_clicks', 0)}</td>"
+            f"<td>{escape(metrics.get('top_application') or '-')}</td></tr>"
+        )
+
+    with open(output_html, "w", encoding="utf-8") as f:
+        f.write(f"""
+        <html><head>
+            <title>Cubi-View Report - {date_str}</title>
+            <style>
+                body {{ font-family: 'Segoe UI', sans-serif; background-color: #f9f9f9; color: #333; padding: 20px; }}
+                h2 {{ color: #3b3b98; text-align: center; }}
+                table {{ border-collapse: collapse; width: 100%; background: #ffffff; box-shadow: 0 0 8px rgba(0,0,0,0.05); }}
+                th, td {{ padding: 10px 14px; border-bottom: 1px solid #eee; text-align: left; }}
+                th {{ background: #3b3b98; color: #fff; }}
+                .status-disabled {{ color: red; font-weight: bold; }}
+            </style>
+        </head><body>
+        <h2>Cubi-View Daily Report</h2>
+        <p><b>Report date:</b> {date_str} &nbsp; <b>Generated on:</b> {datetime.now().strftime('%d-%m-%Y %I:%M %p')}</p>
+        <table>
+            <tr><th>User</th><th>Active Time</th><th>Idle Time</th><th>Keystrokes</th><th>Mouse Clicks</th><th>Top Application</th></tr>
+            {''.join(rows)}
+        </table>
+        </body></html>
+        """)
+    print(f"[+] Day index report generated at: {output_html}")
+    return output_html
+
+def generate_day_reports(date_str=None, progress=None, max_workers=MAX_REPORT_WORKERS):
+    """
+    Generates a report for every user directory of a day in parallel, writes the
+    combined index page and packages/uploads the whole day once.
+    html_path is the index page when the day has several users (the UI then previews
+    one user at a time with ?user=) and that user's report when it has one.
+    Days written before per-user directories existed are reported as a single report.
+    """
+    def report_progress(percent, stage):
+        if progress:
+            progress(percent, stage)
+
+    date_str = date_str or datetime.now().strftime("%d-%m-%Y")
+    day_dir = os.path.join(REPORT_DIR, date_str)
+    users = discover_report_users(day_dir)
+    if not users:
+        return generate_report(ReportContext.for_date(date_str), progress=progress)
+
+    workers = max(1, min(len(users), max_workers, os.cpu_count() or 1))
+    print(f"[DEBUG] Generating reports for {len(users)} user(s) on {date_str} with {workers} worker(s)")
+    report_progress(10, f"Generating reports for {len(users)} user(s)")
+
+    finished = []
+    def on_done(user, result):
+        finished.append(user)
+        report_progress(10 + int(60 * len(finished) / len(users)), f"Generated report for {user}")
+
+    results = _run_user_reports(date_str, users, workers, on_done)
+    user_results = {user: results[user] for user in users}
+
+    try:
+        report_progress(75, "Writing day index")
+        index_html = generate_day_index(day_dir, date_str, user_results)
+        zip_file_path = os.path.join(day_dir, f"CubiView_Report_{date_str}.zip")
+        report_progress(80, "Creating zip archive")
+        zip_success = create_report_zip(day_dir, zip_file_path, profile="cloud")
+        report_progress(90, "Uploading to cloud")
+        cloud_upload_result = upload_report_zip(zip_file_path) if zip_success else {"success": False, "message": "Zip creation failed"}
+    except Exception as e:
+        print(f"[ERROR] Failed to write day index or package reports for {date_str}: {e}")
         return {
             "status": "error",
-            "message": f"Failed to generate charts or HTML report: {e}",
+            "message": f"Failed to write day index: {e}",
             "html_path": None,
             "report_date": date_str,
+            "user": None,
             "has_data": False,
             "zip_path": None,
-            "cloud_upload": {"success": False, "message": "Chart/HTML generation failed"}
+            "cloud_upload": {"success": False, "message": "Day index generation failed"},
+            "users": user_results
         }
 
+    # The preview injects html_path into the app, where the index's relative per-user links
+    # do not resolve; a single-user day is previewed as that user's report.
+    single_user = users[0] if len(users) == 1 else None
+    return {
+        "status": "success",
+        "message": f"Reports generated for {len(users)} user(s).",
+        "html_path": (user_results[single_user].get("html_path") or index_html) if single_user else index_html,
+        "index_path": index_html,
+        "report_date": date_str,
+        "user": single_user,
+        "has_data": any(r.get("has_data") for r in user_results.values()),
+        "zip_path": zip_file_path if zip_success else None,
+        "cloud_upload": cloud_upload_result,
+        "users": user_results
+    }
+
+def main_html_report(progress=None, date_str=None, user=None):
+    """
+    Main function to orchestrate the generation of the daily HTML report.
+    Without a user, every user directory of the date (today by default) gets its own
+    report, generated in parallel, plus a combined index page; with a user only that
+    user's report is generated. Only the whole-day run zips the day directory and
+    queues it for upload; a single user's report (the preview) is never packaged.
+    Returns a dictionary with status, report path, report date, and a 'has_data' flag.
+
+    :param progress: Optional callback(percent, stage) used by report_jobs to expose progress.
+    """
+    if user:
+        return generate_report(ReportContext.for_date(date_str, user), progress=progress, package=False)
+    return generate_day_reports(date_str, progress=progress)
+
 def refresh_html_report():
     """
     Refreshes the HTML report by calling main_html_report and returns its status and path.
@@ -965,7 +1057,9 @@ def refresh_html_report():
         print(f"[DEBUG] HTML report refreshed successfully. Path: {result['html_path']}")
         if result.get("zip_path") and os.path.exists(result["zip_path"]):
             print(f"[DEBUG] Zip file created successfully. Path: {result['zip_path']}")
-        if result.get("cloud_upload", {}).get("success"):
+        if result.get("cloud_upload", {}).get("queued"):
+            print(f"[DEBUG] Report queued for cloud upload (job {result['cloud_upload'].get('job_id')}).")
+        elif result.get("cloud_upload", {}).get("success"):
             print(f"[DEBUG] Report uploaded to cloud successfully.")
         else:
             print(f"[DEBUG] Cloud upload status: {result.get('cloud_upload', {}).get('message', 'Unknown')}")
@@ -1,14 +1,11 @@
-import time
-import threading
-
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
-import threading
 import json
 import time
-import os
+import hashlib
+import threading
 
-from credentials import CONFIG_PATH
+from settings_store import get_settings_store, CONFIG
+from event_journal import journal_event
+from feature_executor import FeatureExecutor
 from page1_func_part1 import (enable_activity_tracker, disable_activity_tracker,
                                      enable_mouse_movement_tracker,disable_mouse_movement_tracker,
                                      enable_mouse_click_tracker, disable_mouse_click_tracker,
@@ -129,52 +126,140 @@ disable_funcs = {
     "Lunch Break Mode" : disable_lunch_mode_monitor
 }
 
-last_config = {}
+last_config = {}            # feature -> state last applied successfully (a failed transition keeps the old state)
+last_config_hash = None
 running_flags = {}
+apply_lock = threading.Lock()
+applied_lock = threading.Lock()   # guards last_config/last_config_hash; workers fold late results into them
+late_transitions = set()          # transitions an apply stopped waiting for
 
-class ConfigChangeHandler(FileSystemEventHandler):
-    def on_modified(self, event):
-        if event.src_path.endswith(CONFIG_PATH):
-            print("[Watchdog] Config file changed, updating...")
-            apply_config_changes()
+DEBOUNCE_SECONDS = 0.5      # quiet time after the last change before applying
+MAX_DELAY_SECONDS = 2.0     # apply at the latest this long after the first change of a burst
 
-def apply_config_changes():
-    global last_config
+# events: change notifications received; applies: configs applied; noop_skips: bursts
+# whose config hashed the same as the applied one; last_*: the latest apply
+config_watch_stats = {"events": 0, "applies": 0, "noop_skips": 0,
+                      "last_events": 0, "last_transitions": 0, "last_latency_ms": 0.0}
 
-    try:
-        with open(CONFIG_PATH, "r") as f:
-            config = json.load(f)
 
-        for feature, enabled in config.items():
-            was_enabled = last_config.get(feature, False)
+class ConfigWatcher:
+    """Coalesces a burst of config change notifications into one apply_config_changes()."""
 
-            if enabled and not was_enabled and feature in enable_funcs:
-                enable_funcs[feature]()
-                running_flags[feature] = True
-                print("Enabled Function:", feature)
+    def __init__(self, debounce=DEBOUNCE_SECONDS, max_delay=MAX_DELAY_SECONDS):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.lock = threading.Lock()
+        self.timer = None
+        self.pending_events = 0
+        self.first_event_at = None
 
-            elif not enabled and was_enabled and feature in disable_funcs:
-                disable_funcs[feature]()
-                running_flags.pop(feature, None)
-                print("Disabled Function:", feature)
+    def notify(self, changes=None):
+        with self.lock:
+            now = time.monotonic()
+            config_watch_stats["events"] += 1
+            self.pending_events += 1
+            if self.first_event_at is None:
+                self.first_event_at = now
+            if self.timer:
+                self.timer.cancel()
+            delay = max(0.0, min(self.debounce, self.first_event_at + self.max_delay - now))
+            self.timer = threading.Timer(delay, self._fire)
+            self.timer.daemon = True
+            self.timer.start()
 
-        last_config = config
-    except Exception as e:
-        print(f"[!] Error applying config changes: {e}")
+    def _fire(self):
+        with self.lock:
+            events, first_event_at = self.pending_events, self.first_event_at
+            self.pending_events, self.first_event_at, self.timer = 0, None, None
+        if events:
+            apply_config_changes(events=events, first_event_at=first_event_at)
 
-def start_watch_config():
-    event_handler = ConfigChangeHandler()
-    observer = Observer()
-    observer.schedule(event_handler, path=os.path.dirname(os.path.abspath(CONFIG_PATH)), recursive=False)
-    observer.start()
-    print("[+] Watching monitor_config.json for changes...")
 
-    try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        observer.stop()
-    observer.join()
+config_watcher = ConfigWatcher()
+feature_executor = FeatureExecutor(enable_funcs, disable_funcs)
+
+
+def _config_hash(config):
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()
+
+def diff_config(old, new):
+    """{feature: enabled} for each feature whose state differs; a feature removed from the config counts as disabled."""
+    features = list(new) + [feature for feature in old if feature not in new]
+    return {feature: bool(new.get(feature, False)) for feature in features
+            if bool(new.get(feature, False)) != bool(old.get(feature, False))}
+
+def _track_running(transition):
+    """on_done for the feature executor: records a transition that succeeded as applied."""
+    global last_config_hash
+    with applied_lock:
+        late = transition in late_transitions
+        late_transitions.discard(transition)
+        if transition.outcome == "ok":   # also set when a timed-out call finished later
+            if transition.enabled:
+                running_flags[transition.feature] = True
+            else:
+                running_flags.pop(transition.feature, None)
+            last_config[transition.feature] = transition.enabled
+            last_config_hash = _config_hash(last_config)
+    if late:
+        # The config may have moved on while this call was running; compare again.
+        config_watcher.notify()
+
+def dispatch_transitions(transitions):
+    """Runs the transitions on the feature executor (independent features in parallel); returns their Transitions."""
+    return feature_executor.run(transitions, on_done=_track_running)
+
+def apply_config_changes(events=1, first_event_at=None):
+    """Applies the difference between the stored config and the last applied one."""
+    global last_config, last_config_hash
+
+    started_at = first_event_at or time.monotonic()
+    with apply_lock:
+        try:
+            config = get_settings_store().get(CONFIG)
+        except Exception as e:
+            print(f"[!] Error applying config changes: {e}")
+            return
+
+        with applied_lock:
+            config_hash = _config_hash(config)
+            unchanged = config_hash == last_config_hash
+            previous = dict(last_config)
+        if unchanged:
+            config_watch_stats["noop_skips"] += 1
+            print(f"[Settings] Config unchanged after {events} event(s); nothing to apply.")
+            return
+
+        transitions = diff_config(previous, config)
+        results = dispatch_transitions(transitions)
+        with applied_lock:
+            # Only successful transitions count as applied; a failed or unfinished one keeps
+            # its old state, so the next config change tries it again.
+            applied = dict(config)
+            for t in results:
+                if t.outcome != "ok":
+                    applied[t.feature] = bool(previous.get(t.feature, False))
+            last_config = applied
+            last_config_hash = _config_hash(applied)
+            late_transitions.update(t for t in results if not t.done.is_set())
+
+        latency_ms = (time.monotonic() - started_at) * 1000
+        config_watch_stats["applies"] += 1
+        config_watch_stats.update(last_events=events, last_transitions=len(transitions), last_latency_ms=round(latency_ms, 1))
+    timings = {t.feature: round(t.seconds, 3) for t in results}
+    not_finished = [t.feature for t in results if t.status in ("timeout", "queued", "running")]
+    errors = [t.feature for t in results if t.status == "error"]
+    print(f"[Settings] Applied {len(transitions)} feature change(s) from {events} event(s) in {latency_ms:.0f} ms"
+          + (f"; still running: {', '.join(not_finished)}" if not_finished else "")
+          + (f"; failed (retried on the next change): {', '.join(errors)}" if errors else ""))
+    journal_event("config_apply", events=events, transitions=len(transitions), latency_ms=round(latency_ms, 1),
+                  timings=timings, errors=errors, not_finished=not_finished)
+
+def start_watch_config():
+    # The settings store notifies on its watcher thread when the config changes,
+    # whichever process (usually the API server) committed it.
+    get_settings_store().subscribe(config_watcher.notify, keys=[CONFIG])
+    print("[+] Watching the feature config for changes...")
 
 def start_main():
     print("[+] Starting Cubi-View monitoring threads...")
@@ -182,10 +267,15 @@ def start_main():
     schedule_thread.start()
     shutdown_thread.start()
 
-    print("[*] Applying config at startup...")
-    apply_config_changes()   # <-- this ensures features already enabled in config.json start immediately
-
+    # Subscribe first, so a change saved while the startup apply runs is not missed
     print("[*] Monitoring config for feature toggles...")
-    start_watch_config()  # Keep watching for further changes
+    start_watch_config()
 
+    print("[*] Applying config at startup...")
+    apply_config_changes()   # <-- this ensures features already enabled in the config start immediately
 
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        get_settings_store().unsubscribe(config_watcher.notify)
@@ -1,26 +1,23 @@
 import psutil
 import time
-import json
 from datetime import datetime
 import threading
-from credentials import BLOCKED_EXE, REPORT_DIR, WHITELIST_JSON
+from credentials import BLOCKED_EXE, REPORT_DIR
 from write_report import write_report
+from event_journal import journal_event
+from settings_store import get_settings_store, INSTALLER_WHITELIST
 
 
 logged_allowed_processes = set()
 
 # Load whitelisted installers
-def load_whitelisted_processes(json_file=WHITELIST_JSON):
+def load_whitelisted_processes():
     try:
-        with open(json_file, "r") as file:
-            data = json.load(file)
-            return set(proc.lower() for proc in data.get("WHITELISTED_PROCESSES", []))
+        return set(proc.lower() for proc in get_settings_store().get(INSTALLER_WHITELIST))
     except Exception as e:
         print(f"[ERROR] Failed to load whitelist: {e}")
         return set()
 
-WHITELISTED_PROCESSES = load_whitelisted_processes()
-
 def kill_process_tree(pid):
     try:
         parent = psutil.Process(pid)
@@ -40,27 +37,33 @@ def monitor_install_attempts():
             time.sleep(1)
             continue
 
+        # Cached by the settings store, so installers whitelisted from the UI apply on the next sweep
+        whitelisted_processes = load_whitelisted_processes()
         for process in psutil.process_iter(attrs=['pid', 'name']):
             try:
                 process_name = process.info['name'].lower()
                 pid = process.info['pid']
 
                 if any(installer in process_name for installer in BLOCKED_EXE):
-                    if any(white in process_name for white in WHITELISTED_PROCESSES):
+                    if any(white in process_name for white in whitelisted_processes):
                         if process_name not in logged_allowed_processes:
                             write_install_log(f"Installer/Uninstaller allowed (whitelisted): {process_name}")
+                            journal_event("install", action="allowed", process=process_name)
                             logged_allowed_processes.add(process_name)
                         continue  # Skip to next process
 
                     # Block unauthorized installer
                     write_install_log(f"[BLOCKED] Unauthorized installation/uninstallation attempt: {process_name}")
+                    journal_event("install", action="blocked", process=process_name)
                     print(f"[BLOCKED] {process_name} (PID: {pid})")
 
                     success = kill_process_tree(pid)
                     if success:
                         write_install_log(f"[ACTION] {process_name} killed successfully.")
+                        journal_event("install", action="killed", process=process_name)
                     else:
                         write_install_log(f"[ERROR] Failed to kill {process_name}")
+                        journal_event("install", action="kill_failed", process=process_name)
 
                     # Show alert to user
                     show_blocked_alert(process_name)
@@ -89,6 +92,7 @@ def enable_install_uninstall_monitoring():
     monitoring_enabled = True
     write_install_log("") # Blank line
     write_install_log("[MONITOR] Installer monitoring ENABLED")
+    journal_event("install", action="monitor", message="enabled")
 
     if not monitoring_thread_started:
         thread = threading.Thread(target=monitor_install_attempts, daemon=True)
@@ -101,6 +105,7 @@ def disable_install_uninstall_monitoring():
     monitoring_enabled = False
     print("Installer monitoring DISABLED")
     write_install_log("[MONITOR] Installer monitoring DISABLED")
+    journal_event("install", action="monitor", message="disabled")
     write_install_log("") # Blank line
 
 def write_install_log(message):
@@ -2,6 +2,8 @@
 # backend/api.py
 
 import os
+import gzip
+import threading
 from flask import Flask, request, jsonify, send_from_directory, Response
 from flask_cors import CORS
 import requests
@@ -16,7 +18,7 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 app_logger = logging.getLogger('api_logger')
 
 from GUI_backend import (
-    load_config, save_config, toggle_feature, start_monitoring, stop_monitoring,
+    load_config, save_config, toggle_features, start_monitoring, stop_monitoring,
     is_monitoring_running, load_activation_key, save_activation_key,
     get_local_version, get_remote_version, perform_full_update,
     save_smtp_credentials_file, send_test_email, load_sites, add_site, remove_site,
@@ -26,13 +28,16 @@ from GUI_backend import (
 from page2_func_part1 import enable_incognito_blocking, disable_incognito_blocking, block_extensions, unblock_extensions
 from prevent_vpn import (enable_vpn_monitoring, disable_vpn_monitoring, get_pending_vpn_requests, 
                         approve_vpn_access, deny_vpn_access)
-from html_report import main_html_report # Only main_html_report is directly called by API routes
+from report_jobs import get_report_job_manager, InvalidReportUser # Report generation runs as single-flight jobs
+from operations import get_operation_manager, OperationQueueFull # Slow side-effecting routes answer 202 and run in the background
+from settings_store import get_settings_store, USER_INFO
 from credentials import (VERSION_URL, RELEASES_URL, LOGO_IMAGE, ACTIVATION_PATH,
                           WHITELIST_FILE, BLOCKLIST_FILE, WHITELIST_JSON,
                           LOCAL_VERSION_FILE, CONFIG_PATH, USER_ID_PATH, REPORT_DIR)
 print("Importing modules...")
 print(USER_ID_PATH)
 from write_report import send_email_with_zip    
+from outbox import enqueue, outbox_status # Deliveries that fail now are retried from the on-disk outbox
 
 app = Flask(__name__)
 CORS(app, origins=["*"])
@@ -58,14 +63,18 @@ def api_toggle_feature():
         app_logger.error("API: Invalid request data for toggling features.")
         return jsonify({"success": False, "message": "Invalid request data"}), 400
 
-    updated_config = None
-    try:
-        for feature_key, enabled_status in data['features'].items():
-            updated_config = toggle_feature(feature_key, enabled_status)
+    if not isinstance(data['features'], dict):
+        return jsonify({"success": False, "message": "'features' must map feature names to true/false"}), 400
 
+    try:
+        # All features in one transaction: one config generation, one apply in the activator
+        updated_config = toggle_features(data['features'])
         app_logger.info(f"API: Updated config: {updated_config}")
         return jsonify({"success": True, "config": updated_config}), 200
 
+    except ValueError as e:
+        app_logger.warning(f"API: Rejected feature toggle: {e}")
+        return jsonify({"success": False, "message": str(e)}), 400
     except Exception as e:
         app_logger.error(f"API: Error toggling features: {e}")
         return jsonify({"success": False, "message": str(e)}), 500
@@ -103,17 +112,10 @@ def api_login():
             user = res_data["user"]
             token = res_data["token"]
 
-            # Ensure REPORT_DIR exists before writing USER_ID_PATH
-            if not os.path.exists(os.path.dirname(USER_ID_PATH)):
-                os.makedirs(os.path.dirname(USER_ID_PATH), exist_ok=True)
-                app_logger.info(f"Created directory for USER_ID_PATH: {os.path.dirname(USER_ID_PATH)}")
-
-
-            with open(USER_ID_PATH, "w") as f:
-                json.dump({
-                    "user": user,
-                    "token": token
-                }, f, indent=4)
+            get_settings_store().set(USER_INFO, {
+                "user": user,
+                "token": token
+            })
             app_logger.info(f"API: Login successful for {username}, user info saved.")
             return jsonify({
                 "message": "Login successful",
@@ -211,6 +213,10 @@ def api_forgot_password():
 
 @app.route('/api/reports/generate', methods=['POST'])
 def api_generate_report():
+    """
+    Starts (or attaches to) the report job for today and returns its id immediately.
+    Poll /api/reports/jobs/<job_id> for progress and the final result.
+    """
     app_logger.info("API: Received request to generate report...")
     try:
         # Ensure REPORT_DIR exists before generating reports
@@ -222,39 +228,128 @@ def api_generate_report():
                 app_logger.critical(f"Could not create base report directory {REPORT_DIR}: {e}")
                 return jsonify({"status": "error", "message": f"Server error: Could not create report directory: {e}"}), 500
 
-        try:
-            report_status = main_html_report() 
-            if report_status.get("status") != "success":
-                app_logger.error(f"Report generation failed: {report_status.get('message', 'Unknown error')}")
-                return jsonify({"status": "error", "message": report_status.get("message", "Report generation failed.")}), 500
-        except Exception as e:
-            app_logger.exception(f"Error generating report: {e}")
-            return jsonify({"status": "error", "message": f"Server error: {str(e)}"}), 500
-        app_logger.info(f"API: Report generation status: {report_status}")
-        return jsonify(report_status)
+        job = get_report_job_manager().submit(user=request.args.get('user'))
+        app_logger.info(f"API: Report job {job.id} is {job.status}")
+        return jsonify({
+            "status": "accepted",
+            "job_id": job.id,
+            "job_status": job.status,
+            "status_url": f"/api/reports/jobs/{job.id}"
+        }), 202
+    except InvalidReportUser as e:
+        app_logger.warning(f"API: Rejected report request: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
+        app_logger.exception(f"Error starting report job: {e}")
         return jsonify({"status": "error", "message": f"Server error: {str(e)}"}), 500
 
+@app.route('/api/reports/jobs/<job_id>', methods=['GET'])
+def api_report_job_status(job_id):
+    job = get_report_job_manager().get(job_id)
+    if not job:
+        return jsonify({"status": "error", "message": f"Unknown report job: {job_id}"}), 404
+    return jsonify(job.to_dict())
+
+# === BACKGROUND OPERATIONS ===
+def accept_operation(kind, func, *args, resource=None, **kwargs):
+    """Submits slow, side-effecting work to the operation executor and answers 202 with its id."""
+    try:
+        operation = get_operation_manager().submit(kind, func, *args, resource=resource, **kwargs)
+    except OperationQueueFull as e:
+        app_logger.warning(f"API: Refusing {kind} operation: {e}")
+        return jsonify({"success": False, "message": "The server is busy, please try again shortly."}), 503
+    app_logger.info(f"API: {kind} operation {operation.id} is {operation.status}")
+    return jsonify({
+        "status": "accepted",
+        "operation_id": operation.id,
+        "operation_status": operation.status,
+        "status_url": f"/api/operations/{operation.id}"
+    }), 202
+
+@app.route('/api/operations/<operation_id>', methods=['GET'])
+def api_operation_status(operation_id):
+    operation = get_operation_manager().get(operation_id)
+    if not operation:
+        return jsonify({"status": "error", "message": f"Unknown operation: {operation_id}"}), 404
+    return jsonify(operation.to_dict())
+
+def get_latest_report():
+    """Attaches to today's in-flight report job (or reuses the cached one) and waits for its result."""
+    manager = get_report_job_manager()
+    job = manager.submit(user=request.args.get('user'))
+    return manager.wait(job)
+
 @app.route('/api/reports/daily-html', methods=['GET'])
 def api_daily_html_metadata():
     app_logger.info("API: Received request for daily HTML report metadata...")
-    # This route seems to trigger report generation. If it's just for metadata,
-    # it should ideally read existing reports. For now, keeping as is per your code.
-    report_status = main_html_report()
+    # Served from the cached report job unless the day's inputs changed since it ran.
+    try:
+        report_status = get_latest_report()
+    except InvalidReportUser as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     app_logger.info(f"API: Daily HTML report metadata status: {report_status}")
     return jsonify(report_status)
 
+# html path -> (size, mtime_ns, gzip bytes), so a cached preview is compressed once
+_preview_gzip_cache = {}
+_preview_gzip_lock = threading.Lock()
+
+def _gzipped_report(html_path, st):
+    with _preview_gzip_lock:
+        cached = _preview_gzip_cache.get(html_path)
+        if cached and cached[:2] == (st.st_size, st.st_mtime_ns):
+            return cached[2]
+    with open(html_path, 'rb') as f:
+        body = gzip.compress(f.read(), compresslevel=6)
+    with _preview_gzip_lock:
+        _preview_gzip_cache.clear()  # only the latest version of a report is ever requested
+        _preview_gzip_cache[html_path] = (st.st_size, st.st_mtime_ns, body)
+    return body
+
 @app.route('/api/reports/preview', methods=['GET'])
 def api_reports_preview():
+    """
+    Serves the latest report HTML. The report is only regenerated when the inputs in its
+    manifest changed; the response carries an ETag/Last-Modified for conditional GETs
+    (304 when the client copy is current) and is gzip-compressed when accepted.
+    """
     app_logger.info("API: Received request for report HTML preview...")
-    report_result = main_html_report() # This will generate a new report or get the latest one
+    try:
+        report_result = get_latest_report() # Reuses the latest report unless its inputs changed
+    except InvalidReportUser as e:
+        app_logger.warning(f"API: Rejected report preview request: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 400
+    html_path = report_result.get("html_path", "")
 
-    if report_result.get("status") == "success" and os.path.exists(report_result.get("html_path", "")):
+    if report_result.get("status") == "success" and os.path.exists(html_path):
         try:
-            with open(report_result['html_path'], 'r', encoding='utf-8', errors='ignore') as f:
-                html_content = f.read()
-            app_logger.info(f"API: Serving HTML preview from {report_result['html_path']}")
-            return Response(html_content, mimetype='text/html')
+            st = os.stat(html_path)
+            use_gzip = 'gzip' in request.headers.get('Accept-Encoding', '').lower()
+            etag = f"{st.st_size:x}-{st.st_mtime_ns:x}" + ("-gz" if use_gzip else "")
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            else:
+                # If-Modified-Since only counts without If-None-Match; HTTP dates have second precision
+                not_modified = bool(request.if_modified_since) and \
+                    int(st.st_mtime) <= request.if_modified_since.timestamp()
+
+            if not_modified:
+                app_logger.info(f"API: HTML preview not modified ({html_path})")
+                response = Response(status=304)
+            else:
+                if use_gzip:
+                    response = Response(_gzipped_report(html_path, st), mimetype='text/html')
+                    response.headers['Content-Encoding'] = 'gzip'
+                else:
+                    with open(html_path, 'rb') as f:
+                        response = Response(f.read(), mimetype='text/html')
+                app_logger.info(f"API: Serving HTML preview from {html_path}")
+            response.set_etag(etag)
+            response.last_modified = st.st_mtime
+            response.headers['Cache-Control'] = 'no-cache'  # always revalidate, the ETag makes that cheap
+            response.vary.add('Accept-Encoding')
+            return response
         except Exception as e:
             app_logger.exception(f"API: Failed to read HTML report for preview: {e}")
             return jsonify({"status": "error", "message": f"Failed to read report for preview: {e}"}), 500
@@ -360,12 +455,16 @@ def api_remote_version():
     app_logger.info(f"API: Remote version: {version}")
     return jsonify({"remote_version": version})
 
+def run_update(version):
+    updated_files = perform_full_update(version)
+    app_logger.info(f"API: Update to version {version} finished: {updated_files}")
+    return {"updated_files": updated_files}
+
 @app.route('/api/update', methods=['POST'])
 def api_update():
-    version = request.json.get('version')
+    version = (request.get_json(silent=True) or {}).get('version')
     app_logger.info(f"API: Performing update to version: {version}")
-    updated_files = perform_full_update(version)
-    return jsonify({"updated_files": updated_files})
+    return accept_operation("update", run_update, version)
 
 # === SMTP ===
 @app.route('/api/smtp/config', methods=['GET'])
@@ -404,6 +503,16 @@ def api_save_smtp():
         app_logger.error(f"API: Error saving SMTP credentials: {e}")
         return jsonify({"success": False, "message": f"Error saving SMTP settings: {str(e)}"}), 500
 
+def run_send_test_email(data):
+    recipient_email = data.get('recipient_email')
+    # Pass the entire config data to the helper function
+    success, message = send_test_email(data)
+    if success:
+        app_logger.info(f"API: Test email sent successfully to {recipient_email}.")
+    else:
+        app_logger.error(f"API: Failed to send test email to {recipient_email}: {message}")
+    return {"success": success, "message": message}
+
 @app.route('/api/smtp/send-test', methods=['POST'])
 def api_send_test_email():
     data = request.json
@@ -416,184 +525,200 @@ def api_send_test_email():
         app_logger.error(f"API: Missing required fields for test email. Received: {data.keys()}")
         return jsonify({"success": False, "message": "Missing required fields for sending test email."}), 400
 
-    recipient_email = data.get('recipient_email')
-    app_logger.info(f"API: Attempting to send test email to {recipient_email}")
-
-    # Pass the entire config data to the helper function
-    success, message = send_test_email(data)
-    if success:
-        app_logger.info(f"API: Test email sent successfully to {recipient_email}.")
-    else:
-        app_logger.error(f"API: Failed to send test email to {recipient_email}: {message}")
-    return jsonify({"success": success, "message": message})
+    app_logger.info(f"API: Attempting to send test email to {data.get('recipient_email')}")
+    return accept_operation("smtp_test", run_send_test_email, data)
 
 # === REPORTS: SEND VIA EMAIL ===
 @app.route('/api/reports/send_email', methods=['POST'])
 def send_report_email_api():
-    data = request.json
-    recipient_email = data.get('recipient_email')
+    """Sends today's report e-mail zip to one recipient (runs as a background operation)."""
+    data = request.get_json(silent=True) or {}
+    recipient_email = (data.get('recipient_email') or '').strip()
     app_logger.info(f"API: Request to send report email to {recipient_email}")
 
-    if not recipient_email:
-        app_logger.warning("API: Send report email failed: Recipient email is required.")
-        return jsonify({"message": "Recipient email is required."}, 400)
+    if not recipient_email or '@' not in recipient_email:
+        app_logger.warning("API: Send report email failed: a valid recipient email is required.")
+        return jsonify({"success": False, "message": "A valid recipient email is required."}), 400
 
-    try:
-        # Ensure REPORT_DIR exists before generating reports
-        if not os.path.exists(REPORT_DIR):
-            os.makedirs(REPORT_DIR, exist_ok=True)
-            app_logger.info(f"Created base report directory for email send: {REPORT_DIR}")
-
-        report_result = main_html_report() # Generate the report first
-        if report_result['status'] != 'success':
-            app_logger.error(f"API: Failed to generate report before sending email: {report_result['message']}")
-            return jsonify({"message": f"Failed to generate report before sending: {report_result['message']}"}, 500)
-
-        current_output_html = report_result['html_path']
-        current_report_dir = os.path.dirname(current_output_html)
-
-        smtp_config_loaded = get_smtp_credentials_file()
-        if not smtp_config_loaded or not smtp_config_loaded.get('email') or not smtp_config_loaded.get('password'):
-            app_logger.warning("API: SMTP credentials not configured for sending email.")
-            return jsonify({"message": "SMTP credentials not configured. Please set them up in GUI."}, 400)
-
-        success, message = send_email_with_zip(
-            sender_email=smtp_config_loaded.get('email'),
-            sender_password=smtp_config_loaded.get('password'),
-            smtp_server=smtp_config_loaded.get('smtp_server'),
-            smtp_port=smtp_config_loaded.get('smtp_port'),
-            recipient_email=recipient_email,
-            zip_file_path=current_report_dir, # This should be the directory containing the report and its assets
-            html_report_path=current_output_html
-        )
-        if success:
-            app_logger.info(f"API: Report email sent successfully to {recipient_email}.")
-            return jsonify({"message": message})
-        else:
-            app_logger.error(f"API: Failed to send report email to {recipient_email}: {message}")
-            return jsonify({"message": message}, 500)
-    except Exception as e:
-        app_logger.exception(f"API: An error occurred while sending the report email: {e}")
-        return jsonify({"message": f"An error occurred while sending the report email: {str(e)}"}, 500)
+    smtp_config = get_smtp_credentials_file()
+    if not smtp_config or not smtp_config.get('from_email') or not smtp_config.get('password'):
+        app_logger.warning("API: SMTP credentials not configured for sending email.")
+        return jsonify({"success": False, "message": "SMTP credentials not configured. Please set them up in GUI."}), 400
+
+    date_str = datetime.now().strftime("%d-%m-%Y")
+    return accept_operation("report_email", run_send_report_email_to, recipient_email, smtp_config, date_str)
+
+def run_send_report_email_to(recipient_email, smtp_config, date_str):
+    """Generates the day's report (or reuses the cached one), then mails its e-mail zip to recipient_email."""
+    manager = get_report_job_manager()
+    report_result = manager.wait(manager.submit(date_str=date_str))
+    if not report_result or report_result.get('status') != 'success':
+        message = (report_result or {}).get('message', 'Report generation failed.')
+        app_logger.error(f"API: Failed to generate report before sending email: {message}")
+        return {"success": False, "message": f"Failed to generate report before sending: {message}"}
+
+    report_dir = os.path.join(REPORT_DIR, date_str)
+    email_zip_file_path = os.path.join(report_dir, f"CubiView_Report_Email_{date_str}.zip")
+    return run_send_report_email(smtp_config, report_dir, email_zip_file_path, date_str,
+                                 recipient_email=recipient_email, cc_list=[])
 
 # === CLOUD UPLOAD ===
+def run_cloud_upload(report_dir, zip_file_path):
+    """Zips today's report and uploads it; hands it to the outbox if the upload fails."""
+    # Create the zip, or bring an existing one up to date (only new/changed files are compressed)
+    from html_report import create_report_zip
+    if not create_report_zip(report_dir, zip_file_path, profile="cloud"):
+        app_logger.error("API: Failed to create zip file for cloud upload")
+        return {"success": False, "message": "Failed to create zip file"}
+
+    # Upload to cloud
+    from html_report import upload_report_to_cloud
+    system_id = get_system_id()
+    upload_result = upload_report_to_cloud(zip_file_path, system_id)
+
+    app_logger.info(f"API: Cloud upload result: {upload_result}")
+
+    if upload_result.get("success"):
+        return upload_result
+
+    # Not delivered now (offline, server down): hand it to the outbox so it is retried
+    job_id = enqueue("cloud_upload", {"zip_path": os.path.abspath(zip_file_path)},
+                     key=f"cloud_upload:{os.path.abspath(zip_file_path)}")
+    app_logger.warning(f"API: Cloud upload failed ({upload_result.get('message')}); queued as job {job_id}")
+    return {
+        "success": True,
+        "queued": True,
+        "job_id": job_id,
+        "message": f"Upload failed ({upload_result.get('message')}); it has been queued and will be retried automatically.",
+    }
+
 @app.route('/api/reports/upload-cloud', methods=['POST'])
 def api_upload_report_to_cloud():
-    """Manually upload the latest report to cloud"""
+    """Manually upload the latest report to cloud (runs as a background operation)"""
     app_logger.info("API: Received request to upload report to cloud...")
-    try:
-        # Get the latest report information
-        date_str = datetime.now().strftime("%d-%m-%Y")
-        report_dir_for_today = os.path.join(REPORT_DIR, date_str)
-        zip_file_path = os.path.join(report_dir_for_today, f"CubiView_Report_{date_str}.zip")
-        
-        # Check if zip file exists, if not create it
-        if not os.path.exists(zip_file_path):
-            if not os.path.exists(report_dir_for_today):
-                app_logger.error("API: Report directory not found for cloud upload")
-                return jsonify({"success": False, "message": "No report found for today"}), 404
-            
-            # Import the functions from html_report
-            from html_report import create_report_zip
-            if not create_report_zip(report_dir_for_today, zip_file_path):
-                app_logger.error("API: Failed to create zip file for cloud upload")
-                return jsonify({"success": False, "message": "Failed to create zip file"}), 500
-        
-        # Upload to cloud
-        from html_report import upload_report_to_cloud
-        system_id = get_system_id()
-        upload_result = upload_report_to_cloud(zip_file_path, system_id)
-        
-        app_logger.info(f"API: Cloud upload result: {upload_result}")
-        
-        if upload_result.get("success"):
-            return jsonify(upload_result), 200
-        else:
-            return jsonify(upload_result), 500
-            
-    except Exception as e:
-        app_logger.exception(f"API: Error during manual cloud upload: {e}")
-        return jsonify({"success": False, "message": f"Upload error: {str(e)}"}), 500
+    # Get the latest report information
+    date_str = datetime.now().strftime("%d-%m-%Y")
+    report_dir_for_today = os.path.join(REPORT_DIR, date_str)
+    zip_file_path = os.path.join(report_dir_for_today, f"CubiView_Report_{date_str}.zip")
+
+    if not os.path.exists(report_dir_for_today):
+        app_logger.error("API: Report directory not found for cloud upload")
+        return jsonify({"success": False, "message": "No report found for today"}), 404
+
+    return accept_operation("cloud_upload", run_cloud_upload, report_dir_for_today, zip_file_path)
 
 # === SEND REPORT TO SMTP CONFIGURED EMAILS ===
-@app.route('/api/reports/send-to-smtp-emails', methods=['POST'])
-def api_send_report_to_smtp_emails():
-    """Send the latest report zip file to all configured emails in SMTP config"""
-    app_logger.info("API: Received request to send report to SMTP configured emails...")
-    try:
-        # Get SMTP configuration
-        smtp_config = get_smtp_credentials_file()
-        if not smtp_config or not smtp_config.get('from_email') or not smtp_config.get('password'):
-            app_logger.warning("API: SMTP credentials not configured for sending email.")
-            return jsonify({"success": False, "message": "SMTP credentials not configured. Please set them up in SMTP Config page."}), 400
-
-        # Get the latest report information
-        date_str = datetime.now().strftime("%d-%m-%Y")
-        report_dir_for_today = os.path.join(REPORT_DIR, date_str)
-        # Create email-specific zip file (lighter, no screenshots/recordings)
-        email_zip_file_path = os.path.join(report_dir_for_today, f"CubiView_Report_Email_{date_str}.zip")
-        
-        # Check if email zip file exists, if not create it
-        if not os.path.exists(email_zip_file_path):
-            if not os.path.exists(report_dir_for_today):
-                app_logger.error("API: Report directory not found for email send")
-                return jsonify({"success": False, "message": "No report found for today"}), 404
-            
-            # Import the email-optimized zip function from html_report
-            from html_report import create_email_report_zip
-            if not create_email_report_zip(report_dir_for_today, email_zip_file_path):
-                app_logger.error("API: Failed to create email zip file for email send")
-                return jsonify({"success": False, "message": "Failed to create email zip file"}), 500
-
-        # Prepare recipient list
-        recipient_email = smtp_config.get('to_email', '')
+def run_send_report_email(smtp_config, report_dir, email_zip_file_path, date_str, recipient_email=None, cc_list=None):
+    """
+    Builds the lightweight e-mail zip and sends it; hands it to the outbox if sending fails.
+
+    :param recipient_email: Send to this address instead of the configured to_email.
+    :param cc_list: CC addresses instead of the configured cc1/cc2.
+    """
+    # Create the email zip, or bring an existing one up to date (only new/changed files are compressed)
+    from html_report import create_email_report_zip
+    if not create_email_report_zip(report_dir, email_zip_file_path):
+        app_logger.error("API: Failed to create email zip file for email send")
+        return {"success": False, "message": "Failed to create email zip file"}
+
+    # Prepare recipient list
+    recipient_email = recipient_email or smtp_config.get('to_email', '')
+    if cc_list is None:
         cc1 = smtp_config.get('cc1', '')
         cc2 = smtp_config.get('cc2', '')
         cc_list = [email for email in [cc1, cc2] if email]
 
-        if not recipient_email:
-            app_logger.warning("API: No recipient email configured in SMTP settings.")
-            return jsonify({"success": False, "message": "No recipient email configured in SMTP settings."}), 400
-
-        # Send email with email-optimized zip attachment
-        success, message = send_email_with_zip(
-            from_addr=smtp_config.get('from_email'),
-            password=smtp_config.get('password'),
-            to_addr=recipient_email,
-            subject=f"CubiView Daily Report - {date_str}",
-            body=f"Dear Team,\n\nPlease find attached the CubiView daily report for {date_str}.\n\nThis email contains a lightweight report with:\n- HTML summary report\n- Activity tracking charts and data\n- Application and browser usage reports\n- Key monitoring statistics\n\nNote: This email version excludes screenshots and recordings for faster delivery. Full reports with media files are available through the cloud dashboard.\n\nBest regards,\nCubiView Monitoring System",
-            attachment_path=email_zip_file_path,
-            cc_list=cc_list,
-            smtp_server_add=smtp_config.get('smtp_server'),
-            smtp_port_add=int(smtp_config.get('smtp_port', 465))
-        )
+    email_body = f"Dear Team,\n\nPlease find attached the CubiView daily report for {date_str}.\n\nThis email contains a lightweight report with:\n- HTML summary report\n- Activity tracking charts and data\n- Application and browser usage reports\n- Key monitoring statistics\n\nNote: This email version excludes screenshots and recordings for faster delivery. Full reports with media files are available through the cloud dashboard.\n\nBest regards,\nCubiView Monitoring System"
+
+    # Send email with email-optimized zip attachment
+    success, message = send_email_with_zip(
+        from_addr=smtp_config.get('from_email'),
+        password=smtp_config.get('password'),
+        to_addr=recipient_email,
+        subject=f"CubiView Daily Report - {date_str}",
+        body=email_body,
+        attachment_path=email_zip_file_path,
+        cc_list=cc_list,
+        smtp_server_add=smtp_config.get('smtp_server'),
+        smtp_port_add=int(smtp_config.get('smtp_port', 465))
+    )
 
-        if success:
-            recipients_str = recipient_email
-            if cc_list:
-                recipients_str += f" and CC: {', '.join(cc_list)}"
-            
-            # Get zip file size for confirmation
-            zip_size = os.path.getsize(email_zip_file_path) if os.path.exists(email_zip_file_path) else 0
-            zip_size_mb = zip_size / (1024 * 1024)
-            
-            app_logger.info(f"API: Email report sent successfully to {recipients_str} (zip size: {zip_size_mb:.2f} MB)")
-            return jsonify({
-                "success": True, 
-                "message": f"Lightweight report sent successfully to {recipients_str} (Size: {zip_size_mb:.2f} MB)",
-                "recipients": {
-                    "to": recipient_email,
-                    "cc": cc_list
-                },
-                "zip_size_mb": round(zip_size_mb, 2)
-            }), 200
-        else:
-            app_logger.error(f"API: Failed to send report email: {message}")
-            return jsonify({"success": False, "message": f"Failed to send email: {message}"}), 500
-            
+    if success:
+        recipients_str = recipient_email
+        if cc_list:
+            recipients_str += f" and CC: {', '.join(cc_list)}"
+
+        # Get zip file size for confirmation
+        zip_size = os.path.getsize(email_zip_file_path) if os.path.exists(email_zip_file_path) else 0
+        zip_size_mb = zip_size / (1024 * 1024)
+
+        app_logger.info(f"API: Email report sent successfully to {recipients_str} (zip size: {zip_size_mb:.2f} MB)")
+        return {
+            "success": True,
+            "message": f"Lightweight report sent successfully to {recipients_str} (Size: {zip_size_mb:.2f} MB)",
+            "recipients": {
+                "to": recipient_email,
+                "cc": cc_list
+            },
+            "zip_size_mb": round(zip_size_mb, 2)
+        }
+
+    # Keep the report: the outbox retries it with backoff and once the network is back
+    job_id = enqueue("email", {
+        "to_addr": recipient_email,
+        "cc_list": cc_list,
+        "subject": f"CubiView Daily Report - {date_str}",
+        "body": email_body,
+        "attachment_path": email_zip_file_path,
+    }, key=f"email:{recipient_email}:{email_zip_file_path}")
+    app_logger.error(f"API: Failed to send report email: {message}; queued as job {job_id}")
+    return {
+        "success": True,
+        "queued": True,
+        "job_id": job_id,
+        "message": f"Sending failed ({message}); the report has been queued and will be retried automatically.",
+        "recipients": {
+            "to": recipient_email,
+            "cc": cc_list
+        },
+    }
+
+@app.route('/api/reports/send-to-smtp-emails', methods=['POST'])
+def api_send_report_to_smtp_emails():
+    """Send the latest report zip file to all configured emails in SMTP config (runs as a background operation)"""
+    app_logger.info("API: Received request to send report to SMTP configured emails...")
+    # Get SMTP configuration
+    smtp_config = get_smtp_credentials_file()
+    if not smtp_config or not smtp_config.get('from_email') or not smtp_config.get('password'):
+        app_logger.warning("API: SMTP credentials not configured for sending email.")
+        return jsonify({"success": False, "message": "SMTP credentials not configured. Please set them up in SMTP Config page."}), 400
+
+    # Get the latest report information
+    date_str = datetime.now().strftime("%d-%m-%Y")
+    report_dir_for_today = os.path.join(REPORT_DIR, date_str)
+    # Create email-specific zip file (lighter, no screenshots/recordings)
+    email_zip_file_path = os.path.join(report_dir_for_today, f"CubiView_Report_Email_{date_str}.zip")
+
+    if not os.path.exists(report_dir_for_today):
+        app_logger.error("API: Report directory not found for email send")
+        return jsonify({"success": False, "message": "No report found for today"}), 404
+
+    if not smtp_config.get('to_email', ''):
+        app_logger.warning("API: No recipient email configured in SMTP settings.")
+        return jsonify({"success": False, "message": "No recipient email configured in SMTP settings."}), 400
+
+    return accept_operation("report_email", run_send_report_email, smtp_config, report_dir_for_today,
+                            email_zip_file_path, date_str)
+
+# === DELIVERY OUTBOX ===
+@app.route('/api/outbox', methods=['GET'])
+def api_outbox_status():
+    """Report e-mails and cloud uploads that are queued, retrying or failed."""
+    try:
+        return jsonify(outbox_status()), 200
     except Exception as e:
-        app_logger.exception(f"API: Error during report email send: {e}")
-        return jsonify({"success": False, "message": f"Email send error: {str(e)}"}), 500
+        app_logger.exception(f"API: Error reading outbox status: {e}")
+        return jsonify({"error": str(e)}), 500
 
 # === WEBSITE WHITELIST ===
 @app.route('/api/whitelist', methods=['GET'])
@@ -734,231 +859,101 @@ def api_ping():
 #     app.run(port=5000, debug=True)
 
 # === INCOGNITO & EXTENSIONS MANAGEMENT WITH CONFIRMATION ===
-@app.route('/api/incognito/enable', methods=['POST'])
-def api_enable_incognito_blocking():
-    """Enable incognito blocking with user confirmation"""
+# Applying these policies closes every browser (up to a few seconds per process), so the
+# routes only check the confirmation and run the change as a background operation. All
+# of them share the "browsers" resource: they run one at a time, in the order requested.
+def confirmation_required(message):
+    return jsonify({
+        'success': False,
+        'message': message,
+        'requiresConfirmation': True
+    }), 400
+
+def run_browser_policy(action, policy_func, success_message):
+    """Applies a browser policy (closes all browsers)."""
+    # No stdout swapping here: this runs on an operation worker next to other threads
+    # that print. run_server makes the console replace characters it cannot encode.
     try:
-        data = request.get_json()
-        confirmed = data.get('confirmed', False)
-        
-        if not confirmed:
-            return jsonify({
-                'success': False,
-                'message': 'User confirmation required. This action will close all browsers.',
-                'requiresConfirmation': True
-            }), 400
-        
-        # Capture any print statements to avoid encoding issues
-        import sys
-        import io
-        original_stdout = sys.stdout
-        sys.stdout = io.StringIO()
-        
-        try:
-            enable_incognito_blocking(confirmed=True)
-            captured_output = sys.stdout.getvalue()
-        finally:
-            sys.stdout = original_stdout
-        
-        app_logger.info("API: Enabled incognito blocking with user confirmation")
-        return jsonify({
-            'success': True,
-            'message': 'Incognito mode blocking enabled successfully'
-        })
+        policy_func(confirmed=True)
     except UnicodeEncodeError as e:
-        app_logger.error(f"API: Unicode encoding error enabling incognito blocking: {e}")
-        return jsonify({
-            'success': False,
-            'message': 'Error enabling incognito blocking: encoding issue'
-        }), 500
+        app_logger.error(f"API: Unicode encoding error {action}: {e}")
+        return {'success': False, 'message': f'Error {action}: encoding issue'}
     except Exception as e:
-        app_logger.error(f"API: Error enabling incognito blocking: {e}")
-        return jsonify({
-            'success': False,
-            'message': f'Error enabling incognito blocking: {str(e)}'
-        }), 500
+        app_logger.error(f"API: Error {action}: {e}")
+        return {'success': False, 'message': f'Error {action}: {str(e)}'}
+
+    app_logger.info(f"API: Finished {action} with user confirmation")
+    return {'success': True, 'message': success_message}
+
+@app.route('/api/incognito/enable', methods=['POST'])
+def api_enable_incognito_blocking():
+    """Enable incognito blocking with user confirmation"""
+    data = request.get_json(silent=True) or {}
+    if not data.get('confirmed', False):
+        return confirmation_required('User confirmation required. This action will close all browsers.')
+    return accept_operation("incognito_enable", run_browser_policy, "enabling incognito blocking",
+                            enable_incognito_blocking, 'Incognito mode blocking enabled successfully',
+                            resource="browsers")
 
 @app.route('/api/incognito/disable', methods=['POST'])
 def api_disable_incognito_blocking():
     """Disable incognito blocking with user confirmation"""
-    try:
-        data = request.get_json()
-        confirmed = data.get('confirmed', False)
-        
-        if not confirmed:
-            return jsonify({
-                'success': False,
-                'message': 'User confirmation required. This action will close all browsers.',
-                'requiresConfirmation': True
-            }), 400
-        
-        # Capture any print statements to avoid encoding issues
-        import sys
-        import io
-        original_stdout = sys.stdout
-        sys.stdout = io.StringIO()
-        
-        try:
-            disable_incognito_blocking(confirmed=True)
-            captured_output = sys.stdout.getvalue()
-        finally:
-            sys.stdout = original_stdout
-        
-        app_logger.info("API: Disabled incognito blocking with user confirmation")
-        return jsonify({
-            'success': True,
-            'message': 'Incognito mode blocking disabled successfully'
-        })
-    except UnicodeEncodeError as e:
-        app_logger.error(f"API: Unicode encoding error disabling incognito blocking: {e}")
-        return jsonify({
-            'success': False,
-            'message': 'Error disabling incognito blocking: encoding issue'
-        }), 500
-    except Exception as e:
-        app_logger.error(f"API: Error disabling incognito blocking: {e}")
-        return jsonify({
-            'success': False,
-            'message': f'Error disabling incognito blocking: {str(e)}'
-        }), 500
+    data = request.get_json(silent=True) or {}
+    if not data.get('confirmed', False):
+        return confirmation_required('User confirmation required. This action will close all browsers.')
+    return accept_operation("incognito_disable", run_browser_policy, "disabling incognito blocking",
+                            disable_incognito_blocking, 'Incognito mode blocking disabled successfully',
+                            resource="browsers")
 
 @app.route('/api/extensions/block', methods=['POST'])
 def api_block_extensions():
     """Block Chrome extensions with user confirmation"""
-    try:
-        data = request.get_json()
-        confirmed = data.get('confirmed', False)
-        
-        if not confirmed:
-            return jsonify({
-                'success': False,
-                'message': 'User confirmation required. This action will close all browsers.',
-                'requiresConfirmation': True
-            }), 400
-        
-        # Capture any print statements to avoid encoding issues
-        import sys
-        import io
-        original_stdout = sys.stdout
-        sys.stdout = io.StringIO()
-        
-        try:
-            block_extensions(confirmed=True)
-            captured_output = sys.stdout.getvalue()
-        finally:
-            sys.stdout = original_stdout
-        
-        app_logger.info("API: Blocked Chrome extensions with user confirmation")
-        return jsonify({
-            'success': True,
-            'message': 'Chrome extensions blocked successfully'
-        })
-    except UnicodeEncodeError as e:
-        app_logger.error(f"API: Unicode encoding error blocking extensions: {e}")
-        return jsonify({
-            'success': False,
-            'message': 'Error blocking extensions: encoding issue'
-        }), 500
-    except Exception as e:
-        app_logger.error(f"API: Error blocking extensions: {e}")
-        return jsonify({
-            'success': False,
-            'message': f'Error blocking extensions: {str(e)}'
-        }), 500
+    data = request.get_json(silent=True) or {}
+    if not data.get('confirmed', False):
+        return confirmation_required('User confirmation required. This action will close all browsers.')
+    return accept_operation("extensions_block", run_browser_policy, "blocking extensions",
+                            block_extensions, 'Chrome extensions blocked successfully',
+                            resource="browsers")
 
 @app.route('/api/extensions/unblock', methods=['POST'])
 def api_unblock_extensions():
     """Unblock Chrome extensions with user confirmation"""
+    data = request.get_json(silent=True) or {}
+    if not data.get('confirmed', False):
+        return confirmation_required('User confirmation required. This action will close all browsers.')
+    return accept_operation("extensions_unblock", run_browser_policy, "unblocking extensions",
+                            unblock_extensions, 'Chrome extensions unblocked successfully',
+                            resource="browsers")
+
+# === VPN MONITORING WITH CONFIRMATION ===
+def run_vpn_monitoring(enable):
+    """Starts/stops VPN monitoring (netsh, monitor threads) and reports the outcome."""
+    action, doing, done = ("enable", "enabling", "enabled") if enable else ("disable", "disabling", "disabled")
     try:
-        data = request.get_json()
-        confirmed = data.get('confirmed', False)
-        
-        if not confirmed:
-            return jsonify({
-                'success': False,
-                'message': 'User confirmation required. This action will close all browsers.',
-                'requiresConfirmation': True
-            }), 400
-        
-        unblock_extensions(confirmed=True)
-        app_logger.info("API: Unblocked Chrome extensions with user confirmation")
-        return jsonify({
-            'success': True,
-            'message': 'Chrome extensions unblocked successfully'
-        })
+        result = enable_vpn_monitoring(confirmed=True) if enable else disable_vpn_monitoring(confirmed=True)
     except Exception as e:
-        app_logger.error(f"API: Error unblocking extensions: {e}")
-        return jsonify({
-            'success': False,
-            'message': f'Error unblocking extensions: {str(e)}'
-        }), 500
+        app_logger.error(f"API: Error {doing} VPN monitoring: {e}")
+        return {'success': False, 'message': f'Error {doing} VPN monitoring: {str(e)}'}
+    if not result:
+        return {'success': False, 'message': f'Failed to {action} VPN monitoring'}
+    app_logger.info(f"API: {done.capitalize()} VPN monitoring with user confirmation")
+    return {'success': True, 'message': f'VPN monitoring {done} successfully'}
 
-# === VPN MONITORING WITH CONFIRMATION ===
 @app.route('/api/vpn/enable', methods=['POST'])
 def api_enable_vpn_monitoring():
     """Enable VPN monitoring with user confirmation"""
-    try:
-        data = request.get_json()
-        confirmed = data.get('confirmed', False)
-        
-        if not confirmed:
-            return jsonify({
-                'success': False,
-                'message': 'User confirmation required. This action will enable VPN detection and blocking.',
-                'requiresConfirmation': True
-            }), 400
-        
-        result = enable_vpn_monitoring(confirmed=True)
-        if result:
-            app_logger.info("API: Enabled VPN monitoring with user confirmation")
-            return jsonify({
-                'success': True,
-                'message': 'VPN monitoring enabled successfully'
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'message': 'Failed to enable VPN monitoring'
-            }), 500
-    except Exception as e:
-        app_logger.error(f"API: Error enabling VPN monitoring: {e}")
-        return jsonify({
-            'success': False,
-            'message': f'Error enabling VPN monitoring: {str(e)}'
-        }), 500
+    data = request.get_json(silent=True) or {}
+    if not data.get('confirmed', False):
+        return confirmation_required('User confirmation required. This action will enable VPN detection and blocking.')
+    return accept_operation("vpn_enable", run_vpn_monitoring, True, resource="vpn")
 
 @app.route('/api/vpn/disable', methods=['POST'])
 def api_disable_vpn_monitoring():
     """Disable VPN monitoring with user confirmation"""
-    try:
-        data = request.get_json()
-        confirmed = data.get('confirmed', False)
-        
-        if not confirmed:
-            return jsonify({
-                'success': False,
-                'message': 'User confirmation required. This action will disable VPN detection.',
-                'requiresConfirmation': True
-            }), 400
-        
-        result = disable_vpn_monitoring(confirmed=True)
-        if result:
-            app_logger.info("API: Disabled VPN monitoring with user confirmation")
-            return jsonify({
-                'success': True,
-                'message': 'VPN monitoring disabled successfully'
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'message': 'Failed to disable VPN monitoring'
-            }), 500
-    except Exception as e:
-        app_logger.error(f"API: Error disabling VPN monitoring: {e}")
-        return jsonify({
-            'success': False,
-            'message': f'Error disabling VPN monitoring: {str(e)}'
-        }), 500
+    data = request.get_json(silent=True) or {}
+    if not data.get('confirmed', False):
+        return confirmation_required('User confirmation required. This action will disable VPN detection.')
+    return accept_operation("vpn_disable", run_vpn_monitoring, False, resource="vpn")
 
 # === VPN ADMIN APPROVAL SYSTEM ===
 @app.route('/api/vpn/admin-requests', methods=['GET'])
@@ -0,0 +1,164 @@
+"""
+File: operations.py
+
+Description:
+------------
+Background operations for slow, side-effecting API routes (closing browsers for the
+incognito/extension policies, netsh for VPN monitoring, downloading updates, sending
+e-mail). The route validates its input, submits the work and answers 202 with an
+operation id right away; the UI polls /api/operations/<id> for the outcome.
+
+Operations run on a small bounded executor. At most MAX_PENDING can wait at once,
+after which submit() raises OperationQueueFull (the route answers 503). Work on the
+same resource (e.g. everything that closes browsers) runs on that resource's own
+single worker, in submission order, so an enable followed quickly by a disable ends
+disabled. An identical operation that is already queued or running is returned
+instead of starting a second one, so a double click does not close the browsers
+twice. For resource-bound work that only applies while it is still the last one
+queued on its resource: enable -> disable -> enable queues the second enable.
+
+Functions Defined:
+------------------
+get_operation_manager() -> process-wide OperationManager
+"""
+
+import time
+import uuid
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+operations_logger = logging.getLogger('operations_logger')
+
+MAX_WORKERS = 4
+MAX_PENDING = 32                # queued + running operations accepted at once
+MAX_FINISHED = 100              # finished operations kept for status queries
+
+
+class OperationQueueFull(Exception):
+    pass
+
+
+class Operation:
+    def __init__(self, kind, key):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.status = "queued"     # queued -> running -> completed | failed
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+
+    def to_dict(self):
+        return {
+            "operation_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": datetime.fromtimestamp(self.created_at).isoformat(timespec="seconds"),
+            "queued_seconds": round((self.started_at or time.time()) - self.created_at, 3),
+            "duration_seconds": round((self.finished_at or time.time()) - self.started_at, 3) if self.started_at else 0.0,
+        }
+
+
+class OperationManager:
+    def __init__(self, max_workers=MAX_WORKERS, max_pending=MAX_PENDING):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="Operation")
+        self.max_pending = max_pending
+        self.lock = threading.Lock()
+        self.operations = {}    # id -> Operation
+        self.inflight = {}      # key -> latest Operation with that key (queued or running)
+        self.pending = 0        # queued + running operations
+        self.resource_executors = {}  # resource -> single-worker executor (FIFO per resource)
+        self.resource_tail = {}       # resource -> last Operation submitted on it
+
+    def submit(self, kind, func, *args, resource=None, **kwargs):
+        """
+        Queues func(*args, **kwargs) and returns its Operation.
+
+        func returns a JSON-serialisable result; a dict with "success": False marks
+        the operation failed (with its "message" as the error).
+
+        :param resource: Optional name; operations on the same resource run one at a time, in order.
+        """
+        key = (kind, repr(args), repr(sorted(kwargs.items())))
+        with self.lock:
+            operation = self.inflight.get(key)
+            # On a resource, attaching to an operation that something else was queued
+            # behind would drop this request's place in the order.
+            if operation and (not resource or self.resource_tail.get(resource) is operation):
+                operations_logger.info(f"Attaching to in-flight {kind} operation {operation.id}")
+                return operation
+            if self.pending >= self.max_pending:
+                raise OperationQueueFull(f"{self.pending} operations are already pending")
+            operation = Operation(kind, key)
+            self.operations[operation.id] = operation
+            self.inflight[key] = operation
+            self.pending += 1
+            executor = self.executor
+            if resource:
+                if resource not in self.resource_executors:
+                    self.resource_executors[resource] = ThreadPoolExecutor(
+                        max_workers=1, thread_name_prefix=f"Operation-{resource}")
+                executor = self.resource_executors[resource]
+                self.resource_tail[resource] = operation
+            self._prune()
+        executor.submit(self._run, operation, func, args, kwargs)
+        operations_logger.info(f"Queued {kind} operation {operation.id}")
+        return operation
+
+    def get(self, operation_id):
+        with self.lock:
+            return self.operations.get(operation_id)
+
+    def wait(self, operation, timeout=None):
+        operation.done.wait(timeout)
+        return operation.result
+
+    def _run(self, operation, func, args, kwargs):
+        operation.status = "running"
+        operation.started_at = time.time()
+        try:
+            result = func(*args, **kwargs)
+            operation.result = result
+            if isinstance(result, dict) and result.get("success") is False:
+                operation.status = "failed"
+                operation.error = result.get("message", f"{operation.kind} failed")
+            else:
+                operation.status = "completed"
+        except Exception as e:
+            operations_logger.exception(f"{operation.kind} operation {operation.id} crashed: {e}")
+            operation.status = "failed"
+            operation.error = str(e)
+            operation.result = {"success": False, "message": str(e)}
+        finally:
+            operation.finished_at = time.time()
+            with self.lock:
+                if self.inflight.get(operation.key) is operation:
+                    del self.inflight[operation.key]
+                self.pending -= 1
+            operation.done.set()
+            operations_logger.info(f"{operation.kind} operation {operation.id} {operation.status} in "
+                                   f"{operation.finished_at - operation.started_at:.2f}s")
+
+    def _prune(self):
+        finished = sorted((o for o in self.operations.values() if o.done.is_set()), key=lambda o: o.created_at)
+        for operation in finished[:-MAX_FINISHED or None]:
+            self.operations.pop(operation.id, None)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_operation_manager():
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = OperationManager()
+        return _manager
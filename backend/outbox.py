@@ -0,0 +1,482 @@
+"""
+File: outbox.py
+
+Description:
+------------
+Durable outbox for report deliveries (e-mails and cloud uploads).
+
+Delivery jobs are written to disk before anything touches the network, so a report
+produced while the machine is offline (or right before a shutdown) is delivered later
+instead of being lost:
+
+    <APP_DATA_COMMON_DIR>/outbox/
+        incoming/<id>.json   new jobs, dropped atomically by any process (API server,
+                             activator); picked up by the drainer
+        queue.jsonl          append-only log owned by the drainer:
+                             add / attempt / done / failed / superseded records,
+                             replayed on start and compacted when it grows
+        drainer.lock         held by the one process that drains the queue
+
+The drainer runs in the process that holds drainer.lock (normally the activator; the
+API server takes over when it runs alone). It sends due jobs on a small thread pool,
+backs off exponentially with jitter after a failure, and does not spend attempts while
+offline: it sleeps until connectivity.py reports a network change, then retries every
+pending job at once. A job is only removed after its handler succeeds. Jobs that keep
+failing (or fail permanently, e.g. the attachment was deleted) are kept as "failed"
+and logged, never dropped silently.
+
+A job with a key (e.g. the cloud upload of one zip) replaces an older pending job
+with the same key, so a zip rebuilt several times while offline is uploaded once.
+
+Functions Defined:
+------------------
+enqueue()               -> queue a delivery job and wake the drainer
+start_outbox_drainer()  -> start draining in this process (if no other process does)
+outbox_status()         -> pending / failed jobs, for the API and diagnostics
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from credentials import APP_DATA_COMMON_DIR
+from connectivity import is_connected, on_network_change
+
+OUTBOX_DIR = os.path.join(APP_DATA_COMMON_DIR, "outbox")
+INCOMING_DIRNAME = "incoming"
+QUEUE_FILENAME = "queue.jsonl"
+LOCK_FILENAME = "drainer.lock"
+
+MAX_WORKERS = 2                      # deliveries in flight at once
+MAX_ATTEMPTS = 30                    # then the job is kept as "failed"
+BACKOFF_BASE = 30.0                  # seconds before the first retry
+BACKOFF_MAX = 3600.0
+IDLE_WAIT = 300.0                    # longest sleep without a wake-up
+INCOMING_POLL = 10.0                 # incoming/ scan interval without watchdog
+NETWORK_SETTLE = 5.0                 # delay after a network change (DHCP/DNS)
+LOCK_RETRY = 60.0                    # how often a non-owner retries drainer.lock
+COMPACT_AFTER = 500                  # log records before the queue is rewritten
+
+outbox_logger = logging.getLogger('outbox_logger')
+
+
+class DeliveryError(Exception):
+    """Delivery failed; the job is retried later."""
+
+
+class PermanentDeliveryError(DeliveryError):
+    """Delivery can never succeed (e.g. the file is gone); the job is failed immediately."""
+
+
+def _backoff(attempts):
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** max(attempts - 1, 0)))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def _write_json_atomic(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _try_lock(path):
+    """Opens and exclusively locks path without blocking; returns the file or None."""
+    f = open(path, "a+")
+    try:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return f
+    except OSError:
+        f.close()
+        return None
+
+
+# --- delivery handlers --------------------------------------------------------
+
+def deliver_email(payload):
+    """Sends a report e-mail; SMTP credentials are read at send time, never stored in the queue."""
+    from write_report import load_smtp_credentials, send_email_with_zip
+
+    attachment = payload.get("attachment_path")
+    if attachment and not os.path.exists(attachment):
+        raise PermanentDeliveryError(f"Attachment no longer exists: {attachment}")
+    from_email, password, to_email, cc1, cc2, smtp_server, smtp_port = load_smtp_credentials()
+    to_addr = payload.get("to_addr") or to_email
+    cc_list = payload.get("cc_list")
+    if cc_list is None:
+        cc_list = [email for email in [cc1, cc2] if email]
+    if not from_email or not password or not to_addr:
+        raise DeliveryError("SMTP credentials are not configured")
+
+    success, message = send_email_with_zip(
+        from_addr=from_email,
+        password=password,
+        to_addr=to_addr,
+        subject=payload["subject"],
+        body=payload["body"],
+        attachment_path=attachment,
+        cc_list=cc_list,
+        smtp_server_add=smtp_server or "smtp.gmail.com",
+        smtp_port_add=int(smtp_port or 465),
+    )
+    if not success:
+        raise DeliveryError(message)
+    return {"success": True, "message": message}
+
+
+def deliver_cloud_upload(payload):
+    """Uploads a report zip to the cloud dashboard."""
+    from html_report import upload_report_to_cloud
+    from get_systemID import get_system_id
+
+    zip_path = payload["zip_path"]
+    if not os.path.exists(zip_path):
+        raise PermanentDeliveryError(f"Report zip no longer exists: {zip_path}")
+    result = upload_report_to_cloud(zip_path, payload.get("system_id") or get_system_id())
+    if not result.get("success"):
+        raise DeliveryError(result.get("message", "Cloud upload failed"))
+    return result
+
+
+HANDLERS = {
+    "email": deliver_email,
+    "cloud_upload": deliver_cloud_upload,
+}
+
+
+# --- queue --------------------------------------------------------------------
+
+class Outbox:
+    """The job log of one outbox directory. Only the drainer writes queue.jsonl."""
+
+    def __init__(self, outbox_dir=OUTBOX_DIR):
+        self.dir = outbox_dir
+        self.incoming_dir = os.path.join(outbox_dir, INCOMING_DIRNAME)
+        self.queue_path = os.path.join(outbox_dir, QUEUE_FILENAME)
+        self.lock_path = os.path.join(outbox_dir, LOCK_FILENAME)
+        os.makedirs(self.incoming_dir, exist_ok=True)
+
+    def drop(self, job):
+        """Writes a new job into incoming/ (safe from any process)."""
+        _write_json_atomic(os.path.join(self.incoming_dir, job["id"] + ".json"), job)
+
+    def replay(self):
+        """Rebuilds {id: job} from queue.jsonl; done and superseded jobs are left out."""
+        jobs = {}
+        records = 0
+        try:
+            with open(self.queue_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue        # torn last line after a crash
+                    records += 1
+                    op = record.get("op")
+                    if op == "add":
+                        jobs[record["job"]["id"]] = record["job"]
+                    elif record.get("id") in jobs:
+                        if op in ("done", "superseded"):
+                            del jobs[record["id"]]
+                        elif op == "attempt":
+                            jobs[record["id"]].update(attempts=record["attempts"],
+                                                      next_attempt_at=record["next_attempt_at"],
+                                                      last_error=record.get("error"))
+                        elif op == "failed":
+                            jobs[record["id"]].update(status="failed", attempts=record.get("attempts", 0),
+                                                      last_error=record.get("error"))
+        except FileNotFoundError:
+            pass
+        return jobs, records
+
+    def append(self, record):
+        with open(self.queue_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def compact(self, jobs):
+        tmp = self.queue_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for job in jobs.values():
+                f.write(json.dumps({"op": "add", "job": job}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.queue_path)
+
+    def incoming(self):
+        """New job files in arrival order."""
+        try:
+            entries = [e for e in os.scandir(self.incoming_dir) if e.name.endswith(".json")]
+        except FileNotFoundError:
+            return []
+        return sorted(entries, key=lambda e: e.stat().st_mtime_ns)
+
+
+class OutboxDrainer:
+    def __init__(self, outbox, handlers=None, max_workers=MAX_WORKERS):
+        self.outbox = outbox
+        self.handlers = handlers or HANDLERS
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="OutboxWorker")
+        self.max_workers = max_workers
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopped = threading.Event()
+        self.in_flight = set()
+        self.offline = False
+        self.jobs, self.records = outbox.replay()
+        self.outbox.compact(self.jobs)
+        self.records = len(self.jobs)
+        self._observer = None
+        self._lock_file = None              # keeps drainer.lock held for the life of the process
+
+    # --- bookkeeping ---------------------------------------------------------
+
+    def _log(self, record):
+        self.outbox.append(record)
+        self.records += 1
+
+    def _ingest(self):
+        """Moves job files from incoming/ into the log; the file is removed only after the append."""
+        for entry in self.outbox.incoming():
+            try:
+                with open(entry.path, "r", encoding="utf-8") as f:
+                    job = json.load(f)
+            except (OSError, ValueError) as e:
+                outbox_logger.warning(f"Skipping unreadable outbox file {entry.path}: {e}")
+                continue
+            with self.lock:
+                if job["id"] not in self.jobs:
+                    self._supersede(job)
+                    self._log({"op": "add", "job": job})
+                    self.jobs[job["id"]] = job
+                    outbox_logger.info(f"Outbox: queued {job['kind']} job {job['id']}")
+            os.remove(entry.path)
+
+    def _supersede(self, job):
+        if not job.get("key"):
+            return
+        for old in list(self.jobs.values()):
+            if old.get("key") == job["key"] and old["id"] not in self.in_flight and old["status"] == "pending":
+                self._log({"op": "superseded", "id": old["id"], "by": job["id"]})
+                del self.jobs[old["id"]]
+
+    def _maybe_compact(self):
+        with self.lock:
+            if self.records > COMPACT_AFTER and self.records > 4 * len(self.jobs):
+                self.outbox.compact(self.jobs)
+                self.records = len(self.jobs)
+
+    # --- delivery ------------------------------------------------------------
+
+    def _deliver(self, job):
+        handler = self.handlers.get(job["kind"])
+        try:
+            if handler is None:
+                raise PermanentDeliveryError(f"No handler for job kind {job['kind']!r}")
+            handler(job["payload"])
+        except Exception as e:
+            self._record_failure(job, e)
+        else:
+            with self.lock:
+                self._log({"op": "done", "id": job["id"], "at": time.time()})
+                self.jobs.pop(job["id"], None)
+            outbox_logger.info(f"Outbox: delivered {job['kind']} job {job['id']} after {job['attempts'] + 1} attempt(s)")
+        finally:
+            with self.lock:
+                self.in_flight.discard(job["id"])
+            self.wake.set()
+
+    def _record_failure(self, job, error):
+        with self.lock:
+            attempts = job["attempts"] + 1
+            permanent = isinstance(error, PermanentDeliveryError) or attempts >= MAX_ATTEMPTS
+            if permanent:
+                self._log({"op": "failed", "id": job["id"], "attempts": attempts, "error": str(error)})
+                job.update(status="failed", attempts=attempts, last_error=str(error))
+            else:
+                next_attempt_at = time.time() + _backoff(attempts)
+                self._log({"op": "attempt", "id": job["id"], "attempts": attempts,
+                           "next_attempt_at": next_attempt_at, "error": str(error)})
+                job.update(attempts=attempts, next_attempt_at=next_attempt_at, last_error=str(error))
+        if permanent:
+            outbox_logger.error(f"Outbox: {job['kind']} job {job['id']} failed permanently after {attempts} attempt(s): {error}")
+            print(f"[ERROR] Report delivery ({job['kind']}) failed permanently and is kept in {self.outbox.dir}: {error}")
+        else:
+            outbox_logger.warning(f"Outbox: {job['kind']} job {job['id']} attempt {attempts} failed ({error}); "
+                                  f"retrying at {datetime.fromtimestamp(job['next_attempt_at']):%H:%M:%S}")
+
+    def _dispatch(self):
+        """Submits due jobs; returns seconds until the next one is due."""
+        now = time.time()
+        with self.lock:
+            pending = [j for j in self.jobs.values() if j["status"] == "pending" and j["id"] not in self.in_flight]
+            due = sorted((j for j in pending if j["next_attempt_at"] <= now), key=lambda j: j["next_attempt_at"])
+            slots = self.max_workers - len(self.in_flight)
+        if due and slots > 0:
+            if not is_connected():
+                # Offline: keep the attempt count, wait for a network change.
+                self.offline = True
+                return IDLE_WAIT
+            self.offline = False
+            for job in due[:slots]:
+                with self.lock:
+                    self.in_flight.add(job["id"])
+                self.executor.submit(self._deliver, job)
+        later = [j["next_attempt_at"] - now for j in pending if j["next_attempt_at"] > now]
+        return min(later + [IDLE_WAIT])
+
+    def _network_changed(self):
+        def release():
+            with self.lock:
+                for job in self.jobs.values():
+                    if job["status"] == "pending":
+                        job["next_attempt_at"] = min(job["next_attempt_at"], time.time())
+            self.wake.set()
+        # The address shows up before DHCP/DNS are ready; retry shortly after.
+        threading.Timer(NETWORK_SETTLE, release).start()
+
+    def _watch_incoming(self):
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            return False
+        drainer = self
+
+        class IncomingHandler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.src_path.endswith(".json") or getattr(event, "dest_path", "").endswith(".json"):
+                    drainer.wake.set()
+
+        self._observer = Observer()
+        self._observer.schedule(IncomingHandler(), path=self.outbox.incoming_dir, recursive=False)
+        self._observer.daemon = True
+        self._observer.start()
+        return True
+
+    def run(self):
+        watching = self._watch_incoming()
+        on_network_change(self._network_changed)
+        pending = sum(1 for j in self.jobs.values() if j["status"] == "pending")
+        print(f"[+] Outbox drainer started ({pending} pending job(s)).")
+        while not self.stopped.is_set():
+            try:
+                self._ingest()
+                wait = self._dispatch()
+                self._maybe_compact()
+            except Exception as e:
+                outbox_logger.exception(f"Outbox drainer error: {e}")
+                wait = INCOMING_POLL
+            if not watching:
+                wait = min(wait, INCOMING_POLL)
+            self.wake.wait(max(wait, 0.05))
+            self.wake.clear()
+
+    def stop(self, wait=True):
+        self.stopped.set()
+        self.wake.set()
+        if self._observer:
+            self._observer.stop()
+        self.executor.shutdown(wait=wait)
+
+
+# --- public API -----------------------------------------------------------------
+
+_outbox = None
+_drainer = None
+_start_lock = threading.Lock()
+
+
+def _get_outbox():
+    global _outbox
+    if _outbox is None:
+        _outbox = Outbox()
+    return _outbox
+
+
+def enqueue(kind, payload, key=None):
+    """
+    Queues a delivery job and returns its id. The job is on disk when this returns.
+
+    :param kind: "email" or "cloud_upload" (a key of HANDLERS).
+    :param payload: JSON-serialisable arguments for the handler (no secrets).
+    :param key: Optional dedupe key; replaces an older pending job with the same key.
+    """
+    job = {
+        "id": uuid.uuid4().hex,
+        "kind": kind,
+        "payload": payload,
+        "key": key,
+        "created_at": time.time(),
+        "attempts": 0,
+        "next_attempt_at": 0,
+        "status": "pending",
+        "last_error": None,
+    }
+    _get_outbox().drop(job)
+    if _drainer is not None:
+        _drainer.wake.set()
+    return job["id"]
+
+
+def start_outbox_drainer(handlers=None):
+    """
+    Starts the drainer in a daemon thread. If another process already drains the
+    outbox, the thread waits and takes over once that process exits.
+    """
+    def run():
+        global _drainer
+        outbox = _get_outbox()
+        while True:
+            lock = _try_lock(outbox.lock_path)
+            if lock is not None:
+                break
+            time.sleep(LOCK_RETRY)
+        _drainer = OutboxDrainer(outbox, handlers)
+        _drainer._lock_file = lock
+        _drainer.run()
+
+    with _start_lock:
+        if getattr(start_outbox_drainer, "thread", None) is None:
+            start_outbox_drainer.thread = threading.Thread(target=run, name="OutboxDrainer", daemon=True)
+            start_outbox_drainer.thread.start()
+    return start_outbox_drainer.thread
+
+
+def outbox_status():
+    """Jobs not yet delivered (queued, retrying or failed), oldest first, without payload secrets."""
+    outbox = _get_outbox()
+    if _drainer is not None:
+        with _drainer.lock:
+            jobs = [dict(j) for j in _drainer.jobs.values()]
+    else:
+        jobs, _ = outbox.replay()
+        jobs = list(jobs.values())
+    for entry in outbox.incoming():
+        try:
+            with open(entry.path, "r", encoding="utf-8") as f:
+                jobs.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    jobs.sort(key=lambda j: j["created_at"])
+    return {
+        "pending": sum(1 for j in jobs if j["status"] == "pending"),
+        "failed": sum(1 for j in jobs if j["status"] == "failed"),
+        "jobs": [{k: j.get(k) for k in ("id", "kind", "status", "attempts", "created_at", "next_attempt_at", "last_error")}
+                 for j in jobs],
+    }
@@ -25,6 +25,7 @@ import win32event
 import win32com.client
 
 from write_report import write_report
+from event_journal import journal_event
 from credentials import REPORT_DIR
 
 
@@ -216,6 +217,7 @@ def generate_activity_report():
         title="--- Active vs Idle Time Report ---",
         with_timestamp=False,
     )
+    journal_event("activity", active=int(total_active_time), idle=int(total_idle_time))
 
 def generate_mouse_movement_report():
     lines = [
@@ -237,6 +239,7 @@ def generate_mouse_movement_report():
         title="Mouse Movement Report",
         with_timestamp=False
     )
+    journal_event("mouse_moves", moves=len(mouse_movements))
 
 
 def generate_mouse_click_report():
@@ -263,6 +266,7 @@ def generate_mouse_click_report():
         title="Mouse Click Report",
         with_timestamp=False
     )
+    journal_event("clicks", clicks=len(mouse_clicks))
 
 
 
@@ -290,6 +294,7 @@ def log_print_job(printer_name, document_name, user_name):
         base_filename="print_job_report",
         content=content
     )
+    journal_event("print_job", printer=printer_name, document=document_name, user=user_name)
 
 
 # Function to track print jobs
@@ -383,9 +388,11 @@ class SessionChangeListener:
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             if wparam == WTS_SESSION_LOCK:
                 screen_lock_data.append({'timestamp': timestamp, 'state': 'Locked'})
+                journal_event("screen_lock", state="Locked")
                 print(f"[{timestamp}] Screen Locked")
             elif wparam == WTS_SESSION_UNLOCK:
                 screen_lock_data.append({'timestamp': timestamp, 'state': 'Unlocked'})
+                journal_event("screen_lock", state="Unlocked")
                 print(f"[{timestamp}] Screen Unlocked")
         return win32gui.DefWindowProc(hwnd, msg, wparam, lparam)
 
@@ -498,6 +505,8 @@ def generate_location_report():
         content=content,
         title="Location Tracking Report"
     )
+    journal_event("location", city=location_data.get("city", ""), region=location_data.get("region", ""),
+                  country=location_data.get("country", ""), ip=location_data.get("ip", ""))
 
 
 # ========= Enable / Disable Functions =========
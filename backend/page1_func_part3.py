@@ -8,6 +8,7 @@ from datetime import datetime
 import getpass
 from credentials import REPORT_DIR
 from write_report import write_report
+from event_journal import journal_event
 
 # Configuration
 CAPTURE_DURATION = 5  # Duration in seconds
@@ -58,9 +59,11 @@ def capture_audio():
             wf.close()
             
             write_report(REPORT_DIR, "capture_report", f"Audio saved: {audio_file}")
+            journal_event("capture", kind="audio", action="saved", file=audio_file)
             print(f"Audio saved: {audio_file}")
     except Exception as e:
         write_report(REPORT_DIR, "capture_report", f"Error capturing audio: {e}")
+        journal_event("capture", kind="audio", action="error", message=str(e))
         print(f"Error capturing audio: {e}")
 
 def capture_video():
@@ -93,9 +96,11 @@ def capture_video():
         
         if (time.time() - start_time) > 0:  # Save only if some video was captured
             write_report(REPORT_DIR, "capture_report", f"Video saved: {video_file}")
+            journal_event("capture", kind="video", action="saved", file=video_file)
             print(f"Video saved: {video_file}")
     except Exception as e:
         write_report(REPORT_DIR, "capture_report", f"Error capturing video: {e}")
+        journal_event("capture", kind="video", action="error", message=str(e))
         print(f"Error capturing video: {e}")
 
 def audio_scheduler():
@@ -14,7 +14,9 @@ import datetime
 # Removed tkinter messagebox; confirmation should be handled by frontend
 
 from write_report import write_report
-from credentials import REPORT_DIR, WHITELIST_FILE, BLOCKLIST_FILE
+from event_journal import journal_event
+from credentials import REPORT_DIR
+from settings_store import get_settings_store, WHITELIST_SITES, BLOCKLIST_SITES
 
 # Supported Chromium browsers and their registry paths
 CHROMIUM_BROWSERS = {
@@ -53,6 +55,7 @@ def log_incognito_action(action: str):
         content=action,
         title= "Incognito report"
     )
+    journal_event("incognito", message=action)
 
 def log_chrome_ext(action: str):
     write_report(
@@ -61,6 +64,7 @@ def log_chrome_ext(action: str):
                 content=action,
                 title="Chrome Extension Report"
             )
+    journal_event("chrome_extension", message=action.strip())
 
 def set_chromium_registry(browser, allow):
     try:
@@ -201,21 +205,11 @@ PROXY_SERVER = "127.0.0.1:5000"
 
 # WHITELIST_FILE = "whitelist_sites.json"
 
-# Ensure file exists
-if not os.path.exists(WHITELIST_FILE):
-    with open(WHITELIST_FILE, "w") as f:
-        json.dump([], f)
-
 def load_whitelist_sites():
-    with open(WHITELIST_FILE, "r") as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            return []
+    return get_settings_store().get(WHITELIST_SITES)
 
 def save_whitelist_sites(websites):
-    with open(WHITELIST_FILE, "w") as f:
-        json.dump(websites, f, indent=4)
+    get_settings_store().set(WHITELIST_SITES, websites)
 
 
 # def format_proxy_exceptions(sites):
@@ -286,6 +280,7 @@ def generate_website_whitelist_report():
         content=content,
         title="Website Whitelist Report"
     )
+    journal_event("website_whitelist", status=proxy_status, sites=len(sites))
 
 
 ############ Block websites ################
@@ -301,20 +296,8 @@ IPV6_REDIRECT = "::1"
 
 
 def load_blocked_sites():
-    """Load the list of websites to block from a JSON file."""
-    if not os.path.exists(BLOCKLIST_FILE):
-        return []
-    with open(BLOCKLIST_FILE, 'r') as f:
-        try:
-            data = json.load(f)
-            if isinstance(data, dict):
-                return data.get("websites", [])
-            elif isinstance(data, list):
-                return data
-            else:
-                return []
-        except json.JSONDecodeError:
-            return []
+    """Load the list of websites to block from the settings store."""
+    return get_settings_store().get(BLOCKLIST_SITES)
 
 
 import subprocess
@@ -478,6 +461,7 @@ def generate_blocked_websites_report():
         content=content,
         title="Blocked Websites Report"
     )
+    journal_event("website_blocking", status=block_status, sites=len(sites))
 
 
 def is_block_active():
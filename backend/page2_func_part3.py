@@ -4,7 +4,6 @@
 
 ##### USB Port enable and disable ##########
 import winreg
-import os
 
 def disable_usb_ports():
     """Disable USB storage devices by modifying the Windows Registry."""
@@ -49,15 +48,15 @@ def enable_usb_ports():
 
 ############### Lunch hour start and stop #################
 
-import json
 import time
-import os
 import threading
 from datetime import datetime, timedelta
 import pytz
 from pathlib import Path
-from credentials import REPORT_DIR, CONFIG_PATH, BACKUP_FILE_PATH
+from credentials import REPORT_DIR
 from write_report import write_report
+from event_journal import journal_event
+from settings_store import get_settings_store, CONFIG, CONFIG_BACKUP
 
 # ========== File Paths and Timezone ==========
 
@@ -70,17 +69,10 @@ lunch_monitor_running = False
 
 # ========== Config Helpers ==========
 def load_config():
-    if not os.path.exists(CONFIG_PATH):
-        default_config = {"Lunch Break Mode": False}
-        with open(CONFIG_PATH, "w") as f:
-            json.dump(default_config, f, indent=4)
-        return default_config
-    with open(CONFIG_PATH, "r") as f:
-        return json.load(f)
+    return get_settings_store().get(CONFIG, {"Lunch Break Mode": False})
 
 def save_config(data):
-    with open(CONFIG_PATH, "w") as f:
-        json.dump(data, f, indent=4)
+    get_settings_store().set(CONFIG, data)
 
 # ========== Lunch Timer Core ==========
 def start_lunch_timer():
@@ -98,10 +90,9 @@ def start_lunch_timer():
         delay_seconds = max(0, int((actual_time - expected_time).total_seconds()))
 
         # Restore full config from backup
-        if os.path.exists(BACKUP_FILE_PATH):
+        backup_config = get_settings_store().get(CONFIG_BACKUP)
+        if backup_config:
             try:
-                with open(BACKUP_FILE_PATH, "r") as f:
-                    backup_config = json.load(f)
                 save_config(backup_config)
                 print("[Lunch Timer] Full config restored from backup.")
 
@@ -120,6 +111,7 @@ def start_lunch_timer():
                     with_timestamp=True,
                     mode='a'
                 )
+                journal_event("lunch_restore", delay_seconds=delay_seconds, features=len(backup_config))
             except Exception as e:
                 print(f"[Lunch Timer] Error restoring config: {e}")
 
@@ -141,17 +133,16 @@ def enable_lunch_mode_monitor():
             if now.hour == 15 and now.minute == 0:
                 print("[Lunch Monitor] 1 PM reached. Triggering lunch timer...")
 
-                # Step 1: Backup full config BEFORE modifying it
-                config = load_config()
-                with open(BACKUP_FILE_PATH, "w") as f:
-                    json.dump(config, f, indent=4)
+                # Steps 1-2 in one transaction: back up the full config, then disable
+                # all features except 'Lunch Break Mode'
+                with get_settings_store().transaction() as tx:
+                    config = tx.get(CONFIG)
+                    tx.set(CONFIG_BACKUP, config)
+                    new_config = {key: False for key in config}
+                    if config.get("Lunch Break Mode", False):
+                        new_config["Lunch Break Mode"] = True
+                    tx.set(CONFIG, new_config)
                 print("[Lunch Monitor] Full config backed up.")
-
-                # Step 2: Disable all features except 'Lunch Break Mode'
-                new_config = {key: False for key in config}
-                if config.get("Lunch Break Mode", False):
-                    new_config["Lunch Break Mode"] = True
-                save_config(new_config)
                 print("[Lunch Monitor] Config overwritten with lunch-disabled state.")
 
                 # Step 3: Start lunch timer
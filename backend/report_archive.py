@@ -0,0 +1,388 @@
+"""
+File: report_archive.py
+
+Description:
+------------
+Incremental zip archives for the report directories (full report, email report and the
+end-of-day zip_folder archive).
+
+Next to every archive a manifest (<archive>.manifest.json) records, for each member,
+the size and mtime of the source file it was built from and the CRC-32 written for
+it, plus the size/mtime of the archive itself. On the next build:
+
+  - nothing changed               -> the archive is left as it is
+  - only new files                -> they are appended to a copy of the archive
+  - files changed or disappeared  -> the archive is rebuilt into a temp file; members
+                                     whose source is unchanged are copied as raw
+                                     compressed bytes, only changed/new files are
+                                     compressed again
+
+Every build writes a unique temp file and swaps it in with os.replace, so the archive
+the outbox is mailing or uploading is never changed underneath it.
+
+Members are compressed according to COMPRESSION_POLICY: media that is already
+compressed (png/jpg screenshots, mp4 clips, mp3, pdf, ...) is stored, everything else
+is deflated. Large deflated members are compressed in a small thread pool ahead of
+the writer, which still writes them one after another.
+
+Verification uses the member list and CRCs recorded while writing instead of
+reopening and re-reading the archive. If the manifest does not match the archive on
+disk (deleted, edited by hand, interrupted write) a full build is done.
+
+Functions Defined:
+------------------
+build_archive()       -> create or update an archive from (source path, arcname) pairs
+compression_for()     -> compression type COMPRESSION_POLICY picks for a member
+is_archive_artifact() -> True for archives and their sidecar files (never archived themselves)
+"""
+
+import os
+import json
+import time
+import zlib
+import shutil
+import struct
+import zipfile
+import logging
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+MANIFEST_SUFFIX = ".manifest.json"
+MANIFEST_VERSION = 1
+
+# Already-compressed formats are stored: deflating them costs CPU for ~0% gain.
+# Everything else (reports, html, logs, bmp/wav) is deflated.
+_STORED_EXTENSIONS = (
+    ".png", ".jpg", ".jpeg", ".gif", ".webp",
+    ".mp4", ".avi", ".mov", ".mkv", ".flv", ".wmv", ".webm",
+    ".mp3", ".aac", ".ogg", ".flac", ".m4a", ".opus",
+    ".zip", ".gz", ".7z", ".rar", ".pdf", ".docx", ".xlsx", ".pptx",
+)
+COMPRESSION_POLICY = {ext: zipfile.ZIP_STORED for ext in _STORED_EXTENSIONS}
+POLICY_VERSION = "policy-1"          # bump when COMPRESSION_POLICY changes, forces a full rebuild
+
+PARALLEL_MIN_SIZE = 256 * 1024       # smaller members are not worth a round trip through the pool
+COMPRESS_WORKERS = min(4, os.cpu_count() or 1)
+READ_CHUNK_SIZE = 1 << 20
+SWAP_ATTEMPTS = 5                    # os.replace tries while a reader holds the archive (Windows)
+SWAP_RETRY_DELAY = 0.5
+
+report_archive_logger = logging.getLogger('report_archive_logger')
+
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+
+
+def is_archive_artifact(name):
+    # the archive itself and its sidecars: manifest, temp file, upload session
+    return name.endswith(".zip") or ".zip." in name
+
+
+def manifest_path(zip_path):
+    return zip_path + MANIFEST_SUFFIX
+
+
+def _load_manifest(zip_path):
+    try:
+        with open(manifest_path(zip_path), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        st = os.stat(zip_path)
+    except (OSError, ValueError):
+        return None
+    if (manifest.get("v") != MANIFEST_VERSION or manifest.get("compression") is None
+            or manifest.get("archive") != [st.st_size, st.st_mtime_ns]):
+        return None
+    return manifest
+
+
+def _save_manifest(zip_path, compression, members):
+    st = os.stat(zip_path)
+    manifest = {
+        "v": MANIFEST_VERSION,
+        "compression": compression,
+        "archive": [st.st_size, st.st_mtime_ns],
+        "members": members,
+    }
+    path = manifest_path(zip_path)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    os.replace(f"{path}.tmp", path)
+
+
+def _stat_sources(files):
+    """Returns {arcname: (source path, size, mtime_ns)} for the sources that still exist."""
+    sources = {}
+    for file_path, arcname in files:
+        try:
+            st = os.stat(file_path)
+        except OSError as e:
+            report_archive_logger.warning(f"Skipping {file_path}: {e}")
+            continue
+        sources[arcname.replace(os.sep, "/")] = (file_path, st.st_size, st.st_mtime_ns)
+    return sources
+
+
+def compression_for(arcname):
+    """Compression type the policy picks for a member, by file extension."""
+    return COMPRESSION_POLICY.get(os.path.splitext(arcname)[1].lower(), zipfile.ZIP_DEFLATED)
+
+
+def _deflate_file(file_path):
+    """Raw-deflates a file the way ZipFile would; runs in the pool (zlib releases the GIL)."""
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    crc = size = 0
+    parts = []
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            parts.append(compressor.compress(chunk))
+    parts.append(compressor.flush())
+    return b"".join(parts), crc, size
+
+
+def _write_raw(zipf, zinfo, chunks):
+    """
+    Writes a member whose compressed bytes (and CRC/sizes) are already known.
+    ZipFile has no public raw-write API; this mirrors what ZipFile.write does.
+    """
+    with zipf._lock:
+        zipf._writecheck(zinfo)
+        zipf._didModify = True
+        zinfo.header_offset = zipf.fp.tell()
+        zipf.fp.write(zinfo.FileHeader())
+        for chunk in chunks:
+            zipf.fp.write(chunk)
+        zipf.filelist.append(zinfo)
+        zipf.NameToInfo[zinfo.filename] = zinfo
+        zipf.start_dir = zipf.fp.tell()
+
+
+def _write_entry(zipf, arcname, source, compress_type, deflated, members):
+    file_path, size, mtime_ns = source
+    if deflated is None:
+        zipf.write(file_path, arcname, compress_type=compress_type)
+        crc = zipf.getinfo(arcname).CRC
+    else:
+        data, crc, file_size = deflated.result()
+        zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+        zinfo.compress_type = zipfile.ZIP_DEFLATED
+        zinfo.CRC = crc
+        zinfo.file_size = file_size
+        zinfo.compress_size = len(data)
+        _write_raw(zipf, zinfo, (data,))
+    members[arcname] = {"size": size, "mtime_ns": mtime_ns, "crc": crc}
+
+
+def _write_members(zipf, items, members, compression=None, workers=COMPRESS_WORKERS):
+    """
+    Writes (arcname, source) items into zipf in order. Large members that get deflated
+    are compressed ahead of time in a thread pool (at most 2 x workers in flight) and
+    then written sequentially; everything else goes through ZipFile.write.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ZipDeflate") as pool:
+        pending = deque()
+
+        def drain(limit):
+            while len(pending) > limit:
+                arcname, source, compress_type, deflated = pending.popleft()
+                try:
+                    _write_entry(zipf, arcname, source, compress_type, deflated, members)
+                except OSError as e:
+                    report_archive_logger.error(f"Failed to add file {source[0]} to zip: {e}")
+
+        for arcname, source in items:
+            compress_type = compression if compression is not None else compression_for(arcname)
+            deflated = None
+            if workers > 1 and compress_type == zipfile.ZIP_DEFLATED and source[1] >= PARALLEL_MIN_SIZE:
+                deflated = pool.submit(_deflate_file, source[0])
+            pending.append((arcname, source, compress_type, deflated))
+            drain(2 * workers)
+        drain(0)
+
+
+def _copy_raw_member(src, zipf, info):
+    """
+    Copies one member's compressed bytes from the open source archive into zipf
+    without decompressing or recompressing them.
+    """
+    src.seek(info.header_offset)
+    header = _LOCAL_HEADER.unpack(src.read(_LOCAL_HEADER.size))
+    if header[0] != b"PK\x03\x04":
+        raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+    src.seek(header[9] + header[10], os.SEEK_CUR)   # file name + extra field
+
+    copied = zipfile.ZipInfo(info.filename, info.date_time)
+    copied.compress_type = info.compress_type
+    copied.external_attr = info.external_attr
+    copied.create_system = info.create_system
+    copied.flag_bits = info.flag_bits & ~0x08         # sizes go in the local header, no data descriptor
+    copied.CRC = info.CRC
+    copied.compress_size = info.compress_size
+    copied.file_size = info.file_size
+
+    def chunks():
+        remaining = info.compress_size
+        while remaining:
+            chunk = src.read(min(remaining, READ_CHUNK_SIZE))
+            if not chunk:
+                raise zipfile.BadZipFile(f"Truncated member {info.filename}")
+            remaining -= len(chunk)
+            yield chunk
+
+    _write_raw(zipf, copied, chunks())
+
+
+def _verify(zipf, expected):
+    """Checks the members just written against the expected names and recorded CRCs."""
+    written = {info.filename: info.CRC for info in zipf.infolist()}
+    missing = [name for name in expected if name not in written]
+    mismatched = [name for name, member in expected.items() if name in written and written[name] != member["crc"]]
+    if missing or mismatched or len(written) != len(expected):
+        raise zipfile.BadZipFile(f"Archive verification failed (missing={missing[:5]}, crc mismatch={mismatched[:5]})")
+
+
+def _temp_path(zip_path):
+    """A unique temp file next to the archive (name contains ".zip.", so it is never archived itself)."""
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(zip_path) + ".", suffix=".tmp",
+                                    dir=os.path.dirname(os.path.abspath(zip_path)))
+    os.close(fd)
+    return tmp_path
+
+
+def _swap_in(tmp_path, zip_path, attempts=SWAP_ATTEMPTS):
+    """
+    Atomically replaces zip_path with the finished temp file. Readers that already have
+    the old archive open (outbox e-mail, cloud upload) keep reading the old version.
+    Windows refuses the replace while another handle holds the file, so retry briefly.
+    """
+    for attempt in range(attempts):
+        try:
+            os.replace(tmp_path, zip_path)
+            return
+        except PermissionError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(SWAP_RETRY_DELAY)
+
+
+def _build_into_temp(zip_path, build):
+    """Runs build(tmp_path) and swaps the result in; the temp file is removed on failure."""
+    tmp_path = _temp_path(zip_path)
+    try:
+        members = build(tmp_path)
+        _swap_in(tmp_path, zip_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return members
+
+
+def _full_build(zip_path, sources, compression, workers):
+    def build(tmp_path):
+        members = {}
+        with zipfile.ZipFile(tmp_path, "w") as zipf:
+            _write_members(zipf, sources.items(), members, compression, workers)
+            _verify(zipf, members)
+        return members
+    return _build_into_temp(zip_path, build)
+
+
+def _append(zip_path, sources, old_members, new_names, compression, workers):
+    """
+    Appends the new files to a copy of the archive. The existing members are copied as
+    bytes (nothing is recompressed); the live archive is never modified in place.
+    """
+    def build(tmp_path):
+        members = dict(old_members)
+        shutil.copyfile(zip_path, tmp_path)
+        with zipfile.ZipFile(tmp_path, "a") as zipf:
+            _write_members(zipf, [(name, sources[name]) for name in new_names], members, compression, workers)
+            _verify(zipf, members)
+        return members
+    return _build_into_temp(zip_path, build)
+
+
+def _rebuild(zip_path, sources, unchanged, compression, workers):
+    """Rewrites the archive, copying unchanged members raw from the current one."""
+    def build(tmp_path):
+        members = {}
+        with zipfile.ZipFile(zip_path, "r") as old, open(zip_path, "rb") as src, \
+                zipfile.ZipFile(tmp_path, "w") as zipf:
+            old_infos = {info.filename: info for info in old.infolist()}
+            recompress = []
+            for arcname, source in sources.items():
+                if arcname in unchanged and arcname in old_infos:
+                    _copy_raw_member(src, zipf, old_infos[arcname])
+                    members[arcname] = unchanged[arcname]
+                else:
+                    recompress.append((arcname, source))
+            _write_members(zipf, recompress, members, compression, workers)
+            _verify(zipf, members)
+        return members
+    return _build_into_temp(zip_path, build)
+
+
+def build_archive(zip_path, files, compression=None, workers=COMPRESS_WORKERS):
+    """
+    Creates zip_path from the given files, or updates it incrementally when it was
+    built by this function before.
+
+    :param files: Iterable of (source path, arcname) pairs.
+    :param compression: Force one zipfile compression type for every member instead of
+                        COMPRESSION_POLICY.
+    :param workers: Threads compressing large members ahead of the writer (1 = serial).
+    :returns: {"path", "members": [arcnames], "added", "reused", "removed", "mode"}
+              where mode is "unchanged", "append", "rebuild" or "full".
+    """
+    sources = _stat_sources(files)
+    manifest = _load_manifest(zip_path)
+    policy = compression if compression is not None else POLICY_VERSION
+    if manifest and manifest["compression"] != policy:
+        manifest = None
+
+    old_members = manifest["members"] if manifest else {}
+    unchanged = {
+        name: member for name, member in old_members.items()
+        if name in sources and (member["size"], member["mtime_ns"]) == sources[name][1:]
+    }
+    new_names = [name for name in sources if name not in old_members]
+    removed = [name for name in old_members if name not in sources]
+    changed = [name for name in old_members if name in sources and name not in unchanged]
+
+    if not manifest:
+        mode = "full"
+        members = _full_build(zip_path, sources, compression, workers)
+    elif not new_names and not removed and not changed:
+        mode = "unchanged"
+        members = old_members
+    elif not removed and not changed:
+        mode = "append"
+        members = _append(zip_path, sources, old_members, new_names, compression, workers)
+    else:
+        mode = "rebuild"
+        try:
+            members = _rebuild(zip_path, sources, unchanged, compression, workers)
+        except (zipfile.BadZipFile, OSError, RuntimeError) as e:
+            report_archive_logger.warning(f"Raw copy from {zip_path} failed ({e}); rebuilding from scratch")
+            mode = "full"
+            members = _full_build(zip_path, sources, compression, workers)
+
+    if mode != "unchanged":
+        _save_manifest(zip_path, policy, members)
+    reused = len(unchanged) if mode in ("append", "rebuild", "unchanged") else 0
+    return {
+        "path": zip_path,
+        "members": list(members),
+        "added": len(members) - reused,
+        "reused": reused,
+        "removed": len(removed) if manifest else 0,
+        "mode": mode,
+    }
+
@@ -0,0 +1,122 @@
+"""
+File: report_checkpoint.py
+
+Description:
+------------
+Persisted per-source checkpoints so report generation only parses the bytes appended
+since the previous run.
+
+For each source file in a day directory the checkpoint stores the file identity
+(inode + size), the last parsed byte offset, a hash of the already-parsed head of the
+file (to detect a rewrite in place) and the partial aggregates built so far. A run
+folds only the new tail into the stored aggregates; if the file was replaced,
+truncated or rewritten it is parsed again from byte 0.
+
+Checkpoints live in <day dir>/.report_checkpoint.json and are replaced atomically.
+
+Functions Defined:
+------------------
+load_journal_summary_incremental() -> JournalSummary for a day directory, parsing only new bytes
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+import threading
+
+from event_journal import JOURNAL_FILENAME, SCHEMA_VERSION, JournalSummary, fold_journal
+
+CHECKPOINT_FILENAME = ".report_checkpoint.json"
+HEAD_BYTES = 4096
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _dir_lock(report_dir):
+    with _locks_guard:
+        return _locks.setdefault(os.path.abspath(report_dir), threading.Lock())
+
+
+def head_hash(path, offset):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read(min(offset, HEAD_BYTES))).hexdigest()
+
+
+def load_checkpoints(report_dir):
+    path = os.path.join(report_dir, CHECKPOINT_FILENAME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("v") == SCHEMA_VERSION:
+            return data.get("sources", {})
+    except (FileNotFoundError, json.JSONDecodeError, AttributeError):
+        pass
+    except Exception as e:
+        print(f"[WARNING] Could not read report checkpoint in {report_dir}: {e}")
+    return {}
+
+
+def save_checkpoints(report_dir, sources):
+    path = os.path.join(report_dir, CHECKPOINT_FILENAME)
+    tmp_path = None
+    try:
+        # A unique temp file per writer: other processes (activator, pool workers) do not
+        # share _dir_lock and must not overwrite each other's half-written file.
+        fd, tmp_path = tempfile.mkstemp(prefix=f"{CHECKPOINT_FILENAME}.", suffix=".tmp", dir=report_dir)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"v": SCHEMA_VERSION, "sources": sources}, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"[WARNING] Could not save report checkpoint in {report_dir}: {e}")
+        if tmp_path and os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def _is_same_source(checkpoint, stat, path):
+    """True when the checkpointed prefix of the file is still what we parsed last time."""
+    if not checkpoint:
+        return False
+    if checkpoint.get("inode") != stat.st_ino or stat.st_size < checkpoint.get("offset", 0):
+        return False
+    return checkpoint.get("head") == head_hash(path, checkpoint.get("offset", 0))
+
+
+def load_journal_summary_incremental(report_dir):
+    """
+    Returns the JournalSummary for <report_dir>/events.jsonl, folding only the bytes
+    appended since the last call into the checkpointed aggregates.
+    Returns None when the day has no journal.
+    """
+    path = os.path.join(report_dir, JOURNAL_FILENAME)
+    if not os.path.exists(path):
+        return None
+
+    with _dir_lock(report_dir):
+        sources = load_checkpoints(report_dir)
+        checkpoint = sources.get(JOURNAL_FILENAME)
+        stat = os.stat(path)
+
+        if _is_same_source(checkpoint, stat, path):
+            summary = JournalSummary.from_dict(checkpoint.get("summary", {}))
+            offset = checkpoint.get("offset", 0)
+            if stat.st_size == offset:
+                return summary
+        else:
+            summary = JournalSummary()
+            offset = 0
+
+        offset = fold_journal(path, summary, offset)
+        sources[JOURNAL_FILENAME] = {
+            "inode": stat.st_ino,
+            "size": stat.st_size,
+            "offset": offset,
+            "head": head_hash(path, offset),
+            "summary": summary.to_dict(),
+        }
+        save_checkpoints(report_dir, sources)
+        return summary
@@ -0,0 +1,281 @@
+"""
+File: report_jobs.py
+
+Description:
+------------
+Single-flight report job manager used by the Flask API (new_api.py).
+
+Concurrent requests for the same (date, user) attach to one in-flight job instead of
+starting duplicate generations. Every job gets an id that can be polled through
+/api/reports/jobs/<id> for status and progress. A completed job is kept as the cached
+artifact for its key until the inputs in the day directory (or the monitoring config)
+change, so repeated preview/metadata requests do not regenerate anything. The
+fingerprint and result of the last successful job are also saved to
+.report_manifest.json next to the inputs, so the existing report is reused after an
+API restart as well.
+
+Functions Defined:
+------------------
+get_report_job_manager() -> process-wide ReportJobManager
+input_fingerprint()      -> cheap stat()-based fingerprint of a day directory's inputs
+load_manifest()          -> fingerprint and result of the last report generated for a directory
+validate_report_user()   -> rejects a user that is not a report directory of the day
+"""
+
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from credentials import REPORT_DIR
+from settings_store import get_settings_store, CONFIG
+from chart_cache import CHART_CACHE_DIRNAME
+from rollups import ROLLUP_DIRNAME
+from report_archive import is_archive_artifact
+from report_packager import PACKAGE_CACHE_DIRNAME
+
+report_jobs_logger = logging.getLogger('report_jobs_logger')
+
+# Files produced by report generation itself; they must not invalidate the cache.
+GENERATED_FILES = {
+    "CubiView_Summary_Report.html",
+    "app_bar.png",
+    "browser_bar.png",
+    "active_idle_pie.png",
+    ".report_checkpoint.json",
+    ".report_manifest.json",
+}
+MANIFEST_FILENAME = ".report_manifest.json"
+MAX_FINISHED_JOBS = 50
+
+
+def _is_generated(name):
+    return name in GENERATED_FILES or is_archive_artifact(name) or name.endswith(".tmp")
+
+
+def input_fingerprint(report_dir):
+    """Hashes (path, size, mtime) of every input file under report_dir plus the feature config."""
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk(report_dir):
+        dirs[:] = sorted(d for d in dirs if d not in (CHART_CACHE_DIRNAME, ROLLUP_DIRNAME, PACKAGE_CACHE_DIRNAME))
+        for name in sorted(files):
+            if _is_generated(name):
+                continue
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            digest.update(f"{os.path.relpath(path, report_dir)}|{st.st_size}|{st.st_mtime_ns}\n".encode("utf-8", "ignore"))
+    # The enabled features decide which sections are rendered
+    digest.update(("config|" + json.dumps(get_settings_store().get(CONFIG), sort_keys=True)).encode())
+    return digest.hexdigest()
+
+
+class InvalidReportUser(ValueError):
+    pass
+
+
+def validate_report_user(date_str, user):
+    """
+    Raises InvalidReportUser unless user is one of the user directories of the day.
+    The value comes from the query string and is joined into a path, so anything
+    else (e.g. "../..") must never reach _report_dir().
+    """
+    if not user:
+        return
+    from html_report import discover_report_users
+    if os.path.basename(user) != user or user in (".", "..") or \
+            user not in discover_report_users(os.path.join(REPORT_DIR, date_str)):
+        raise InvalidReportUser(f"Unknown report user: {user}")
+
+
+def _report_dir(date_str, user):
+    return os.path.join(REPORT_DIR, date_str, user) if user else os.path.join(REPORT_DIR, date_str)
+
+
+def load_manifest(report_dir):
+    """Returns {"fingerprint", "result", "generated_at"} of the last successful report for report_dir, or None."""
+    try:
+        with open(os.path.join(report_dir, MANIFEST_FILENAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if isinstance(manifest, dict) and manifest.get("fingerprint") else None
+
+
+def save_manifest(report_dir, fingerprint, result):
+    path = os.path.join(report_dir, MANIFEST_FILENAME)
+    try:
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint, "result": result, "generated_at": round(time.time(), 3)}, f, default=str)
+        os.replace(f"{path}.tmp", path)
+    except OSError as e:
+        report_jobs_logger.warning(f"Could not save report manifest {path}: {e}")
+
+
+class ReportJob:
+    def __init__(self, key, fingerprint):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.fingerprint = fingerprint
+        self.status = "queued"     # queued -> running -> completed | failed
+        self.progress = 0
+        self.stage = "Queued"
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+
+    def update_progress(self, progress, stage):
+        self.progress = progress
+        self.stage = stage
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "report_date": self.key[0],
+            "user": self.key[1],
+            "status": self.status,
+            "progress": self.progress,
+            "stage": self.stage,
+            "result": self.result,
+            "error": self.error,
+            "created_at": datetime.fromtimestamp(self.created_at).isoformat(timespec="seconds"),
+            "duration_seconds": round((self.finished_at or time.time()) - (self.started_at or self.created_at), 3),
+        }
+
+
+class ReportJobManager:
+    """
+    Runs report generations on a small executor. Different (date, user) keys run in
+    parallel since every generation works on its own html_report.ReportContext.
+    """
+
+    def __init__(self, generate_func, max_workers=2):
+        self.generate_func = generate_func
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ReportJob")
+        self.lock = threading.Lock()
+        self.jobs = {}          # job id -> ReportJob
+        self.inflight = {}      # key -> ReportJob (queued or running)
+        self.completed = {}     # key -> last successful ReportJob (cached artifact)
+
+    def submit(self, date_str=None, user=None):
+        """
+        Returns the job serving (date, user): the in-flight one, a still-valid cached one, or a new one.
+        Raises InvalidReportUser for a user that has no directory under the day.
+        """
+        date_str = date_str or datetime.now().strftime("%d-%m-%Y")
+        validate_report_user(date_str, user)
+        key = (date_str, user)
+        report_dir = _report_dir(date_str, user)
+        fingerprint = input_fingerprint(report_dir)
+
+        with self.lock:
+            job = self.inflight.get(key)
+            if job:
+                report_jobs_logger.info(f"Attaching to in-flight report job {job.id} for {key}")
+                return job
+
+            cached = self.completed.get(key)
+            if cached and cached.fingerprint == fingerprint and self._artifacts_exist(cached):
+                report_jobs_logger.info(f"Inputs unchanged, reusing report job {cached.id} for {key}")
+                return cached
+
+            cached = self._from_manifest(key, report_dir, fingerprint)
+            if cached:
+                report_jobs_logger.info(f"Inputs unchanged since the saved report, reusing it for {key}")
+                return cached
+
+            job = ReportJob(key, fingerprint)
+            self.jobs[job.id] = job
+            self.inflight[key] = job
+            self._prune()
+        self.executor.submit(self._run, job)
+        report_jobs_logger.info(f"Queued report job {job.id} for {key}")
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def wait(self, job, timeout=None):
+        """Blocks until the job finishes and returns its result dict (or None on timeout)."""
+        job.done.wait(timeout)
+        return job.result
+
+    def _artifacts_exist(self, job):
+        html_path = (job.result or {}).get("html_path")
+        return bool(html_path) and os.path.exists(html_path)
+
+    def _from_manifest(self, key, report_dir, fingerprint):
+        """Adopts the report described by the on-disk manifest as a completed job if it is still valid."""
+        manifest = load_manifest(report_dir)
+        if not manifest or manifest["fingerprint"] != fingerprint:
+            return None
+        job = ReportJob(key, fingerprint)
+        job.result = manifest.get("result")
+        if not isinstance(job.result, dict) or job.result.get("status") != "success" or not self._artifacts_exist(job):
+            return None
+        job.status = "completed"
+        job.started_at = job.finished_at = manifest.get("generated_at") or time.time()
+        job.update_progress(100, "Completed")
+        job.done.set()
+        self.jobs[job.id] = job
+        self.completed[key] = job
+        return job
+
+    def _run(self, job):
+        job.status = "running"
+        job.started_at = time.time()
+        job.update_progress(5, "Starting")
+        try:
+            result = self.generate_func(progress=job.update_progress, date_str=job.key[0], user=job.key[1])
+            job.result = result
+            if result.get("status") == "success":
+                job.status = "completed"
+            else:
+                job.status = "failed"
+                job.error = result.get("message", "Report generation failed.")
+        except Exception as e:
+            report_jobs_logger.exception(f"Report job {job.id} crashed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+            job.result = {"status": "error", "message": f"Report generation failed: {e}"}
+        finally:
+            job.finished_at = time.time()
+            job.update_progress(100, "Completed" if job.status == "completed" else "Failed")
+            with self.lock:
+                self.inflight.pop(job.key, None)
+                if job.status == "completed":
+                    self.completed[job.key] = job
+            if job.status == "completed":
+                save_manifest(_report_dir(*job.key), job.fingerprint, job.result)
+            job.done.set()
+            report_jobs_logger.info(f"Report job {job.id} {job.status} in {job.finished_at - job.started_at:.2f}s")
+
+    def _prune(self):
+        finished = [j for j in self.jobs.values() if j.done.is_set() and j not in self.completed.values()]
+        finished.sort(key=lambda j: j.created_at)
+        for job in finished[:-MAX_FINISHED_JOBS or None]:
+            self.jobs.pop(job.id, None)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_report_job_manager():
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            from html_report import main_html_report
+            _manager = ReportJobManager(main_html_report)
+        return _manager
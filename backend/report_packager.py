@@ -0,0 +1,302 @@
+"""
+File: report_packager.py
+
+Description:
+------------
+One packager for every report zip, driven by declarative profiles:
+
+    full   -> everything in the report directory (local archive)
+    cloud  -> what is uploaded to the dashboard: everything but the raw event journal
+    email  -> the lightweight attachment: reports, summary html, charts and small
+              images, no screenshots/recordings/media, kept under a byte budget
+
+Internal state (.report_checkpoint.json, .report_manifest.json, .chart_cache,
+rollups, archive manifests, temp files) is never packaged.
+
+Each run walks the directory once and builds a manifest of candidate members with
+their size and priority. Profiles with a budget estimate the compressed size of that
+manifest (stored media at full size, text by deflating a 128 KB sample of each file)
+and, while it is over budget, first downscale optional images (Pillow, written to
+.package_cache) and then drop optional members, lowest priority and largest first.
+After the archive is written (report_archive.build_archive, which reuses unchanged
+members) its real size is checked and the reduction continues if the estimate was
+too optimistic. Required members are never dropped; if they alone do not fit, the
+result says so instead of failing later in the SMTP send.
+
+Functions Defined:
+------------------
+build_manifest()  -> candidate members of a report directory for a profile
+package_report()  -> build the zip for a profile and return what went into it
+"""
+
+import os
+import zlib
+import fnmatch
+import logging
+import zipfile
+
+from credentials import EMAIL_ATTACHMENT_BUDGET
+from chart_cache import CHART_CACHE_DIRNAME
+from rollups import ROLLUP_DIRNAME
+from report_checkpoint import CHECKPOINT_FILENAME
+from report_archive import build_archive, compression_for, is_archive_artifact
+
+report_packager_logger = logging.getLogger('report_packager_logger')
+
+PACKAGE_CACHE_DIRNAME = ".package_cache"
+REQUIRED = None                        # priority of members that are never dropped
+INTERNAL_DIRS = {CHART_CACHE_DIRNAME, ROLLUP_DIRNAME, PACKAGE_CACHE_DIRNAME}
+INTERNAL_FILES = {CHECKPOINT_FILENAME, ".report_manifest.json"}
+
+SAMPLE_SIZE = 128 * 1024               # bytes deflated to estimate a member's compression ratio
+MEMBER_OVERHEAD = 120                  # local header + central directory entry, roughly
+DOWNSCALE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+# Every profile: directories skipped anywhere in the path, file patterns (fnmatch on the
+# arcname) that are excluded, the patterns allowed in at all (None = everything),
+# a size cap for images, ordered (pattern, priority) rules (first match wins, higher
+# priority is kept longer, REQUIRED is never dropped), the byte budget, and the
+# downscale settings used when over budget.
+PROFILES = {
+    "full": {
+        "exclude_dirs": (),
+        "exclude": (),
+        "include": None,
+        "max_image_size": None,
+        "priorities": [],
+        "default_priority": REQUIRED,
+        "budget": None,
+        "downscale": None,
+    },
+    "cloud": {
+        "exclude_dirs": (),
+        "exclude": ("events.jsonl", "*/events.jsonl"),
+        "include": None,
+        "max_image_size": None,
+        "priorities": [],
+        "default_priority": REQUIRED,
+        "budget": None,
+        "downscale": None,
+    },
+    "email": {
+        "exclude_dirs": ("Screenshots", "ScreenRecordings", "Videos", "Images", "Recordings", "captured_clips"),
+        "exclude": (
+            "*.mp4", "*.avi", "*.mov", "*.mkv", "*.flv", "*.wmv",
+            "*.wav", "*.mp3", "*.aac", "*.flac", "*.ogg",
+            "*.bmp", "*.tiff", "*.raw",
+            "screenshot_*", "*/screenshot_*", "recording_*", "*/recording_*",
+            "events.jsonl", "*/events.jsonl",
+        ),
+        "include": ("*.txt", "*.html", "*.css", "*.js", "*.png", "*.jpg", "*.jpeg", "*.gif"),
+        "max_image_size": 5 * 1024 * 1024,
+        "priorities": [
+            ("*CubiView_Summary_Report.html", REQUIRED),
+            ("*activity_report.txt", REQUIRED),
+            ("*keystroke_report.txt", REQUIRED),
+            ("*application_report.txt", 90),
+            ("*browser_report.txt", 90),
+            ("*install-uninstall.txt", 80),
+            ("*print_job_report.txt", 80),
+            ("*location_report.txt", 70),
+            ("*lunch_restore_report.txt", 70),
+            ("*capture_report.txt", 70),
+            ("*.html", 60),
+            ("*.png", 50),
+            ("*.jpg", 40),
+            ("*.jpeg", 40),
+            ("*.gif", 40),
+            ("*.txt", 30),             # large raw logs: clicks, clipboard, keylogger
+        ],
+        "default_priority": 20,
+        "budget": EMAIL_ATTACHMENT_BUDGET,
+        "downscale": {"min_size": 512 * 1024, "max_dimension": 1280, "quality": 70},
+    },
+}
+
+
+class PackageMember:
+    def __init__(self, path, arcname, size, priority):
+        self.path = path
+        self.arcname = arcname
+        self.size = size
+        self.priority = priority
+        self.downscaled = False
+        self._ratio = None
+
+    @property
+    def required(self):
+        return self.priority is REQUIRED
+
+    def estimated_size(self):
+        """Compressed size estimate: stored members as-is, deflated ones by a sampled ratio."""
+        size = self.size
+        if compression_for(self.arcname) == zipfile.ZIP_DEFLATED:
+            if self._ratio is None:
+                self._ratio = _sample_ratio(self.path)
+            size = int(size * self._ratio)
+        return size + MEMBER_OVERHEAD + 2 * len(self.arcname)
+
+
+def _sample_ratio(path):
+    """Deflates the first SAMPLE_SIZE bytes of a file; the ratio gets a 10% safety margin."""
+    try:
+        with open(path, "rb") as f:
+            sample = f.read(SAMPLE_SIZE)
+    except OSError:
+        return 1.0
+    if not sample:
+        return 1.0
+    return min(1.0, len(zlib.compress(sample, 6)) / len(sample) * 1.1)
+
+
+def _matches(arcname, patterns):
+    return any(fnmatch.fnmatch(arcname, pattern) for pattern in patterns)
+
+
+def _priority(arcname, profile):
+    for pattern, priority in profile["priorities"]:
+        if fnmatch.fnmatch(arcname, pattern):
+            return priority
+    return profile["default_priority"]
+
+
+def build_manifest(report_dir, profile_name, exclude_paths=()):
+    """
+    Walks report_dir once and returns the PackageMembers the profile allows.
+
+    :param exclude_paths: Absolute paths to leave out (e.g. the archive being written).
+    """
+    profile = PROFILES[profile_name]
+    exclude_paths = {os.path.abspath(p) for p in exclude_paths}
+    members = []
+    for root, dirs, files in os.walk(report_dir):
+        dirs[:] = sorted(d for d in dirs if d not in INTERNAL_DIRS and d not in profile["exclude_dirs"])
+        for name in sorted(files):
+            if name in INTERNAL_FILES or is_archive_artifact(name) or name.endswith(".tmp"):
+                continue
+            path = os.path.join(root, name)
+            if os.path.abspath(path) in exclude_paths:
+                continue
+            arcname = os.path.relpath(path, report_dir).replace(os.sep, "/")
+            if _matches(arcname, profile["exclude"]):
+                continue
+            if profile["include"] is not None and not _matches(arcname, profile["include"]):
+                continue
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            is_image = name.lower().endswith((".png", ".jpg", ".jpeg", ".gif"))
+            if is_image and profile["max_image_size"] and size >= profile["max_image_size"]:
+                report_packager_logger.info(f"Skipping large image for {profile_name} package: {arcname}")
+                continue
+            members.append(PackageMember(path, arcname, size, _priority(arcname, profile)))
+    return members
+
+
+def _downscale(member, report_dir, settings):
+    """
+    Writes a smaller JPEG copy of an image into .package_cache and points the member at
+    it. The copy is reused while it is newer than the source. Returns False without
+    Pillow or when the image cannot be read.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return False
+    cache_dir = os.path.join(report_dir, PACKAGE_CACHE_DIRNAME)
+    target = os.path.join(cache_dir, os.path.splitext(member.arcname.replace("/", "__"))[0] + ".jpg")
+    try:
+        if not (os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(member.path)):
+            os.makedirs(cache_dir, exist_ok=True)
+            with Image.open(member.path) as img:
+                img = img.convert("RGB")
+                img.thumbnail((settings["max_dimension"], settings["max_dimension"]))
+                img.save(target + ".tmp", "JPEG", quality=settings["quality"], optimize=True)
+            os.replace(target + ".tmp", target)
+        size = os.path.getsize(target)
+    except Exception as e:
+        report_packager_logger.warning(f"Could not downscale {member.path}: {e}")
+        return False
+    if size >= member.size:
+        return False
+    member.path = target
+    member.arcname = os.path.splitext(member.arcname)[0] + ".jpg"
+    member.size = size
+    member.downscaled = True
+    return True
+
+
+def _reductions(members, report_dir, profile):
+    """
+    Yields after each step that makes the package smaller: downscaling optional images
+    (largest first), then dropping optional members (lowest priority, then largest first).
+    """
+    settings = profile["downscale"]
+    if settings:
+        images = [m for m in members if not m.required and m.arcname.lower().endswith(DOWNSCALE_EXTENSIONS)
+                  and m.size >= settings["min_size"]]
+        for member in sorted(images, key=lambda m: m.size, reverse=True):
+            if _downscale(member, report_dir, settings):
+                yield ("downscaled", member)
+    for member in sorted((m for m in members if not m.required), key=lambda m: (m.priority, -m.size)):
+        members.remove(member)
+        yield ("dropped", member)
+
+
+def package_report(report_dir, zip_path, profile_name="full", budget=None):
+    """
+    Builds (or incrementally updates) zip_path from report_dir with a profile.
+
+    :param budget: Byte budget overriding the profile's (None = profile default).
+    :returns: {"path", "profile", "members", "dropped", "downscaled", "size", "budget",
+               "within_budget", "mode"}
+    """
+    profile = PROFILES[profile_name]
+    budget = budget if budget is not None else profile["budget"]
+    members = build_manifest(report_dir, profile_name, exclude_paths=[zip_path])
+    dropped, downscaled = [], []
+    steps = _reductions(members, report_dir, profile) if budget else iter(())
+
+    def reduce_until(fits):
+        for action, member in steps:
+            (downscaled if action == "downscaled" else dropped).append(member.arcname)
+            if fits():
+                return
+
+    if budget and sum(m.estimated_size() for m in members) > budget:
+        reduce_until(lambda: sum(m.estimated_size() for m in members) <= budget)
+
+    while True:
+        archive = build_archive(zip_path, [(m.path, m.arcname) for m in members])
+        size = os.path.getsize(zip_path)
+        if not budget or size <= budget:
+            break
+        before = len(dropped) + len(downscaled)
+        # The estimate was optimistic: shrink by at least the overshoot and rebuild.
+        target = sum(m.estimated_size() for m in members) - (size - budget)
+        reduce_until(lambda: sum(m.estimated_size() for m in members) <= target)
+        if len(dropped) + len(downscaled) == before:
+            break
+
+    within_budget = not budget or size <= budget
+    if dropped or downscaled:
+        report_packager_logger.info(
+            f"{profile_name} package {zip_path}: dropped {len(dropped)} and downscaled {len(downscaled)} "
+            f"optional members to fit {budget} bytes"
+        )
+    if not within_budget:
+        report_packager_logger.warning(
+            f"{profile_name} package {zip_path} is {size} bytes, over the {budget} byte budget even with only required members"
+        )
+    return {
+        "path": zip_path,
+        "profile": profile_name,
+        "members": archive["members"],
+        "dropped": dropped,
+        "downscaled": downscaled,
+        "size": size,
+        "budget": budget,
+        "within_budget": within_budget,
+        "mode": archive["mode"],
+    }
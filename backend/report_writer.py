@@ -0,0 +1,255 @@
+"""
+File: report_writer.py
+
+Description:
+------------
+Background, batched writer behind write_report.write_report() and the event
+journal (event_journal.py).
+
+Callers only push an entry onto a bounded queue; a single writer thread keeps one
+open handle per (day, user, report) file, formats and wraps the entries, and
+group-commits them every FLUSH_INTERVAL seconds or every BATCH_SIZE entries,
+whichever comes first. Midnight rollover is handled by closing the previous day's
+handles as soon as an entry for a new day arrives.
+
+Functions Defined:
+------------------
+get_report_writer()   -> process-wide ReportWriter used by write_report.py
+close_report_writer() -> flushes and stops it at shutdown
+"""
+
+import os
+import json
+import queue
+import getpass
+import textwrap
+import threading
+import time
+from datetime import datetime
+
+FLUSH_INTERVAL = 1.0      # seconds between group commits
+BATCH_SIZE = 256          # commit early once this many entries are pending
+QUEUE_SIZE = 10000        # callers block (back-pressure) once the queue is full
+TIMESTAMP_FORMAT = "[%Y-%m-%d %H:%M:%S]"
+
+_ENTRY = "entry"
+_RECORD = "record"
+_DATA = (_ENTRY, _RECORD)
+_FLUSH = "flush"
+_STOP = "stop"
+
+
+class ReportWriter:
+    def __init__(self, flush_interval=FLUSH_INTERVAL, batch_size=BATCH_SIZE, max_queue=QUEUE_SIZE):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.handles = {}          # filepath -> open text handle (writer thread only)
+        self.current_date = None
+        self.user = None
+        self.thread = None
+        self.closed = False
+        self.lock = threading.Lock()
+
+    # ---------- Caller side ----------
+    def start(self):
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.closed = False
+            self.thread = threading.Thread(target=self._run, name="ReportWriter", daemon=True)
+            self.thread.start()
+
+    def submit(self, directory, base_filename, content, title=None, with_timestamp=True, mode='a', wrap_width=70):
+        """Queues one write_report() call. Falls back to a direct write once the writer is closed."""
+        entry = (_ENTRY, time.time(), directory, base_filename, content, title, with_timestamp, mode, wrap_width)
+        if self.closed:
+            self._write_now(entry)
+            return
+        if not self.thread:
+            self.start()
+        self.queue.put(entry)
+
+    def submit_record(self, directory, filename, record):
+        """Queues one JSON record to be appended as a line to <directory>/<date>/<user>/<filename>."""
+        entry = (_RECORD, record.get("ts") or time.time(), directory, filename, record)
+        if self.closed:
+            self._write_now(entry)
+            return
+        if not self.thread:
+            self.start()
+        self.queue.put(entry)
+
+    def flush(self, timeout=None):
+        """Blocks until every entry queued before this call is on disk."""
+        if self.closed or not self.thread or not self.thread.is_alive():
+            return True
+        done = threading.Event()
+        self.queue.put((_FLUSH, done))
+        return done.wait(timeout)
+
+    def close(self, timeout=5):
+        """Flushes pending entries, stops the writer thread and closes all handles."""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            thread = self.thread
+        if thread and thread.is_alive():
+            done = threading.Event()
+            self.queue.put((_STOP, done))
+            done.wait(timeout)
+
+    # ---------- Writer thread ----------
+    def _run(self):
+        self.user = getpass.getuser()
+        while True:
+            try:
+                first = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            deadline = time.time() + self.flush_interval
+            while first[0] in _DATA and len(batch) < self.batch_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                if item[0] not in _DATA:
+                    break
+
+            if self._commit(batch):
+                return
+
+    def _commit(self, batch):
+        """Writes a batch, flushes the touched files once and handles control markers."""
+        touched = set()
+        stop = False
+        for item in batch:
+            if item[0] in _DATA:
+                try:
+                    touched.add(self._write_entry(item, self._get_handle))
+                except Exception as e:
+                    print(f"[ERROR] Report writer failed for {item[3]}: {e}")
+            else:
+                self._flush_handles(touched)
+                touched.clear()
+                if item[0] == _STOP:
+                    self._close_handles()
+                    stop = True
+                item[1].set()
+
+        self._flush_handles(touched)
+        for filepath in touched:
+            print(f"[+] Report saved to {filepath}")
+        return stop
+
+    def _flush_handles(self, filepaths):
+        for filepath in filepaths:
+            handle = self.handles.get(filepath)
+            if handle:
+                try:
+                    handle.flush()
+                except Exception as e:
+                    print(f"[ERROR] Could not flush report {filepath}: {e}")
+                    self.handles.pop(filepath, None)
+
+    def _close_handles(self):
+        for handle in self.handles.values():
+            try:
+                handle.close()
+            except Exception:
+                pass
+        self.handles.clear()
+
+    def _get_handle(self, filepath, date_str, mode):
+        if date_str != self.current_date:
+            # Midnight rollover: yesterday's files will not be written again.
+            self._close_handles()
+            self.current_date = date_str
+
+        handle = self.handles.get(filepath)
+        if mode == 'w' and handle:
+            handle.close()
+            handle = None
+        if handle is None:
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            handle = open(filepath, mode, encoding="utf-8")
+            self.handles[filepath] = handle
+        return handle
+
+    def _write_now(self, entry):
+        """Synchronous path used after close(): same formatting, one open/close per call."""
+        opened = []
+
+        def get_handle(filepath, date_str, mode):
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            handle = open(filepath, mode, encoding="utf-8")
+            opened.append(handle)
+            return handle
+
+        try:
+            filepath = self._write_entry(entry, get_handle)
+            print(f"[+] Report saved to {filepath}")
+        except Exception as e:
+            print(f"[ERROR] Report write failed for {entry[3]}: {e}")
+        finally:
+            for handle in opened:
+                handle.close()
+
+    def _write_entry(self, entry, get_handle):
+        if entry[0] == _RECORD:
+            return self._write_record(entry, get_handle)
+
+        _, created, directory, base_filename, content, title, with_timestamp, mode, wrap_width = entry
+
+        created_at = datetime.fromtimestamp(created)
+        date_str = created_at.strftime("%d-%m-%Y")
+        user = self.user or getpass.getuser()
+        filepath = os.path.join(directory, date_str, user, f"{base_filename}.txt")
+
+        f = get_handle(filepath, date_str, mode)
+        if mode == 'w' and title:
+            f.write(f"{title}\n{'=' * 50}\n")
+
+        prefix = f"{created_at.strftime(TIMESTAMP_FORMAT)} " if with_timestamp else ""
+        entries = content if isinstance(content, list) else [content]
+        for item in entries:
+            for line in textwrap.wrap(item, width=wrap_width):
+                f.write(f"{prefix}{line}\n")
+        return filepath
+
+    def _write_record(self, entry, get_handle):
+        _, created, directory, filename, record = entry
+
+        date_str = datetime.fromtimestamp(created).strftime("%d-%m-%Y")
+        user = self.user or getpass.getuser()
+        filepath = os.path.join(directory, date_str, user, filename)
+
+        f = get_handle(filepath, date_str, 'a')
+        f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        return filepath
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_report_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ReportWriter()
+            _writer.start()
+        return _writer
+
+
+def close_report_writer():
+    """Closes the process-wide writer if one was ever started."""
+    if _writer is not None:
+        _writer.close()
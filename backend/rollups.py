@@ -0,0 +1,185 @@
+"""
+File: rollups.py
+
+Description:
+------------
+Hourly rollups of the event journal, so the day summary is built by merging at most
+24 small partials instead of re-reading every event.
+
+The hourly schedule (shutdown_detection.run_schedule) calls write_hourly_rollups(),
+which folds the journal bytes appended since the previous rollup into
+<user dir>/rollups/<HH>.json: a JournalSummary (active/idle seconds, click and
+keystroke counters, per-app and per-URL durations, install/print counts) plus the
+byte range of events.jsonl it covers. Rollups form a contiguous chain of byte ranges,
+so load_day_summary() merges them and only folds the tail written after the last one.
+If the chain is broken or the journal was replaced, it falls back to the checkpointed
+incremental parse (report_checkpoint.py).
+
+Functions Defined:
+------------------
+write_hourly_rollup()  -> roll up the new journal bytes of one user directory
+write_hourly_rollups() -> do that for every user directory of a day
+load_day_summary()     -> JournalSummary for a day directory from rollups + tail
+"""
+
+import os
+import json
+import time
+import threading
+from datetime import datetime
+
+from credentials import REPORT_DIR
+from event_journal import JOURNAL_FILENAME, SCHEMA_VERSION, JournalSummary, fold_journal
+from report_checkpoint import head_hash, load_journal_summary_incremental
+
+ROLLUP_DIRNAME = "rollups"
+
+_lock = threading.Lock()
+
+
+def _rollup_dir(report_dir):
+    return os.path.join(report_dir, ROLLUP_DIRNAME)
+
+
+def load_rollups(report_dir):
+    """Returns the rollups of a directory ordered by the journal offset they start at."""
+    rollups = []
+    try:
+        entries = list(os.scandir(_rollup_dir(report_dir)))
+    except FileNotFoundError:
+        return rollups
+    for entry in entries:
+        if not entry.name.endswith(".json"):
+            continue
+        try:
+            with open(entry.path, "r", encoding="utf-8") as f:
+                rollup = json.load(f)
+        except Exception as e:
+            print(f"[WARNING] Ignoring unreadable rollup {entry.path}: {e}")
+            continue
+        if rollup.get("v") == SCHEMA_VERSION:
+            rollups.append(rollup)
+    rollups.sort(key=lambda r: r.get("start_offset", 0))
+    return rollups
+
+
+def _save_rollup(report_dir, rollup):
+    directory = _rollup_dir(report_dir)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{rollup['hour']}.json")
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(rollup, f, separators=(",", ":"))
+    os.replace(f"{path}.tmp", path)
+    return path
+
+
+def _chain_end(rollups, journal_path):
+    """
+    Returns the offset the rollup chain ends at, or None if the rollups do not describe
+    the current journal (gaps, overlaps, or the file was replaced/rewritten).
+    """
+    try:
+        stat = os.stat(journal_path)
+    except FileNotFoundError:
+        return None
+    offset = 0
+    for rollup in rollups:
+        if rollup.get("start_offset") != offset or rollup.get("inode") != stat.st_ino:
+            return None
+        offset = rollup.get("end_offset", 0)
+    if offset > stat.st_size:
+        return None
+    if rollups and rollups[-1].get("head") != head_hash(journal_path, offset):
+        return None
+    return offset
+
+
+def write_hourly_rollup(report_dir, now=None):
+    """
+    Folds the journal bytes appended since the last rollup of report_dir into the rollup
+    for the current hour. Running twice in the same hour extends that hour's rollup.
+    Returns the rollup path, or None when there is nothing to roll up.
+    """
+    journal_path = os.path.join(report_dir, JOURNAL_FILENAME)
+    if not os.path.exists(journal_path):
+        return None
+    now = now or datetime.now()
+    hour = now.strftime("%H")
+
+    with _lock:
+        rollups = load_rollups(report_dir)
+        start = _chain_end(rollups, journal_path)
+        if start is None:
+            # Journal replaced or rollups damaged: restart the chain from byte 0.
+            print(f"[WARNING] Rollup chain in {report_dir} does not match the journal; rebuilding.")
+            for name in os.listdir(_rollup_dir(report_dir)):
+                os.remove(os.path.join(_rollup_dir(report_dir), name))
+            rollups, start = [], 0
+
+        summary = JournalSummary()
+        current = rollups[-1] if rollups and rollups[-1].get("hour") == hour else None
+        if current:
+            summary = JournalSummary.from_dict(current.get("summary", {}))
+            chain_start = current["start_offset"]
+        else:
+            chain_start = start
+
+        end = fold_journal(journal_path, summary, start)
+        if end == start and not current:
+            return None
+
+        rollup = {
+            "v": SCHEMA_VERSION,
+            "hour": hour,
+            "inode": os.stat(journal_path).st_ino,
+            "head": head_hash(journal_path, end),
+            "start_offset": chain_start,
+            "end_offset": end,
+            "generated_at": round(time.time(), 3),
+            "summary": summary.to_dict(),
+        }
+        path = _save_rollup(report_dir, rollup)
+    print(f"[+] Rollup for hour {hour} saved to {path} ({end - start} new bytes)")
+    return path
+
+
+def write_hourly_rollups(date_str=None):
+    """Writes the current hour's rollup for every user directory of a day (today by default)."""
+    date_str = date_str or datetime.now().strftime("%d-%m-%Y")
+    day_dir = os.path.join(REPORT_DIR, date_str)
+    written = []
+    try:
+        entries = list(os.scandir(day_dir))
+    except FileNotFoundError:
+        return written
+    for entry in entries:
+        if entry.is_dir() and os.path.exists(os.path.join(entry.path, JOURNAL_FILENAME)):
+            try:
+                path = write_hourly_rollup(entry.path)
+                if path:
+                    written.append(path)
+            except Exception as e:
+                print(f"[ERROR] Failed to write hourly rollup for {entry.path}: {e}")
+    return written
+
+
+def load_day_summary(report_dir):
+    """
+    Returns the JournalSummary of a day directory by merging its hourly rollups and
+    folding only the journal tail written after the last one.
+    Returns None when the day has no journal.
+    """
+    journal_path = os.path.join(report_dir, JOURNAL_FILENAME)
+    if not os.path.exists(journal_path):
+        return None
+
+    rollups = load_rollups(report_dir)
+    end = _chain_end(rollups, journal_path) if rollups else None
+    if end is None:
+        return load_journal_summary_incremental(report_dir)
+
+    summary = JournalSummary()
+    for rollup in rollups:
+        summary.merge(JournalSummary.from_dict(rollup.get("summary", {})))
+    fold_journal(journal_path, summary, end)
+    return summary
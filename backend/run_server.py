@@ -3,16 +3,11 @@
 import sys
 import os
 import logging
-import json
+import multiprocessing
 
 # Step 1: Import constants early
 from credentials import (
     APP_DATA_COMMON_DIR,
-    WHITELIST_FILE,
-    BLOCKLIST_FILE,
-    CONFIG_PATH,
-    WHITELIST_JSON,
-    BACKUP_FILE_PATH,
     SMTP_CREDENTIALS_FILE,
     REPORT_DIR,
 )
@@ -21,19 +16,10 @@ from credentials import (
 os.makedirs(APP_DATA_COMMON_DIR, exist_ok=True)
 os.makedirs(REPORT_DIR, exist_ok=True)
 
-# Step 3: Create default files *before* importing anything that reads them
-default_json_files = {
-    WHITELIST_FILE: [],
-    BLOCKLIST_FILE: [],
-    CONFIG_PATH: {},
-    WHITELIST_JSON: [],
-    BACKUP_FILE_PATH: {},
-}
-
-for path, default_content in default_json_files.items():
-    if not os.path.exists(path):
-        with open(path, 'w') as f:
-            json.dump(default_content, f)
+# Step 3: Open the settings store *before* importing anything that reads settings
+# (on the first run this imports the old JSON config/list files)
+from settings_store import get_settings_store
+get_settings_store()
 
 # Step 4: Create empty SMTP credentials file if missing
 if not os.path.exists(SMTP_CREDENTIALS_FILE):
@@ -42,9 +28,17 @@ if not os.path.exists(SMTP_CREDENTIALS_FILE):
 
 # Step 5: Now it's safe to import modules that use those files
 from new_api import app
-from flask import jsonify, request
+from outbox import start_outbox_drainer
+from wsgi_server import install_drain_hooks, request_shutdown, serve
+from flask import jsonify
 from threading import Thread
 
+# Console output that cannot be encoded (e.g. emoji on a cp1252 console) is replaced
+# instead of raising UnicodeEncodeError in whichever thread printed it
+for stream in (sys.stdout, sys.stderr):
+    if stream is not None and hasattr(stream, "reconfigure"):
+        stream.reconfigure(errors="replace")
+
 # Configure logging for run_server.py
 # This will log to stderr by default, which Electron can capture
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -53,9 +47,13 @@ server_logger = logging.getLogger('server_logger')
 # Suppress default Flask/Werkzeug access logs to avoid clutter
 logging.getLogger('werkzeug').setLevel(logging.ERROR)
 
-# Define the port for the backend
+# Define the host/port for the backend
+BACKEND_HOST = '0.0.0.0'
 BACKEND_PORT = 8000
 
+# Count in-flight requests so /shutdown can let them finish
+install_drain_hooks(app)
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """
@@ -73,14 +71,10 @@ def shutdown():
     This route is added to the 'app' instance imported from api.py.
     """
     server_logger.info("Shutdown requested.")
-    func = request.environ.get('werkzeug.server.shutdown')
-    if func is None:
-        server_logger.warning("Not running with Werkzeug server, cannot use werkzeug.server.shutdown.")
-        return jsonify({"message": "Server cannot be shut down via this endpoint (not Werkzeug)."})
-    else:
-        func() # Call the Werkzeug shutdown function
-        server_logger.info("Werkzeug server shutdown initiated.")
-        return jsonify({"message": "Server shutting down..."})
+    if not request_shutdown():
+        return jsonify({"message": "Server is already shutting down."})
+    server_logger.info("Draining in-flight requests before stopping the server.")
+    return jsonify({"message": "Server shutting down..."})
 
 # The home route from api.py will now be the default if you have one.
 # If you need a specific root for run_server, you can add it here, but it might conflict
@@ -93,20 +87,25 @@ def shutdown():
 
 def run_flask_app():
     """
-    Runs the Flask application.
+    Runs the Flask application under the configured WSGI server (waitress by default,
+    see wsgi_server.py) until /shutdown or Ctrl+C.
     """
     server_logger.info(f"Starting Flask backend on port {BACKEND_PORT}...")
     try:
         # Use 0.0.0.0 to make it accessible from localhost in Electron
-        # debug=False for production, as debug mode can cause issues with PyInstaller and multiple processes
-          app.run(host='0.0.0.0', port=BACKEND_PORT, debug=True)
+        serve(app, BACKEND_HOST, BACKEND_PORT)
     except Exception as e:
         server_logger.error(f"Failed to start Flask app: {e}")
         # Exit the process if the app fails to start
         sys.exit(1)
+    server_logger.info("Flask backend stopped.")
 
 if __name__ == '__main__':
+    # Report generation uses a process pool; frozen (PyInstaller) workers need this first.
+    multiprocessing.freeze_support()
     # When packaged with PyInstaller, the console output might be redirected.
     # Ensure logs go to a file or are visible for debugging.
     print(f"Flask backend (run_server.py) starting up. PID: {os.getpid()}")
+    # Drains queued deliveries only if the monitoring process is not already doing so
+    start_outbox_drainer()
     run_flask_app()
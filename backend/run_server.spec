@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('version.txt', '.')],
-    hiddenimports=['PIL'],
+    hiddenimports=['PIL', 'waitress'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
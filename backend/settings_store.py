@@ -0,0 +1,332 @@
+"""
+File: settings_store.py
+
+Description:
+------------
+One settings store for the values that used to live in seven JSON files under
+APP_DATA_COMMON_DIR (feature config, lunch-mode backup, website whitelist/blocklist,
+installer whitelist, activation, logged-in user). They are kept as JSON documents in a
+single SQLite database (settings.db) in WAL mode. The API server, the activator and
+the watcher share it, and readers never see a half-written value.
+
+    settings(key, value, generation)   one row per document, value is JSON
+    meta('generation')                 bumped by every commit that changes a value
+
+Reads come from an in-process cache. Before serving a read, the store asks SQLite
+for PRAGMA data_version. It does not change unless another connection committed, so
+the check costs no parse and no disk read. Only when the generation moved are the rows
+written since the cached generation reloaded.
+
+Writes go through transaction(): several keys are changed under one BEGIN IMMEDIATE
+and committed as one new generation. Values that did not change are not written,
+and a transaction with no real change commits nothing.
+
+subscribe() registers a callback for changed keys, whether this process or another
+one made the change. Callbacks run on one "SettingsWatcher" thread and receive
+{key: (old, new)}; the thread polls data_version every POLL_INTERVAL seconds and is
+woken at once by local commits.
+
+The first time the database is opened, existing JSON files are imported and renamed
+to <file>.migrated.
+
+Functions Defined:
+------------------
+get_settings_store()  -> process-wide SettingsStore
+"""
+
+import os
+import copy
+import json
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+from credentials import (SETTINGS_DB_PATH, CONFIG_PATH, BACKUP_FILE_PATH, WHITELIST_FILE, BLOCKLIST_FILE,
+                         WHITELIST_JSON, ACTIVATION_PATH, USER_ID_PATH)
+
+settings_logger = logging.getLogger('settings_logger')
+
+POLL_INTERVAL = 1.0                   # seconds between data_version checks on the watcher thread
+
+# Keys
+CONFIG = "config"                     # feature name -> enabled
+CONFIG_BACKUP = "config_backup"       # config saved by lunch-break mode
+WHITELIST_SITES = "whitelist_sites"   # [site]
+BLOCKLIST_SITES = "blocklist_sites"   # [site]
+INSTALLER_WHITELIST = "installer_whitelist"  # [process name]
+ACTIVATION = "activation"             # {"activationKey", "systemId"}
+USER_INFO = "user_info"               # {"user", "token"}
+
+DEFAULTS = {
+    CONFIG: {},
+    CONFIG_BACKUP: {},
+    WHITELIST_SITES: [],
+    BLOCKLIST_SITES: [],
+    INSTALLER_WHITELIST: [],
+    ACTIVATION: {},
+    USER_INFO: {},
+}
+
+_MISSING = object()
+
+
+def _as_dict(data):
+    return data if isinstance(data, dict) else {}
+
+
+def _as_site_list(data):
+    # The blocklist was written both as a bare list and as {"websites": [...]}.
+    if isinstance(data, dict):
+        data = data.get("websites", [])
+    return list(data) if isinstance(data, list) else []
+
+
+def _as_installer_list(data):
+    if isinstance(data, dict):
+        data = data.get("WHITELISTED_PROCESSES", [])
+    return list(data) if isinstance(data, list) else []
+
+
+# key -> (legacy JSON file, converter to the stored shape)
+LEGACY_FILES = {
+    CONFIG: (CONFIG_PATH, _as_dict),
+    CONFIG_BACKUP: (BACKUP_FILE_PATH, _as_dict),
+    WHITELIST_SITES: (WHITELIST_FILE, _as_site_list),
+    BLOCKLIST_SITES: (BLOCKLIST_FILE, _as_site_list),
+    INSTALLER_WHITELIST: (WHITELIST_JSON, _as_installer_list),
+    ACTIVATION: (ACTIVATION_PATH, _as_dict),
+    USER_INFO: (USER_ID_PATH, _as_dict),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (
+    key        TEXT PRIMARY KEY,
+    value      TEXT NOT NULL,
+    generation INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name  TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (name, value) VALUES ('generation', 0);
+"""
+
+
+class Transaction:
+    """Reads see the transaction's own writes; writes are committed together on exit."""
+
+    def __init__(self, store):
+        self.store = store
+        self.writes = {}
+
+    def get(self, key, default=_MISSING):
+        if key in self.writes:
+            return copy.deepcopy(self.writes[key])
+        return self.store._cached(key, default)
+
+    def set(self, key, value):
+        # Round-trip now so a value that is not JSON fails here, not at commit.
+        self.writes[key] = json.loads(json.dumps(value))
+
+
+class SettingsStore:
+    def __init__(self, path=SETTINGS_DB_PATH, migrate=True, poll_interval=POLL_INTERVAL):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.lock = threading.RLock()
+        self.cache = {}
+        self.generation = -1
+        self.data_version = None
+        self.subscribers = []         # {"callback", "keys", "seen"}
+        self._wake = threading.Event()
+        self._watcher = None
+        self.conn = self._open()
+        if migrate:
+            self._migrate_legacy_files()
+        with self.lock:
+            self._refresh()
+
+    def _open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    # --- reads ------------------------------------------------------------------
+
+    def _refresh(self):
+        """Brings the cache up to date if another connection committed. Caller holds the lock."""
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self.data_version:
+            return
+        own_transaction = self.conn.in_transaction
+        if not own_transaction:
+            self.conn.execute("BEGIN")
+        try:
+            generation = self.conn.execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()[0]
+            if generation != self.generation:
+                rows = self.conn.execute("SELECT key, value FROM settings WHERE generation > ?",
+                                         (self.generation,)).fetchall()
+                for key, raw in rows:
+                    self.cache[key] = json.loads(raw)
+                self.generation = generation
+        finally:
+            if not own_transaction:
+                self.conn.execute("COMMIT")
+        self.data_version = version
+
+    def _cached(self, key, default=_MISSING):
+        if key in self.cache:
+            return copy.deepcopy(self.cache[key])
+        if default is _MISSING:
+            return copy.deepcopy(DEFAULTS.get(key))
+        return default
+
+    def get(self, key, default=_MISSING):
+        """
+        Returns a copy of the value for key (safe to modify). A key that was never
+        written returns default, or its DEFAULTS entry when no default is given.
+        """
+        with self.lock:
+            self._refresh()
+            return self._cached(key, default)
+
+    # --- writes -----------------------------------------------------------------
+
+    @contextmanager
+    def transaction(self):
+        """
+        Yields a Transaction; its writes are committed as one generation when the block
+        exits, or discarded if it raises.
+        """
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._refresh()
+                tx = Transaction(self)
+                yield tx
+                changed = {key: value for key, value in tx.writes.items() if self.cache.get(key, _MISSING) != value}
+                if changed:
+                    generation = self.generation + 1
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO settings (key, value, generation) VALUES (?, ?, ?)",
+                        [(key, json.dumps(value), generation) for key, value in changed.items()])
+                    self.conn.execute("UPDATE meta SET value = ? WHERE name = 'generation'", (generation,))
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            if changed:
+                # Our own commit does not move data_version for this connection.
+                self.cache.update(changed)
+                self.generation = generation
+                settings_logger.info(f"Settings generation {generation}: {', '.join(sorted(changed))}")
+        if changed:
+            self._wake.set()
+
+    def set(self, key, value):
+        with self.transaction() as tx:
+            tx.set(key, value)
+
+    # --- change notifications -------------------------------------------------------
+
+    def subscribe(self, callback, keys=None):
+        """
+        Calls callback({key: (old, new)}) on the watcher thread whenever one of keys
+        (all keys if None) changes, in this process or another.
+        """
+        with self.lock:
+            self._refresh()
+            watched = set(keys) if keys else None
+            seen = {k: copy.deepcopy(v) for k, v in self.cache.items() if watched is None or k in watched}
+            self.subscribers.append({"callback": callback, "keys": watched, "seen": seen})
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, name="SettingsWatcher", daemon=True)
+                self._watcher.start()
+        return callback
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            self.subscribers = [s for s in self.subscribers if s["callback"] != callback]
+
+    def _watch(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            pending = []
+            try:
+                with self.lock:
+                    self._refresh()
+                    for subscriber in self.subscribers:
+                        keys = subscriber["keys"] if subscriber["keys"] is not None else set(self.cache)
+                        changes = {}
+                        for key in keys:
+                            old = subscriber["seen"].get(key, _MISSING)
+                            new = self.cache.get(key, _MISSING)
+                            if old != new:
+                                changes[key] = (None if old is _MISSING else old, copy.deepcopy(new))
+                                subscriber["seen"][key] = copy.deepcopy(new)
+                        if changes:
+                            pending.append((subscriber["callback"], changes))
+            except sqlite3.Error as e:
+                settings_logger.error(f"Settings watcher could not read {self.path}: {e}")
+                continue
+            for callback, changes in pending:
+                try:
+                    callback(changes)
+                except Exception as e:
+                    settings_logger.exception(f"Settings subscriber {callback} failed: {e}")
+
+    # --- migration ------------------------------------------------------------------
+
+    def _migrate_legacy_files(self):
+        """Imports the old JSON files once; keys already in the database are left alone."""
+        imported = []
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                present = {row[0] for row in self.conn.execute("SELECT key FROM settings")}
+                generation = self.conn.execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()[0] + 1
+                for key, (path, convert) in LEGACY_FILES.items():
+                    if key in present or not os.path.exists(path):
+                        continue
+                    try:
+                        with open(path, "r", encoding="utf-8") as f:
+                            value = convert(json.load(f))
+                    except (OSError, ValueError) as e:
+                        print(f"[WARNING] Could not import {path} into the settings store: {e}")
+                        continue
+                    self.conn.execute("INSERT INTO settings (key, value, generation) VALUES (?, ?, ?)",
+                                      (key, json.dumps(value), generation))
+                    imported.append((key, path))
+                if imported:
+                    self.conn.execute("UPDATE meta SET value = ? WHERE name = 'generation'", (generation,))
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        for key, path in imported:
+            try:
+                os.replace(path, path + ".migrated")
+            except OSError as e:
+                print(f"[WARNING] Imported {path} but could not rename it: {e}")
+            print(f"[+] Settings: imported {os.path.basename(path)} as '{key}'")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_settings_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SettingsStore()
+        return _store
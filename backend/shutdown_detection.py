@@ -5,11 +5,9 @@ import time
 import win32api
 import win32con
 import win32event
-from write_report import zip_folder, load_smtp_credentials, send_email_with_zip
-from credentials import REPORT_DIR, CONFIG_PATH
-import json
+from write_report import zip_folder, load_smtp_credentials, flush_reports
+from credentials import REPORT_DIR
 from datetime import datetime
-import os
 
 from page1_func_part1 import (generate_activity_report, generate_mouse_movement_report, 
                               generate_mouse_click_report, generate_screen_lock_report, generate_location_report)
@@ -19,14 +17,14 @@ from page1_func_part2 import ( generate_application_tracking_report,generate_bro
                        generate_keystroke_counter_report,generate_screenshot_capture_report)
 from page2_func_part1 import (generate_website_whitelist_report)
 from html_report import main_html_report
+from rollups import write_hourly_rollups
+from outbox import enqueue
+from settings_store import get_settings_store, CONFIG
 
 # config_path = 'monitoring_config.json'
 
 def load_config():
-    if not os.path.exists(CONFIG_PATH):
-        return {}
-    with open(CONFIG_PATH, 'r') as f:
-        return json.load(f)
+    return get_settings_store().get(CONFIG)
 
 def generate_enabled_reports():
     config = load_config()
@@ -94,6 +92,7 @@ def task_to_run():
             return
 
         generate_enabled_reports()
+        flush_reports()
         # generate_combined_pdf_report(REPORT_DIR, "Report.pdf")
         main_html_report()
 
@@ -101,22 +100,21 @@ def task_to_run():
         # Prepare CC list
         cc_list = [email for email in [cc1, cc2] if email]
 
-        # Create ZIP and send
+        # Create ZIP and queue the mail; the outbox drainer sends it (and retries while offline)
         zip_path = zip_folder()
-        send_email_with_zip(
-            from_addr=from_email,
-            password=password,
-            to_addr=to_email,
-            subject="Daily Report From Cubi-View",
-            body="Dear Team,\nPlease find the attached ZIP file containing today's report.\n\nWarm Regards,\nTeam CuBIT.",
-            attachment_path=zip_path,
-            cc_list=cc_list,
-            smtp_server_add=smtp_server, 
-            smtp_port_add = smtp_port
-        )
-        print("[+] Mail sent successfully")
+        if not zip_path:
+            print("[!] No report zip was created; mail not queued")
+            return
+        job_id = enqueue("email", {
+            "to_addr": to_email,
+            "cc_list": cc_list,
+            "subject": f"Daily Report From Cubi-View - {datetime.now().strftime('%d-%m-%Y')}",
+            "body": "Dear Team,\nPlease find the attached ZIP file containing today's report.\n\nWarm Regards,\nTeam CuBIT.",
+            "attachment_path": zip_path,
+        }, key=f"email:{zip_path}")
+        print(f"[+] Mail queued for delivery (job {job_id})")
     except Exception as e:
-        print(f"[!] Error during zip creation / Mail not sent")
+        print(f"[!] Error during zip creation / Mail not queued: {e}")
 
 
 
@@ -180,6 +178,9 @@ def run_schedule():
     def hourly_wrapper():
         print(f"[+] Hourly report generated at {datetime.now().strftime('%H:%M')}")
         generate_enabled_reports()
+        flush_reports()
+        # Precompute this hour's partial so the nightly report only merges rollups.
+        write_hourly_rollups()
 
     # Schedule daily task
     schedule.every().day.at("23:59").do(daily_wrapper)
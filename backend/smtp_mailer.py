@@ -0,0 +1,311 @@
+"""
+File: smtp_mailer.py
+
+Description:
+------------
+Memory-bounded e-mail sending with reusable SMTP sessions.
+
+Messages are not built in memory. The headers and text part are rendered with the
+email package (a few KB), and the attachment is base64-encoded from disk in 57 KB
+blocks and written straight into the SMTP DATA stream. Peak memory stays at one
+block, whatever the size of the archive.
+
+Attachments larger than the per-message limit (EMAIL_ATTACHMENT_BUDGET) are split
+into byte ranges and sent as several messages: <name>.001, <name>.002, ... . The
+recipient joins them with "copy /b name.001+name.002 name" (Windows) or
+"cat name.0* > name".
+
+Authenticated sessions are pooled per (server, port, sender). Consecutive sends in
+one run (test e-mail, report e-mail, the parts of a split archive, outbox retries)
+reuse the connection instead of paying for a TLS handshake and login each time. An
+idle session is checked with NOOP before reuse and closed after IDLE_TIMEOUT.
+
+Port 465 uses implicit TLS (SMTP_SSL); other ports use STARTTLS, which is required
+unless the server is on the local machine.
+
+Functions Defined:
+------------------
+send_mail()      -> send a message (optionally with a split, streamed attachment)
+get_smtp_pool()  -> the process-wide SMTP session pool
+"""
+
+import os
+import re
+import ssl
+import time
+import base64
+import smtplib
+import hashlib
+import logging
+import threading
+from email.message import EmailMessage
+from email.policy import SMTP as SMTP_POLICY
+from email.utils import formatdate, make_msgid
+
+from credentials import EMAIL_ATTACHMENT_BUDGET
+
+B64_BLOCK = 57 * 1024                 # raw bytes per read: a multiple of 57 gives whole 76-char lines
+B64_LINE = 57                         # raw bytes per encoded line
+IDLE_TIMEOUT = 120.0                  # seconds an unused session is kept open
+CONNECT_TIMEOUT = 30
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1")
+
+smtp_mailer_logger = logging.getLogger('smtp_mailer_logger')
+
+
+# --- session pool ---------------------------------------------------------------
+
+class SMTPSessionPool:
+    """Keeps at most one idle authenticated session per (server, port, sender)."""
+
+    def __init__(self, idle_timeout=IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self.lock = threading.Lock()
+        self.idle = {}                # key -> (smtp, secret digest, released_at)
+        self.stats = {"connects": 0, "reuses": 0}
+        self._reaper = None
+
+    @staticmethod
+    def _digest(password):
+        return hashlib.sha256(password.encode("utf-8")).hexdigest()
+
+    def _connect(self, server, port, user, password):
+        context = ssl.create_default_context()
+        if int(port) == 465:
+            smtp = smtplib.SMTP_SSL(server, port, context=context, timeout=CONNECT_TIMEOUT)
+        else:
+            smtp = smtplib.SMTP(server, port, timeout=CONNECT_TIMEOUT)
+            smtp.ehlo()
+            if smtp.has_extn("starttls"):
+                smtp.starttls(context=context)
+                smtp.ehlo()
+            elif server not in LOCAL_HOSTS:
+                smtp.close()
+                raise smtplib.SMTPNotSupportedError(f"{server}:{port} does not offer STARTTLS; refusing to log in in clear text")
+        if password and smtp.has_extn("auth"):
+            smtp.login(user, password)
+        with self.lock:
+            self.stats["connects"] += 1
+        return smtp
+
+    def acquire(self, server, port, user, password):
+        key = (server, int(port), user)
+        digest = self._digest(password or "")
+        with self.lock:
+            entry = self.idle.pop(key, None)
+        if entry:
+            smtp, entry_digest, released_at = entry
+            fresh = entry_digest == digest and time.monotonic() - released_at < self.idle_timeout
+            try:
+                if fresh and smtp.noop()[0] == 250:
+                    with self.lock:
+                        self.stats["reuses"] += 1
+                    return smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._quit(smtp)
+        return self._connect(server, port, user, password)
+
+    def release(self, smtp, server, port, user, password, reusable=True):
+        if not reusable:
+            self._quit(smtp)
+            return
+        key = (server, int(port), user)
+        with self.lock:
+            old = self.idle.get(key)
+            self.idle[key] = (smtp, self._digest(password or ""), time.monotonic())
+        if old:
+            self._quit(old[0])
+        self._schedule_reap()
+
+    def _schedule_reap(self):
+        with self.lock:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Timer(self.idle_timeout, self._reap)
+            self._reaper.daemon = True
+            self._reaper.start()
+
+    def _reap(self):
+        now = time.monotonic()
+        with self.lock:
+            self._reaper = None
+            expired = [k for k, (_, _, at) in self.idle.items() if now - at >= self.idle_timeout]
+            sessions = [self.idle.pop(k)[0] for k in expired]
+            remaining = bool(self.idle)
+        for smtp in sessions:
+            self._quit(smtp)
+        if remaining:
+            self._schedule_reap()
+
+    @staticmethod
+    def _quit(smtp):
+        try:
+            smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+
+    def close_all(self):
+        with self.lock:
+            sessions = [entry[0] for entry in self.idle.values()]
+            self.idle.clear()
+        for smtp in sessions:
+            self._quit(smtp)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_smtp_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SMTPSessionPool()
+        return _pool
+
+
+# --- streamed message -------------------------------------------------------------
+
+def _dot_stuff(data):
+    """RFC 5321 transparency: a line starting with '.' gets a second '.'."""
+    return re.sub(rb"(?m)^\.", b"..", data)
+
+
+def _render_head(from_addr, to_addr, cc_list, subject, body, boundary):
+    """Top-level headers plus the text part, ready for the DATA stream."""
+    outer = EmailMessage(policy=SMTP_POLICY)
+    outer["From"] = from_addr
+    outer["To"] = to_addr
+    if cc_list:
+        outer["Cc"] = ", ".join(cc_list)
+    outer["Subject"] = subject
+    outer["Date"] = formatdate(localtime=True)
+    outer["Message-ID"] = make_msgid()
+    outer["MIME-Version"] = "1.0"
+    outer["Content-Type"] = f'multipart/mixed; boundary="{boundary}"'
+    text = EmailMessage(policy=SMTP_POLICY)
+    text.set_content(body)
+    del text["MIME-Version"]
+    # Headers only: generating `outer` itself would also emit an (empty) multipart body.
+    headers = b"".join(SMTP_POLICY.fold_binary(name, value) for name, value in outer.items())
+    return (headers + b"\r\nThis is a multi-part message in MIME format.\r\n"
+            + f"--{boundary}\r\n".encode() + text.as_bytes() + b"\r\n")
+
+
+def _base64_lines(path, offset, length):
+    """Yields the base64 encoding of path[offset:offset+length] in CRLF-terminated blocks."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        remaining = length
+        while remaining > 0:
+            block = f.read(min(B64_BLOCK, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            encoded = base64.b64encode(block)
+            line = B64_LINE * 4 // 3
+            yield b"\r\n".join(encoded[i:i + line] for i in range(0, len(encoded), line)) + b"\r\n"
+
+
+def _message_chunks(from_addr, to_addr, cc_list, subject, body, attachment=None):
+    """
+    Yields the message as dot-stuffed byte chunks.
+
+    :param attachment: (path, offset, length, filename, content type) or None.
+    """
+    boundary = "=_cubiview_" + os.urandom(12).hex()
+    yield _dot_stuff(_render_head(from_addr, to_addr, cc_list, subject, body, boundary))
+    if attachment:
+        path, offset, length, filename, content_type = attachment
+        yield (f"--{boundary}\r\n"
+               f"Content-Type: {content_type}\r\n"
+               f'Content-Disposition: attachment; filename="{filename}"\r\n'
+               f"Content-Transfer-Encoding: base64\r\n\r\n").encode()
+        # Base64 lines never start with '.', so the attachment needs no dot-stuffing.
+        yield from _base64_lines(path, offset, length)
+    yield f"--{boundary}--\r\n".encode()
+
+
+def _send_streamed(smtp, from_addr, recipients, chunks):
+    code, resp = smtp.mail(from_addr)
+    if code != 250:
+        raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+    refused = {}
+    for rcpt in recipients:
+        code, resp = smtp.rcpt(rcpt)
+        if code not in (250, 251):
+            refused[rcpt] = (code, resp)
+    if len(refused) == len(recipients):
+        smtp.rset()
+        raise smtplib.SMTPRecipientsRefused(refused)
+    code, resp = smtp.docmd("data")
+    if code != 354:
+        raise smtplib.SMTPDataError(code, resp)
+    for chunk in chunks:
+        smtp.send(chunk)
+    smtp.send(b".\r\n")
+    code, resp = smtp.getreply()
+    if code != 250:
+        raise smtplib.SMTPDataError(code, resp)
+    return refused
+
+
+def _parts(attachment_path, max_size):
+    """[(offset, length, filename, content type, index, count)] covering the attachment."""
+    size = os.path.getsize(attachment_path)
+    name = os.path.basename(attachment_path)
+    content_type = "application/zip" if name.lower().endswith(".zip") else "application/octet-stream"
+    if not max_size or size <= max_size:
+        return [(0, size, name, content_type, 1, 1)]
+    count = -(-size // max_size)
+    return [(i * max_size, min(max_size, size - i * max_size), f"{name}.{i + 1:03d}", "application/octet-stream", i + 1, count)
+            for i in range(count)]
+
+
+def send_mail(from_addr, password, to_addr, subject, body, attachment_path=None, cc_list=None,
+              smtp_server="smtp.gmail.com", smtp_port=465, max_attachment_size=EMAIL_ATTACHMENT_BUDGET,
+              pool=None):
+    """
+    Sends one message, or one per attachment part when the attachment is larger than
+    max_attachment_size. Raises smtplib.SMTPException / OSError on failure; a session
+    that failed mid-message is closed rather than returned to the pool.
+
+    :returns: Number of messages sent.
+    """
+    pool = pool or get_smtp_pool()
+    cc_list = cc_list or []
+    recipients = [to_addr] + list(cc_list)
+
+    if attachment_path:
+        parts = _parts(attachment_path, max_attachment_size)
+    else:
+        parts = [None]
+    if len(parts) > 1:
+        smtp_mailer_logger.info(f"Splitting {attachment_path} into {len(parts)} messages of at most {max_attachment_size} bytes")
+
+    for part in parts:
+        part_subject, part_body, attachment = subject, body, None
+        if part:
+            offset, length, filename, content_type, index, count = part
+            attachment = (attachment_path, offset, length, filename, content_type)
+            if count > 1:
+                base_name = os.path.basename(attachment_path)
+                part_subject = f"{subject} (part {index}/{count})"
+                part_body = (f"{body}\n\nThe attachment {base_name} was split into {count} parts because of the "
+                             f"e-mail size limit. This is part {index} of {count}. Save all parts in one folder "
+                             f"and join them:\n  Windows: copy /b {base_name}.0* {base_name}\n"
+                             f"  macOS/Linux: cat {base_name}.0* > {base_name}")
+
+        smtp = pool.acquire(smtp_server, smtp_port, from_addr, password)
+        reusable = False
+        try:
+            _send_streamed(smtp, from_addr, recipients,
+                           _message_chunks(from_addr, to_addr, cc_list, part_subject, part_body, attachment))
+            reusable = True
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused):
+            reusable = True               # rejected before DATA; the session is still usable
+            raise
+        finally:
+            pool.release(smtp, smtp_server, smtp_port, from_addr, password, reusable=reusable)
+    return len(parts)
@@ -0,0 +1,111 @@
+"""
+File: summary_scanner.py
+
+Description:
+------------
+Single-pass scanner for the summary counters of the legacy .txt reports
+(activity, keystroke and mouse click reports).
+
+Each report has one precompiled alternation pattern covering all of its counter
+keywords ("Working Time|Idle Time", "Total Keystrokes|Total Words Typed", ...), run
+with finditer over the raw bytes in 1 MB chunks, so every file is read exactly once
+and no pattern is compiled per line. The files can be scanned concurrently in a
+thread pool, and the time spent on each file is reported so the slowest source is
+visible.
+
+Functions Defined:
+------------------
+scan_summary_file()     -> counters of one report file
+scan_summary_counters() -> counters of every summary report in a directory, plus per-file timings
+"""
+
+import os
+import re
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor
+
+CHUNK_SIZE = 1 << 20
+
+# filename -> (label used in warnings, {keyword: counter field})
+SUMMARY_SOURCES = {
+    "activity_report.txt": ("Activity", {"Working Time": "active_time", "Idle Time": "idle_time"}),
+    "keystroke_report.txt": ("Keystroke", {"Total Keystrokes": "total_keystrokes", "Total Words Typed": "total_words"}),
+    "mouse_click_report.txt": ("Mouse click", {"Total Clicks": "total_clicks"}),
+}
+
+
+def _compile(keywords):
+    # keyword, then anything but digits on the same line, then the value
+    alternation = b"|".join(re.escape(k.encode()) for k in sorted(keywords, key=len, reverse=True))
+    return re.compile(rb"(" + alternation + rb")[^\d\n]*(\d+)")
+
+
+_PATTERNS = {name: _compile(keywords) for name, (_, keywords) in SUMMARY_SOURCES.items()}
+
+
+def scan_summary_file(path, keywords, pattern=None, chunk_size=CHUNK_SIZE):
+    """
+    Sums every "<keyword> ... <number>" occurrence in a file in one pass.
+
+    :param keywords: {keyword: counter field}
+    :param pattern: Precompiled alternation for the keywords; compiled on the fly if omitted.
+    :returns: {counter field: total}
+    """
+    pattern = pattern or _compile(keywords)
+    fields = {k.encode(): field for k, field in keywords.items()}
+    totals = dict.fromkeys(keywords.values(), 0)
+    with open(path, "rb") as f:
+        pending = b""
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                data, pending = pending, b""
+            else:
+                data = pending + chunk
+                end = data.rfind(b"\n")
+                if end < 0:
+                    pending = data
+                    continue
+                data, pending = data[:end + 1], data[end + 1:]
+            for match in pattern.finditer(data):
+                totals[fields[match.group(1)]] += int(match.group(2))
+            if not chunk:
+                break
+    return totals
+
+
+def _scan_source(report_dir, filename):
+    label, keywords = SUMMARY_SOURCES[filename]
+    path = os.path.join(report_dir, filename)
+    start = perf_counter()
+    if not os.path.exists(path):
+        print(f"[WARNING] {label} report not found: {path}")
+        return filename, {}, 0.0
+    try:
+        totals = scan_summary_file(path, keywords, _PATTERNS[filename])
+    except Exception as e:
+        print(f"[ERROR] Could not read {label.lower()} report {path}: {e}")
+        totals = {}
+    return filename, totals, perf_counter() - start
+
+
+def scan_summary_counters(report_dir, parallel=True):
+    """
+    Scans every summary report of a directory.
+
+    :param parallel: Scan the files concurrently in a thread pool.
+    :returns: ({counter field: total}, {filename: seconds spent})
+    """
+    totals = {field: 0 for _, keywords in SUMMARY_SOURCES.values() for field in keywords.values()}
+    timings = {}
+    if parallel:
+        with ThreadPoolExecutor(max_workers=len(SUMMARY_SOURCES), thread_name_prefix="SummaryScan") as executor:
+            results = list(executor.map(lambda name: _scan_source(report_dir, name), SUMMARY_SOURCES))
+    else:
+        results = [_scan_source(report_dir, name) for name in SUMMARY_SOURCES]
+
+    for filename, file_totals, elapsed in results:
+        timings[filename] = elapsed
+        for field, value in file_totals.items():
+            totals[field] += value
+    return totals, timings
@@ -0,0 +1,113 @@
+"""
+File: svg_charts.py
+
+Description:
+------------
+Dependency-free SVG renderer for the charts in CubiView_Summary_Report.html.
+
+Produces the same two charts the matplotlib backend draws (a horizontal bar chart for
+the top applications/URLs and an active/idle donut chart) as inline <svg> markup, so
+the report needs neither matplotlib/numpy at import time nor separate image files.
+
+Functions Defined:
+------------------
+render_bar_chart_svg()   -> horizontal bar chart markup
+render_donut_chart_svg() -> donut chart markup with percentage legend
+"""
+
+import math
+from xml.sax.saxutils import escape
+
+FONT = "font-family='Segoe UI, sans-serif'"
+CHAR_WIDTH = 6.6       # approximate width of one 12px character
+ROW_HEIGHT = 28
+BAR_HEIGHT = 18
+
+
+def _default_value_format(value):
+    return f"{value:.0f}s"
+
+
+def render_bar_chart_svg(labels, values, title, xlabel="Duration (seconds)", color="skyblue",
+                         width=560, value_format=_default_value_format):
+    """
+    Renders a horizontal bar chart with the largest value on top.
+
+    :param labels: Bar labels, already shortened (see html_report.make_unique_labels).
+    :param values: Numeric values, one per label.
+    :param value_format: Callable used for the text drawn at the end of each bar.
+    """
+    if not labels:
+        return ""
+    label_width = min(260, int(max(len(label) for label in labels) * CHAR_WIDTH) + 12)
+    value_width = 80
+    top, bottom = 34, 40
+    plot_width = max(60, width - label_width - value_width)
+    height = top + ROW_HEIGHT * len(labels) + bottom
+    max_value = max(values) or 1
+
+    parts = [
+        f"<svg xmlns='http://www.w3.org/2000/svg' width='{width}' height='{height}' viewBox='0 0 {width} {height}' {FONT} role='img'>",
+        f"<title>{escape(title)}</title>",
+        f"<text x='{width / 2:.1f}' y='20' text-anchor='middle' font-size='15' font-weight='bold' fill='#333'>{escape(title)}</text>",
+    ]
+    for i, (label, value) in enumerate(zip(labels, values)):
+        y = top + i * ROW_HEIGHT
+        bar_length = max(1.0, plot_width * value / max_value) if value > 0 else 0
+        text_y = y + BAR_HEIGHT / 2 + 4
+        parts.append(f"<text x='{label_width - 8}' y='{text_y:.1f}' text-anchor='end' font-size='12' fill='#333'>{escape(label)}</text>")
+        parts.append(f"<rect x='{label_width}' y='{y}' width='{bar_length:.1f}' height='{BAR_HEIGHT}' fill='{color}'/>")
+        parts.append(f"<text x='{label_width + bar_length + 6:.1f}' y='{text_y:.1f}' font-size='11' fill='#555'>{escape(value_format(value))}</text>")
+
+    axis_y = top + ROW_HEIGHT * len(labels)
+    parts.append(f"<line x1='{label_width}' y1='{top - 4}' x2='{label_width}' y2='{axis_y}' stroke='#888'/>")
+    parts.append(f"<line x1='{label_width}' y1='{axis_y}' x2='{label_width + plot_width}' y2='{axis_y}' stroke='#888'/>")
+    parts.append(f"<text x='{label_width + plot_width / 2:.1f}' y='{axis_y + 26}' text-anchor='middle' font-size='12' fill='#333'>{escape(xlabel)}</text>")
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+def render_donut_chart_svg(values, labels, colors, size=300, summary=None):
+    """
+    Renders a donut chart with a percentage legend and an optional summary line below it.
+    Returns an empty string when all values are zero.
+
+    :param summary: Callable receiving the list of percentages and returning the summary text.
+    """
+    total = sum(values)
+    if total <= 0:
+        return ""
+    percentages = [value / total * 100 for value in values]
+
+    cx = cy = size / 2
+    radius = size * 0.34
+    ring = size * 0.14
+    circumference = 2 * math.pi * radius
+    legend_top = size + 8
+    height = legend_top + 22 * len(values) + 30
+
+    parts = [
+        f"<svg xmlns='http://www.w3.org/2000/svg' width='{size}' height='{height}' viewBox='0 0 {size} {height}' {FONT} role='img'>",
+        f"<title>{escape(' vs '.join(labels))}</title>",
+    ]
+    offset = 0.0
+    for value, color in zip(values, colors):
+        length = circumference * value / total
+        if length > 0:
+            # Each segment is a dashed stroke on the same circle, starting at 12 o'clock.
+            parts.append(
+                f"<circle cx='{cx}' cy='{cy}' r='{radius:.2f}' fill='none' stroke='{color}' stroke-width='{ring:.2f}' "
+                f"stroke-dasharray='{length:.3f} {circumference - length:.3f}' stroke-dashoffset='{-offset:.3f}' "
+                f"transform='rotate(-90 {cx} {cy})'/>"
+            )
+        offset += length
+
+    for i, (label, color, pct) in enumerate(zip(labels, colors, percentages)):
+        y = legend_top + i * 22
+        parts.append(f"<rect x='{size * 0.2:.1f}' y='{y}' width='14' height='14' fill='{color}'/>")
+        parts.append(f"<text x='{size * 0.2 + 22:.1f}' y='{y + 12}' font-size='13' fill='#333'>{escape(label)}: {pct:.1f}%</text>")
+
+    if summary:
+        parts.append(f"<text x='{cx}' y='{height - 10}' text-anchor='middle' font-size='13' font-weight='bold' fill='#333'>{escape(summary(percentages))}</text>")
+    parts.append("</svg>")
+    return "".join(parts)
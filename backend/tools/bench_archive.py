@@ -0,0 +1,142 @@
+"""
+File: tools/bench_archive.py
+
+Description:
+------------
+Compares report zip builds on a synthetic day (tools/synth_workload.py) plus synthetic
+media: screenshots, screen recording clips and an audio capture.
+
+Three strategies are timed from scratch (no existing archive) over --repeat runs:
+
+    legacy           ZipFile.write with ZIP_DEFLATED for every file (the old behaviour)
+    policy_serial    report_archive.build_archive with COMPRESSION_POLICY, one thread
+    policy_parallel  the same with the compression worker pool
+
+and reported with min/median wall time, archive size and compression ratio.
+
+Usage:
+------
+    python tools/bench_archive.py [--scale 10] [--screenshots 300] [--clips 4] [--repeat 3] [--json out.json]
+
+Functions Defined:
+------------------
+add_media()       -> write synthetic screenshots, clips and audio into a day directory
+run_benchmarks()  -> {strategy: {"min", "median", "bytes", "ratio"}}
+"""
+
+import os
+import sys
+import json
+import math
+import wave
+import random
+import struct
+import shutil
+import zipfile
+import argparse
+import tempfile
+import statistics
+from time import perf_counter
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from report_archive import build_archive, manifest_path  # noqa: E402
+from synth_workload import generate_day  # noqa: E402
+
+
+def add_media(report_dir, screenshots=300, clips=4, seed=1):
+    """
+    Adds media the way the trackers leave it in a day folder. PNG/MP4 payloads are
+    random bytes, which deflate exactly as badly as the real (already compressed)
+    files; the WAV is an uncompressed tone, which deflate does shrink.
+    """
+    rng = random.Random(seed)
+    shots_dir = os.path.join(report_dir, "Screenshots")
+    clips_dir = os.path.join(report_dir, "captured_clips")
+    os.makedirs(shots_dir, exist_ok=True)
+    os.makedirs(clips_dir, exist_ok=True)
+    for i in range(screenshots):
+        with open(os.path.join(shots_dir, f"screenshot_{i:04d}.png"), "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n" + rng.randbytes(rng.randint(150_000, 400_000)))
+    for i in range(clips):
+        with open(os.path.join(clips_dir, f"clip_{i}.mp4"), "wb") as f:
+            f.write(rng.randbytes(8 * 1024 * 1024))
+    with wave.open(os.path.join(clips_dir, "audio_capture.wav"), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(16000)
+        w.writeframes(b"".join(struct.pack("<h", int(8000 * math.sin(n / 8))) for n in range(16000 * 30)))
+
+
+def _files(report_dir):
+    files = []
+    for root, _, names in os.walk(report_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            files.append((path, os.path.relpath(path, report_dir)))
+    return files
+
+
+def _legacy(zip_path, files):
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for path, arcname in files:
+            zipf.write(path, arcname)
+
+
+def run_benchmarks(report_dir, out_dir, repeat):
+    files = _files(report_dir)
+    input_bytes = sum(os.path.getsize(path) for path, _ in files)
+    zip_path = os.path.join(out_dir, "bench.zip")
+    strategies = [
+        ("legacy", lambda: _legacy(zip_path, files)),
+        ("policy_serial", lambda: build_archive(zip_path, files, workers=1)),
+        ("policy_parallel", lambda: build_archive(zip_path, files)),
+    ]
+    print(f"[+] {len(files)} files, {input_bytes / 1024 / 1024:.1f} MB of input")
+
+    results = {}
+    for name, func in strategies:
+        durations = []
+        for _ in range(repeat):
+            for path in (zip_path, manifest_path(zip_path)):
+                if os.path.exists(path):
+                    os.remove(path)
+            start = perf_counter()
+            func()
+            durations.append(perf_counter() - start)
+        size = os.path.getsize(zip_path)
+        results[name] = {"min": min(durations), "median": statistics.median(durations),
+                         "bytes": size, "ratio": size / input_bytes}
+        print(f"    {name:<16} min {min(durations) * 1000:9.1f} ms   median {statistics.median(durations) * 1000:9.1f} ms"
+              f"   {size / 1024 / 1024:8.1f} MB   ratio {size / input_bytes:.3f}")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare report zip strategies on a synthetic day.")
+    parser.add_argument("--scale", type=float, default=10, help="event rate multiplier for the text reports")
+    parser.add_argument("--screenshots", type=int, default=300)
+    parser.add_argument("--clips", type=int, default=4, help="8 MB screen recording clips")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="cubiview-archive-bench-")
+    try:
+        report_dir = generate_day(os.path.join(work_dir, "data"), scale=args.scale)
+        add_media(report_dir, args.screenshots, args.clips)
+        results = run_benchmarks(report_dir, work_dir, args.repeat)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[+] Results written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
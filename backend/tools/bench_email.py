@@ -0,0 +1,185 @@
+"""
+File: tools/bench_email.py
+
+Description:
+------------
+Measures e-mail sending against a local SMTP sink (no real mail server or network).
+
+    legacy     EmailMessage + f.read() + send_message, new connection per e-mail
+               (the old send_email_with_zip)
+    streamed   smtp_mailer.send_mail: base64 streamed from disk, pooled session,
+               split into parts over --max-part MB
+
+For each strategy, --sends e-mails carrying an --size MB archive are sent. The tool
+reports peak Python heap (tracemalloc), wall time and SMTP connections. It then
+checks that the sink's received messages decode back to the original archive (parts
+joined in order).
+
+Usage:
+------
+    python tools/bench_email.py [--size 100] [--sends 3] [--max-part 18]
+
+Functions Defined:
+------------------
+SmtpSink          -> minimal threaded SMTP server that stores received messages
+run_benchmarks()  -> {strategy: {"peak_mb", "seconds", "connections", "verified"}}
+"""
+
+import os
+import sys
+import time
+import email
+import hashlib
+import smtplib
+import argparse
+import tempfile
+import threading
+import tracemalloc
+import socketserver
+from email.message import EmailMessage
+from email.policy import default as default_policy
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from smtp_mailer import SMTPSessionPool, send_mail  # noqa: E402
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    """Accepts every message; writes each to spool_dir instead of keeping it in memory."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, spool_dir):
+        super().__init__(("127.0.0.1", 0), _SinkHandler)
+        self.spool_dir = spool_dir
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = []
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _SinkHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        sink = self.server
+        with sink.lock:
+            sink.connections += 1
+        self._reply("220 sink ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.strip().decode(errors="replace").upper()
+            if command.startswith("EHLO"):
+                self.wfile.write(b"250-sink\r\n250 SIZE 0\r\n")
+            elif command.startswith(("HELO", "MAIL", "RCPT", "RSET", "NOOP")):
+                self._reply("250 OK")
+            elif command == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                with sink.lock:
+                    path = os.path.join(sink.spool_dir, f"{len(sink.messages):04d}.eml")
+                    sink.messages.append(path)
+                with open(path, "wb") as f:
+                    for data in iter(self.rfile.readline, b""):
+                        if data == b".\r\n":
+                            break
+                        f.write(data[1:] if data.startswith(b"..") else data)
+                self._reply("250 Queued")
+            elif command == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Not implemented")
+
+
+def _legacy_send(port, path):
+    msg = EmailMessage()
+    msg["From"] = "bench@example.com"
+    msg["To"] = "to@example.com"
+    msg["Subject"] = "bench"
+    msg.set_content("Benchmark message")
+    with open(path, "rb") as f:
+        msg.add_attachment(f.read(), maintype="application", subtype="zip", filename=os.path.basename(path))
+    with smtplib.SMTP("127.0.0.1", port) as server:
+        server.send_message(msg, to_addrs=["to@example.com"])
+
+
+def _streamed_send(port, path, pool, max_part):
+    send_mail("bench@example.com", "", "to@example.com", "bench", "Benchmark message", attachment_path=path,
+              smtp_server="127.0.0.1", smtp_port=port, max_attachment_size=max_part, pool=pool)
+
+
+def _verify(messages, expected_sha256, sends):
+    """Joins the attachment parts of each e-mail (in order) and compares checksums."""
+    per_send = len(messages) // sends
+    for i in range(sends):
+        digest = hashlib.sha256()
+        for path in messages[i * per_send:(i + 1) * per_send]:
+            with open(path, "rb") as f:
+                message = email.message_from_binary_file(f, policy=default_policy)
+            for part in message.iter_attachments():
+                digest.update(part.get_content())
+        if digest.hexdigest() != expected_sha256:
+            return False
+    return True
+
+
+def run_benchmarks(size_mb, sends, max_part_mb):
+    work_dir = tempfile.mkdtemp(prefix="cubiview-email-bench-")
+    archive = os.path.join(work_dir, "CubiView_Report.zip")
+    with open(archive, "wb") as f:
+        for _ in range(size_mb):
+            f.write(os.urandom(1024 * 1024))
+    with open(archive, "rb") as f:
+        expected = hashlib.file_digest(f, "sha256").hexdigest()
+
+    results = {}
+    for name in ("legacy", "streamed"):
+        spool = os.path.join(work_dir, name)
+        os.makedirs(spool)
+        sink = SmtpSink(spool).start()
+        port = sink.server_address[1]
+        pool = SMTPSessionPool()
+        tracemalloc.start()
+        start = time.perf_counter()
+        for _ in range(sends):
+            if name == "legacy":
+                _legacy_send(port, archive)
+            else:
+                _streamed_send(port, archive, pool, max_part_mb * 1024 * 1024)
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        pool.close_all()
+        sink.shutdown()
+        verified = _verify(sink.messages, expected, sends)
+        results[name] = {"peak_mb": peak / 1024 / 1024, "seconds": seconds, "connections": sink.connections,
+                         "messages": len(sink.messages), "verified": verified}
+        for path in sink.messages:
+            os.remove(path)
+        print(f"    {name:<9} peak {peak / 1024 / 1024:8.1f} MB   {seconds:6.2f} s   "
+              f"{sink.connections} connection(s)   {len(sink.messages)} message(s)   verified={verified}")
+    os.remove(archive)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare e-mail sending strategies against a local SMTP sink.")
+    parser.add_argument("--size", type=int, default=100, help="archive size in MB")
+    parser.add_argument("--sends", type=int, default=3, help="e-mails per strategy")
+    parser.add_argument("--max-part", type=int, default=18, help="largest attachment per message in MB")
+    args = parser.parse_args(argv)
+
+    print(f"[+] {args.sends} e-mail(s) with a {args.size} MB archive each")
+    results = run_benchmarks(args.size, args.sends, args.max_part)
+    return 0 if all(r["verified"] for r in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
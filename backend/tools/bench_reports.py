@@ -0,0 +1,190 @@
+"""
+File: tools/bench_reports.py
+
+Description:
+------------
+Benchmarks the report pipeline (html_report.py) on synthetic days at 1x, 10x and
+100x a normal day's event volume. Runs on plain Linux: only the report modules are
+imported, never the Windows trackers.
+
+Each case is timed with time.perf_counter over --repeat runs and reported as min and
+median. Results can be saved with --json and compared against a previous run with
+--baseline; the script exits with status 1 when a case got slower than
+--threshold times its baseline median, so it can gate a rollout.
+
+Usage:
+------
+    python tools/bench_reports.py [--scales 1,10,100] [--repeat 5] [--json out.json] [--baseline base.json]
+
+Functions Defined:
+------------------
+run_benchmarks() -> {scale: {case: {"min": s, "median": s}}}
+"""
+
+import os
+import io
+import sys
+import json
+import shutil
+import logging
+import argparse
+import tempfile
+import statistics
+import contextlib
+from time import perf_counter
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import html_report as hr  # noqa: E402
+from chart_cache import CHART_CACHE_DIRNAME  # noqa: E402
+from event_journal import JOURNAL_FILENAME, JournalSummary, fold_journal  # noqa: E402
+from report_archive import manifest_path  # noqa: E402
+from svg_charts import render_bar_chart_svg, render_donut_chart_svg  # noqa: E402
+from synth_workload import generate_day  # noqa: E402
+
+
+def _quiet(func):
+    """Runs func with stdout discarded, so the pipeline's progress prints are not timed into the console."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func()
+
+
+def _time(func, repeat, setup=None):
+    durations = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = perf_counter()
+        _quiet(func)
+        durations.append(perf_counter() - start)
+    return {"min": min(durations), "median": statistics.median(durations)}
+
+
+def _cases(report_dir, date_str, scratch_dir):
+    context = hr.ReportContext(report_dir, date_str, os.path.basename(report_dir))
+    _quiet(lambda: hr.parse_reports(context))
+    context.application_data = _quiet(lambda: hr.parse_application_report(os.path.join(report_dir, "application_report.txt")))
+    context.browser_data = _quiet(lambda: hr.parse_browser_report(os.path.join(report_dir, "browser_report.txt")))
+    # Same inputs (the optional .txt sections are read from report_dir), outputs in scratch_dir
+    html_context = hr.ReportContext(report_dir, date_str)
+    scratch_paths = hr.ReportContext(scratch_dir, date_str)
+    for name in ("output_html", "app_bar_path", "browser_bar_path", "pie_chart_path"):
+        setattr(html_context, name, getattr(scratch_paths, name))
+    for name in ("active_time", "idle_time", "total_keystrokes", "total_words", "total_clicks", "application_data", "browser_data"):
+        setattr(html_context, name, getattr(context, name))
+
+    def svg_charts():
+        render_bar_chart_svg(hr.make_unique_labels(context.application_data), [d for _, d in context.application_data], "Top 5 Applications")
+        render_bar_chart_svg(hr.make_unique_labels(context.browser_data), [d for _, d in context.browser_data], "Top 5 URLs")
+        render_donut_chart_svg([context.active_time, context.idle_time], hr.ACTIVITY_LABELS, hr.ACTIVITY_COLORS)
+
+    def matplotlib_charts():
+        hr.generate_bar_chart(context.application_data, html_context.app_bar_path, "Top 5 Applications", label_type="title")
+        hr.generate_bar_chart(context.browser_data, html_context.browser_bar_path, "Top 5 URLs", label_type="url")
+        hr.generate_pie_activity_track(html_context.pie_chart_path, context.active_time, context.idle_time)
+
+    def clear_chart_cache():
+        shutil.rmtree(os.path.join(scratch_dir, CHART_CACHE_DIRNAME), ignore_errors=True)
+
+    zip_path = os.path.join(scratch_dir, "bench.zip")
+
+    def clear_zip():
+        # build_archive skips unchanged archives; time a full build on every repeat
+        for path in (zip_path, manifest_path(zip_path)):
+            if os.path.exists(path):
+                os.remove(path)
+    cases = [
+        ("parse_reports", lambda: hr.parse_reports(context), None),
+        ("parse_application_report", lambda: hr.parse_application_report(os.path.join(report_dir, "application_report.txt")), None),
+        ("parse_browser_report", lambda: hr.parse_browser_report(os.path.join(report_dir, "browser_report.txt")), None),
+        ("fold_journal", lambda: fold_journal(os.path.join(report_dir, JOURNAL_FILENAME), JournalSummary()), None),
+        ("charts_svg", svg_charts, None),
+    ]
+    try:
+        hr._load_pyplot()
+        cases.append(("charts_matplotlib", matplotlib_charts, clear_chart_cache))
+        cases.append(("charts_matplotlib_cached", matplotlib_charts, None))
+    except ImportError:
+        print("[WARNING] matplotlib not installed; skipping matplotlib chart cases.")
+    cases += [
+        ("generate_html_report", lambda: hr.generate_html_report(html_context, "svg"), None),
+        ("create_report_zip", lambda: hr.create_report_zip(report_dir, zip_path), clear_zip),
+        ("create_email_report_zip", lambda: hr.create_email_report_zip(report_dir, zip_path), clear_zip),
+    ]
+    return cases
+
+
+def run_benchmarks(scales, repeat, work_dir):
+    results = {}
+    for scale in scales:
+        day_root = os.path.join(work_dir, f"x{scale:g}")
+        report_dir = generate_day(day_root, scale=scale)
+        date_str = os.path.basename(os.path.dirname(report_dir))
+        size_mb = sum(os.path.getsize(os.path.join(report_dir, n)) for n in os.listdir(report_dir)) / 1024 / 1024
+        scratch_dir = os.path.join(work_dir, f"scratch-x{scale:g}")
+        os.makedirs(scratch_dir, exist_ok=True)
+        print(f"[+] Scale {scale:g}x: {size_mb:.1f} MB of synthetic reports")
+
+        results[f"{scale:g}"] = {}
+        for name, func, setup in _cases(report_dir, date_str, scratch_dir):
+            timing = _time(func, repeat, setup)
+            results[f"{scale:g}"][name] = timing
+            print(f"    {name:<28} min {timing['min'] * 1000:10.2f} ms   median {timing['median'] * 1000:10.2f} ms")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Returns the (scale, case, ratio) triples that regressed beyond threshold."""
+    regressions = []
+    for scale, cases in results.items():
+        for name, timing in cases.items():
+            base = baseline.get(scale, {}).get(name)
+            if base and base["median"] > 0:
+                ratio = timing["median"] / base["median"]
+                if ratio > threshold:
+                    regressions.append((scale, name, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the report pipeline on synthetic days.")
+    parser.add_argument("--scales", default="1,10,100", help="comma separated multiples of a normal day")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare against results written earlier with --json")
+    parser.add_argument("--threshold", type=float, default=1.25, help="allowed slowdown vs. baseline median")
+    parser.add_argument("--keep", action="store_true", help="keep the synthetic data directory")
+    args = parser.parse_args(argv)
+
+    logging.getLogger('html_report_logger').setLevel(logging.WARNING)
+    scales = [float(s) for s in args.scales.split(",") if s.strip()]
+    work_dir = tempfile.mkdtemp(prefix="cubiview-bench-")
+    try:
+        results = run_benchmarks(scales, args.repeat, work_dir)
+    finally:
+        if args.keep:
+            print(f"[+] Synthetic data kept in {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[+] Results written to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for scale, name, ratio in regressions:
+            print(f"[ERROR] {name} at {scale}x is {ratio:.2f}x slower than baseline")
+        if regressions:
+            return 1
+        print("[+] No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
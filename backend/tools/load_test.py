@@ -0,0 +1,217 @@
+"""
+File: tools/load_test.py
+
+Description:
+------------
+Local load test for the backend API. N client threads, each with its own keep-alive
+session, cycle through the main UI routes for --duration seconds. The tool then
+reports per-route request counts, errors and p50/p90/p99/max latency, plus overall
+throughput.
+
+    python tools/load_test.py --url http://127.0.0.1:8000
+
+drives a running backend (run_server.py). Without Windows/the full backend, --demo
+starts a stand-in app in a subprocess with the same routes under wsgi_server.serve
+(/api/config reads a JSON file, /api/status answers from memory, and
+/api/reports/preview waits --preview-delay seconds, like a preview that has to
+render). That way the serving modes can be compared on any machine. --demo also calls
+/shutdown at the end and reports how long the graceful stop took.
+
+Usage:
+------
+    python tools/load_test.py [--url URL | --demo waitress|dev] [--concurrency 8] [--duration 10]
+                              [--routes /api/config,/api/status,/api/reports/preview] [--json out.json]
+
+Functions Defined:
+------------------
+run_load()  -> {route: {"count", "errors", "p50", "p90", "p99", "max"}, "_total": {...}}
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+from time import perf_counter
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+DEFAULT_ROUTES = "/api/config,/api/status,/api/reports/preview"
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def run_load(base_url, routes, concurrency, duration, timeout=30):
+    latencies = {route: [] for route in routes}
+    errors = {route: 0 for route in routes}
+    lock = threading.Lock()
+    stop_at = perf_counter() + duration
+
+    def client(offset):
+        session = requests.Session()
+        i = offset
+        while perf_counter() < stop_at:
+            route = routes[i % len(routes)]
+            i += 1
+            start = perf_counter()
+            try:
+                ok = session.get(base_url + route, timeout=timeout).status_code < 500
+            except requests.RequestException:
+                ok = False
+            elapsed = perf_counter() - start
+            with lock:
+                latencies[route].append(elapsed)
+                if not ok:
+                    errors[route] += 1
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    started = perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = perf_counter() - started
+
+    results = {}
+    everything = []
+    for route in routes:
+        values = sorted(latencies[route])
+        everything.extend(values)
+        results[route] = {"count": len(values), "errors": errors[route], "p50": _percentile(values, 50),
+                          "p90": _percentile(values, 90), "p99": _percentile(values, 99),
+                          "max": values[-1] if values else 0.0}
+    everything.sort()
+    results["_total"] = {"count": len(everything), "errors": sum(errors.values()), "rps": len(everything) / wall,
+                         "p50": _percentile(everything, 50), "p99": _percentile(everything, 99)}
+    return results
+
+
+def _print_results(results):
+    print(f"    {'route':<26}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for route, r in results.items():
+        if route.startswith("_"):
+            continue
+        print(f"    {route:<26}{r['count']:>8}{r['errors']:>8}{r['p50'] * 1000:>10.1f}{r['p90'] * 1000:>10.1f}"
+              f"{r['p99'] * 1000:>10.1f}{r['max'] * 1000:>10.1f}")
+    total = results["_total"]
+    print(f"    total {total['count']} requests, {total['errors']} errors, {total['rps']:.1f} req/s, "
+          f"p50 {total['p50'] * 1000:.1f} ms, p99 {total['p99'] * 1000:.1f} ms")
+
+
+# --- stand-in backend ---------------------------------------------------------------
+
+def _demo_app(preview_delay):
+    from flask import Flask, jsonify
+    from wsgi_server import install_drain_hooks, request_shutdown
+
+    app = Flask("cubiview-load-test")
+    install_drain_hooks(app)
+    config_path = os.path.join(tempfile.mkdtemp(prefix="cubiview-load-"), "monitor_config.json")
+    with open(config_path, "w") as f:
+        json.dump({f"Feature {i}": i % 2 == 0 for i in range(40)}, f)
+
+    @app.route("/health")
+    def health():
+        return jsonify({"status": "healthy"})
+
+    @app.route("/api/config")
+    def config():
+        with open(config_path) as f:
+            return jsonify(json.load(f))
+
+    @app.route("/api/status")
+    def status():
+        return jsonify({"status": "running", "time": time.time()})
+
+    @app.route("/api/reports/preview")
+    def preview():
+        time.sleep(preview_delay)
+        return "<html><body>" + "report " * 2000 + "</body></html>"
+
+    @app.route("/shutdown", methods=["POST"])
+    def shutdown():
+        request_shutdown()
+        return jsonify({"message": "Server shutting down..."})
+
+    return app
+
+
+def _serve_demo(mode, port, preview_delay):
+    from wsgi_server import serve
+    serve(_demo_app(preview_delay), "127.0.0.1", port, mode=mode)
+    return 0
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _run_demo(args, routes):
+    port = _free_port()
+    child = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve-demo", args.demo, "--port", str(port),
+                              "--preview-delay", str(args.preview_delay)])
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                requests.get(base_url + "/health", timeout=1)
+                break
+            except requests.RequestException:
+                time.sleep(0.1)
+        results = run_load(base_url, routes, args.concurrency, args.duration)
+        start = perf_counter()
+        requests.post(base_url + "/shutdown", timeout=5)
+        child.wait(timeout=10)
+        results["_shutdown_seconds"] = perf_counter() - start
+        print(f"[+] /shutdown -> process exited with code {child.returncode} after {results['_shutdown_seconds']:.2f} s")
+        return results
+    finally:
+        if child.poll() is None:
+            child.kill()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the CubiView backend API.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--demo", choices=["waitress", "dev"], help="load a stand-in app served in this mode instead of --url")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--routes", default=DEFAULT_ROUTES, help="comma-separated GET routes")
+    parser.add_argument("--preview-delay", type=float, default=0.25, help="stand-in preview render time (seconds)")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--serve-demo", choices=["waitress", "dev"], help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve_demo:
+        return _serve_demo(args.serve_demo, args.port, args.preview_delay)
+
+    routes = [r.strip() for r in args.routes.split(",") if r.strip()]
+    target = f"stand-in app ({args.demo})" if args.demo else args.url
+    print(f"[+] {args.concurrency} clients for {args.duration:g} s against {target}")
+    results = _run_demo(args, routes) if args.demo else run_load(args.url.rstrip("/"), routes, args.concurrency, args.duration)
+    _print_results(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[+] Results written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""
+File: tools/stub_ingest_server.py
+
+Description:
+------------
+Local stand-in for the CubiView cloud ingest API, for exercising cloud_upload.py
+without the real server. Implements the resumable chunk protocol and the legacy
+multipart endpoint, and can inject the failures field machines see on bad networks:
+dropped connections, 503s, slow replies and chunks that are stored but whose
+acknowledgement is lost.
+
+Completed uploads are verified against their SHA-256 and written to --store.
+
+Usage:
+------
+    python tools/stub_ingest_server.py [--port 8765] [--store DIR] [--fail-rate 0.2] [--legacy-only]
+    set CUBIVIEW_CLOUD_URL=http://127.0.0.1:8765   (then trigger an upload from the app)
+
+Functions Defined:
+------------------
+serve() -> start the stub server in a background thread and return it
+"""
+
+import os
+import re
+import sys
+import json
+import uuid
+import random
+import shutil
+import hashlib
+import argparse
+import tempfile
+import threading
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+UPLOADS_PATH = "/api/device/report/uploads"
+LEGACY_PATH = "/api/device/report"
+CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+
+class IngestState:
+    def __init__(self, store_dir, fail_rate=0.0, legacy_only=False, seed=None):
+        self.store_dir = store_dir
+        self.fail_rate = fail_rate
+        self.legacy_only = legacy_only
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.uploads = {}           # upload id -> {"path", "size", "sha256", "offset", "filename", "systemId"}
+        self.completed = []
+        self.stats = {"chunks": 0, "failures_injected": 0, "legacy_uploads": 0}
+
+    def should_fail(self):
+        with self.lock:
+            hit = self.fail_rate and self.random.random() < self.fail_rate
+            if hit:
+                self.stats["failures_injected"] += 1
+            return hit
+
+
+class IngestHandler(BaseHTTPRequestHandler):
+    state = None                    # set by serve()
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def _drop(self):
+        # Simulates a network drop: no reply, connection closed.
+        self.close_connection = True
+        self.connection.shutdown(2)
+
+    def _upload(self, upload_id):
+        return self.state.uploads.get(upload_id)
+
+    def do_POST(self):
+        state = self.state
+        if self.path == LEGACY_PATH:
+            return self._legacy_upload()
+        if state.legacy_only or not self.path.startswith(UPLOADS_PATH):
+            self._read_body()
+            return self._json(404, {"error": "not found"})
+
+        body = json.loads(self._read_body() or b"{}")
+        if self.path == UPLOADS_PATH:
+            if state.should_fail():
+                return self._json(503, {"error": "injected failure"})
+            with state.lock:
+                upload = self._upload(body.get("uploadId"))
+                if not upload or upload["sha256"] != body.get("sha256"):
+                    upload_id = uuid.uuid4().hex
+                    upload = {"id": upload_id, "path": os.path.join(state.store_dir, upload_id + ".part"),
+                              "size": body["size"], "sha256": body["sha256"], "offset": 0,
+                              "filename": body.get("filename"), "systemId": body.get("systemId")}
+                    open(upload["path"], "wb").close()
+                    state.uploads[upload_id] = upload
+            return self._json(201, {"uploadId": upload["id"], "offset": upload["offset"]})
+
+        match = re.fullmatch(re.escape(UPLOADS_PATH) + r"/(\w+)/complete", self.path)
+        upload = self._upload(match.group(1)) if match else None
+        if not upload:
+            return self._json(404, {"error": "unknown upload"})
+        if upload["offset"] != upload["size"]:
+            return self._json(409, {"offset": upload["offset"]})
+        digest = hashlib.sha256()
+        with open(upload["path"], "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        if digest.hexdigest() != upload["sha256"]:
+            upload["offset"] = 0
+            open(upload["path"], "wb").close()
+            return self._json(409, {"offset": 0, "error": "checksum mismatch"})
+        final = os.path.join(state.store_dir, upload["filename"] or upload["id"] + ".zip")
+        os.replace(upload["path"], final)
+        with state.lock:
+            state.completed.append(final)
+            state.uploads.pop(upload["id"], None)
+        return self._json(200, {"success": True, "message": "Report received", "file": os.path.basename(final)})
+
+    def do_GET(self):
+        match = re.fullmatch(re.escape(UPLOADS_PATH) + r"/(\w+)", self.path)
+        upload = self._upload(match.group(1)) if match and not self.state.legacy_only else None
+        if not upload:
+            return self._json(404, {"error": "unknown upload"})
+        return self._json(200, {"offset": upload["offset"], "size": upload["size"]})
+
+    def do_PUT(self):
+        state = self.state
+        match = re.fullmatch(re.escape(UPLOADS_PATH) + r"/(\w+)", self.path)
+        upload = self._upload(match.group(1)) if match and not state.legacy_only else None
+        if not upload:
+            self._read_body()
+            return self._json(404, {"error": "unknown upload"})
+
+        failure = state.should_fail() and state.random.choice(["drop_before", "drop_after", "503"])
+        if failure == "drop_before":
+            return self._drop()
+        chunk = self._read_body()
+        if failure == "503":
+            return self._json(503, {"error": "injected failure"})
+
+        start, end, total = map(int, CONTENT_RANGE.fullmatch(self.headers.get("Content-Range", "")).groups())
+        if hashlib.sha256(chunk).hexdigest() != self.headers.get("X-Chunk-SHA256") or len(chunk) != end - start + 1:
+            return self._json(400, {"error": "chunk checksum mismatch"})
+        with state.lock:
+            if start != upload["offset"]:
+                return self._json(409, {"offset": upload["offset"]})
+            with open(upload["path"], "r+b") as f:
+                f.seek(start)
+                f.write(chunk)
+            upload["offset"] = end + 1
+            state.stats["chunks"] += 1
+        if failure == "drop_after":
+            return self._drop()     # chunk stored, acknowledgement lost
+        return self._json(200, {"offset": upload["offset"]})
+
+    def _legacy_upload(self):
+        state = self.state
+        body = self._read_body()
+        if state.should_fail():
+            return self._json(503, {"error": "injected failure"})
+        message = BytesParser(policy=default_policy).parsebytes(
+            b"Content-Type: " + self.headers["Content-Type"].encode() + b"\r\n\r\n" + body)
+        for part in message.iter_parts():
+            if part.get_param("name", header="content-disposition") == "reportZip":
+                final = os.path.join(state.store_dir, part.get_filename())
+                with open(final, "wb") as f:
+                    f.write(part.get_payload(decode=True))
+                with state.lock:
+                    state.completed.append(final)
+                    state.stats["legacy_uploads"] += 1
+                return self._json(200, {"success": True, "message": "Report received", "file": part.get_filename()})
+        return self._json(400, {"error": "reportZip missing"})
+
+
+def serve(port=0, store_dir=None, fail_rate=0.0, legacy_only=False, seed=None):
+    """Starts the stub in a daemon thread. Returns (server, state); the URL is http://127.0.0.1:<server.server_port>."""
+    store_dir = store_dir or tempfile.mkdtemp(prefix="cubiview-ingest-")
+    os.makedirs(store_dir, exist_ok=True)
+    state = IngestState(store_dir, fail_rate, legacy_only, seed)
+    handler = type("BoundIngestHandler", (IngestHandler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stub CubiView ingest server for upload tests.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--store", help="directory for received archives (default: temp dir)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="probability of an injected failure per request")
+    parser.add_argument("--legacy-only", action="store_true", help="only offer the multipart endpoint")
+    args = parser.parse_args(argv)
+
+    server, state = serve(args.port, args.store, args.fail_rate, args.legacy_only)
+    print(f"[+] Stub ingest server on http://127.0.0.1:{server.server_port}, storing in {state.store_dir}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"[+] Stopped. Received: {state.completed}  Stats: {state.stats}")
+        if not args.store:
+            shutil.rmtree(state.store_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""
+File: tools/synth_workload.py
+
+Description:
+------------
+Synthesises realistic report day directories for benchmarking the report pipeline
+without the Windows trackers.
+
+The files mirror what the trackers write through write_report(): the same line
+formats, 70-column wrapping, timestamp prefixes and hourly cumulative dumps
+(application_report.txt is rewritten every hour, browser/activity/keystroke/click
+reports are appended to). An events.jsonl journal with the matching typed records is
+written alongside, as report_writer does.
+
+Usage:
+------
+    python tools/synth_workload.py OUT_DIR [--scale 10] [--hours 9] [--titles 200] [--urls 300] [--seed 1]
+
+Functions Defined:
+------------------
+generate_day() -> write one synthetic <date>/<user> directory and return its path
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+import textwrap
+from datetime import datetime, timedelta
+
+# Events per hour of a normal working day at scale 1.0
+BASE_RATES = {
+    "app_switches": 70,
+    "url_switches": 45,
+    "clicks": 350,
+    "keystrokes": 2500,
+    "installs": 0.5,
+}
+PROCESSES = ["chrome.exe", "msedge.exe", "firefox.exe", "Code.exe", "EXCEL.EXE", "WINWORD.EXE",
+             "OUTLOOK.EXE", "Teams.exe", "explorer.exe", "slack.exe", "notepad.exe", "AcroRd32.exe"]
+BROWSERS = ["chrome.exe", "msedge.exe", "firefox.exe"]
+INSTALLERS = ["setup.exe", "installer.exe", "msiexec.exe", "vlc-3.0.20-win64.exe", "ChromeSetup.exe"]
+TIMESTAMP_FORMAT = "[%Y-%m-%d %H:%M:%S]"
+
+
+class DayWriter:
+    """Writes report files the way ReportWriter._write_entry formats them."""
+
+    def __init__(self, report_dir):
+        self.report_dir = report_dir
+        os.makedirs(report_dir, exist_ok=True)
+
+    def write(self, base_filename, content, when, title=None, with_timestamp=True, mode='a'):
+        path = os.path.join(self.report_dir, f"{base_filename}.txt")
+        with open(path, mode, encoding="utf-8") as f:
+            if mode == 'w' and title:
+                f.write(f"{title}\n{'=' * 50}\n")
+            prefix = f"{when.strftime(TIMESTAMP_FORMAT)} " if with_timestamp else ""
+            for item in content if isinstance(content, list) else [content]:
+                for line in textwrap.wrap(item, width=70):
+                    f.write(f"{prefix}{line}\n")
+
+
+def _titles(rng, count):
+    words = ["Quarterly", "Report", "Budget", "Invoice", "Meeting", "Notes", "Design", "Review", "Sprint",
+             "Plan", "Draft", "Final", "Customer", "Inbox", "Roadmap", "Summary", "Proposal", "Data"]
+    return [f"{' '.join(rng.sample(words, rng.randint(2, 5)))} {i}" for i in range(count)]
+
+
+def _urls(rng, count):
+    hosts = ["docs.google.com", "mail.google.com", "github.com", "stackoverflow.com", "www.youtube.com",
+             "portal.office.com", "jira.example.com", "confluence.example.com", "news.ycombinator.com"]
+    return [f"https://{rng.choice(hosts)}/{'/'.join(str(rng.randint(1, 99999)) for _ in range(rng.randint(1, 4)))}?id={i}"
+            for i in range(count)]
+
+
+def generate_day(out_dir, scale=1.0, hours=9, titles=200, urls=300, seed=1, user="benchuser",
+                 date=None, journal=True):
+    """
+    Writes one synthetic day for one user and returns the directory path.
+
+    :param scale: Multiplier applied to BASE_RATES (1 = a normal day).
+    :param hours: Length of the tracked day in hours.
+    :param titles: Number of distinct window titles (application cardinality).
+    :param urls: Number of distinct URLs (browser cardinality).
+    :param journal: Also write the typed events.jsonl journal.
+    """
+    rng = random.Random(seed)
+    date = date or datetime(2026, 1, 5)
+    report_dir = os.path.join(out_dir, date.strftime("%d-%m-%Y"), user)
+    writer = DayWriter(report_dir)
+    title_pool = _titles(rng, titles)
+    url_pool = _urls(rng, urls)
+    journal_file = open(os.path.join(report_dir, "events.jsonl"), "w", encoding="utf-8") if journal else None
+
+    def event(ts, record_type, **fields):
+        if journal_file:
+            record = {"v": 1, "ts": round(ts.timestamp(), 3), "type": record_type, "session": "bench", **fields}
+            journal_file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    start = date.replace(hour=9)
+    activities, browsing, clicks = [], [], []
+    active = idle = keystrokes = words = 0
+
+    try:
+        for hour in range(hours):
+            hour_start = start + timedelta(hours=hour)
+
+            for _ in range(int(BASE_RATES["app_switches"] * scale)):
+                ts = hour_start + timedelta(seconds=rng.uniform(0, 3600))
+                entry = {"process": rng.choice(PROCESSES), "title": rng.choice(title_pool), "duration": rng.expovariate(1 / 45)}
+                activities.append(entry)
+                event(ts, "app_usage", process=entry["process"], title=entry["title"], duration=round(entry["duration"], 2))
+
+            for _ in range(int(BASE_RATES["url_switches"] * scale)):
+                ts = hour_start + timedelta(seconds=rng.uniform(0, 3600))
+                entry = {"process": rng.choice(BROWSERS), "url": rng.choice(url_pool), "duration": rng.expovariate(1 / 60)}
+                browsing.append(entry)
+                event(ts, "browser_usage", process=entry["process"], url=entry["url"], duration=round(entry["duration"], 2))
+
+            for _ in range(int(BASE_RATES["clicks"] * scale)):
+                ts = hour_start + timedelta(seconds=rng.uniform(0, 3600))
+                clicks.append((ts, rng.choice(["Button.left", "Button.right"]), (rng.randint(0, 1919), rng.randint(0, 1079))))
+
+            for _ in range(rng.randint(0, max(1, int(BASE_RATES["installs"] * scale * 2)))):
+                ts = hour_start + timedelta(seconds=rng.uniform(0, 3600))
+                installer = rng.choice(INSTALLERS)
+                writer.write("install-uninstall", f"[BLOCKED] Unauthorized installer detected and terminated: {installer}",
+                             ts, title="Install_Uninstall Reports")
+                event(ts, "install", action="blocked", process=installer)
+
+            hour_active = rng.randint(2400, 3500)
+            active += hour_active
+            idle += 3600 - hour_active
+            keystrokes += int(BASE_RATES["keystrokes"] * scale)
+            words = keystrokes // 6
+
+            # The :05 hourly job dumps every tracker's cumulative state.
+            dump_at = hour_start + timedelta(hours=1, minutes=5)
+            writer.write("application_report", [
+                f"Process: {e['process']}, Title: {e['title']}, Duration: {e['duration']:.2f} seconds" for e in activities
+            ], dump_at, title="Application Usage Report", mode='w')
+            writer.write("browser_report", [
+                f"Process: {e['process']}, URL: {e['url']}, Duration: {e['duration']:.2f} seconds" for e in browsing
+            ], dump_at, title="Browser Usage Report")
+            writer.write("activity_report", [
+                f"Total Time   : {active + idle} seconds",
+                f"Working Time : {active} seconds",
+                f"Idle Time    : {idle} seconds",
+            ], dump_at, title="--- Active vs Idle Time Report ---", with_timestamp=False)
+            writer.write("keystroke_report", [
+                "",
+                f"Total Keystrokes: {keystrokes}",
+                f"Total Words Typed (rough estimate): {words}",
+            ], dump_at, title="Keystroke Counter Report", with_timestamp=False)
+            click_lines = [f"Date        : {date.strftime('%Y-%m-%d')}", f"Total Clicks: {len(clicks)}", "=" * 50 + "\n"]
+            click_lines += [f"[{ts.strftime('%Y-%m-%d %H:%M:%S')}] {button} click at {pos}" for ts, button, pos in clicks]
+            writer.write("mouse_click_report", click_lines, dump_at, title="Mouse Click Report", with_timestamp=False)
+
+            event(dump_at, "activity", active=active, idle=idle)
+            event(dump_at, "keystrokes", keystrokes=keystrokes, words=words)
+            event(dump_at, "clicks", clicks=len(clicks))
+    finally:
+        if journal_file:
+            journal_file.close()
+    return report_dir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic report day directory.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--scale", type=float, default=1.0, help="event rate multiplier (1 = normal day)")
+    parser.add_argument("--hours", type=int, default=9, help="tracked hours in the day")
+    parser.add_argument("--titles", type=int, default=200, help="distinct window titles")
+    parser.add_argument("--urls", type=int, default=300, help="distinct URLs")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--user", default="benchuser")
+    parser.add_argument("--no-journal", action="store_true", help="skip events.jsonl")
+    args = parser.parse_args(argv)
+
+    path = generate_day(args.out_dir, scale=args.scale, hours=args.hours, titles=args.titles, urls=args.urls,
+                        seed=args.seed, user=args.user, journal=not args.no_journal)
+    total = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    print(f"[+] Synthetic day written to {path} ({total / 1024 / 1024:.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,13 @@
 import os
 from datetime import datetime
 from typing import List, Union
-import zipfile
 from PIL import Image
-import textwrap
 import getpass
+import atexit
 
 from credentials import REPORT_DIR, SMTP_CREDENTIALS_FILE
+from report_writer import get_report_writer, close_report_writer
+from report_packager import package_report
 
 def write_report(directory: str,
                  base_filename: str,
@@ -18,6 +19,10 @@ def write_report(directory: str,
     """
     Universal report writer that creates/updates a report file.
 
+    The entry is handed to the background report writer (see report_writer.py), which
+    keeps the day's files open and commits entries in batches. Call flush_reports()
+    before reading the files back in the same process.
+
     :param directory: Base folder (e.g., "logs"). Reports will be grouped into date-based subfolders.
     :param base_filename: File base name (e.g., "install-uninstall", "mouse_click_report").
     :param content: A string or list of strings to write to the file.
@@ -26,44 +31,30 @@ def write_report(directory: str,
     :param mode: 'a' to append or 'w' to overwrite the file.
     :param wrap_width: Maximum characters per line before wrapping.
     """
+    get_report_writer().submit(directory, base_filename, content, title=title,
+                               with_timestamp=with_timestamp, mode=mode, wrap_width=wrap_width)
+
+
+def flush_reports(timeout=None):
+    """Blocks until every report entry queued so far has been written to disk."""
+    return get_report_writer().flush(timeout)
+
+
+def close_reports():
+    """Flushes and closes the background report writer (used at shutdown)."""
+    close_report_writer()
 
-    user = getpass.getuser()
-    date_str = datetime.now().strftime("%d-%m-%Y")
-    user_directory = os.path.join(directory, date_str, user)
-    os.makedirs(user_directory, exist_ok=True)
-
-    full_filename = f"{base_filename}.txt"
-    filepath = os.path.join(user_directory, full_filename)
-
-    timestamp_format = "[%Y-%m-%d %H:%M:%S]"
-
-    with open(filepath, mode, encoding="utf-8") as f:
-        if mode == 'w' and title:
-            f.write(f"{title}\n{'=' * 50}\n")
-
-        if isinstance(content, list):
-            for entry in content:
-                wrapped_lines = textwrap.wrap(entry, width=wrap_width)
-                for line in wrapped_lines:
-                    if with_timestamp:
-                        f.write(f"{datetime.now().strftime(timestamp_format)} {line}\n")
-                    else:
-                        f.write(f"{line}\n")
-        else:
-            wrapped_lines = textwrap.wrap(content, width=wrap_width)
-            for line in wrapped_lines:
-                if with_timestamp:
-                    f.write(f"{datetime.now().strftime(timestamp_format)} {line}\n")
-                else:
-                    f.write(f"{line}\n")
 
-    print(f"[+] Report saved to {filepath}")
+atexit.register(close_reports)
 
 
 ############### Create a Folder for Daily reports and Zip it ###########################
 
 
 def zip_folder():
+    # Make sure everything queued by the trackers is on disk before zipping
+    flush_reports()
+
     # Step 1: Build today's dated folder path
     user = getpass.getuser()
     today_str = datetime.now().strftime("%d-%m-%Y")
@@ -95,27 +86,14 @@ def zip_folder():
     else:
         print("[!] Screenshots folder not found. Skipping PDF generation.")
 
-    # Step 3: Delete existing ZIP if it exists
-    if os.path.exists(zip_path):
-        try:
-            os.remove(zip_path)
-            print(f"[+] Existing zip deleted: {zip_path}")
-        except Exception as e:
-            print(f"Error deleting existing zip file {zip_path}: {e}")
-            return None
-
-    # Step 4: Create zip archive
+    # Step 3: Package the e-mail attachment (no screenshots/recordings, kept under the
+    # attachment budget; unchanged files are not recompressed)
     try:
-        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-            for root, _, files in os.walk(folder_path):
-                # Skip the Screenshots folder
-                if any(excluded in os.path.relpath(root, folder_path) for excluded in ["Screenshots", "captured_clips"]):
-                    continue
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, folder_path)
-                    zipf.write(file_path, arcname)
-        print(f"[+] Zipped folder saved to: {zip_path}")
+        package = package_report(folder_path, zip_path, "email")
+        print(f"[+] Zipped folder saved to: {zip_path} ({package['size']} bytes, {len(package['members'])} files, "
+              f"{len(package['dropped'])} dropped / {len(package['downscaled'])} downscaled to fit)")
+        if not package["within_budget"]:
+            print(f"[WARNING] {zip_path} is over the {package['budget']} byte attachment budget")
         return zip_path
     except Exception as e:
         print(f"Error creating zip archive: {e}")
@@ -124,44 +102,31 @@ def zip_folder():
 
 #################  Send Email #######################
 
-import smtplib
-import ssl
-from email.message import EmailMessage
 from tkinter import messagebox
+from smtp_mailer import send_mail
 
 def send_email_with_zip(from_addr, password, to_addr, subject, body, attachment_path, cc_list=None,
                         smtp_server_add="smtp.gmail.com", smtp_port_add =465):
+    """
+    Sends an e-mail with an optional zip attachment (see smtp_mailer.py): the attachment
+    is streamed from disk, split across several messages if it is over the size limit,
+    and the SMTP session is reused by later sends.
+
+    :returns: (success, message)
+    """
     try:
-        msg = EmailMessage()
-        msg["From"] = from_addr
-        msg["To"] = to_addr
-        msg["Subject"] = subject
-        msg.set_content(body)
-
-        # Handle CC if any
-        if cc_list:
-            msg["Cc"] = ", ".join(cc_list)
-
-        # Attach ZIP file if it exists
-        if attachment_path and os.path.exists(attachment_path):
-            with open(attachment_path, "rb") as f:
-                file_data = f.read()
-                file_name = os.path.basename(attachment_path)
-            msg.add_attachment(file_data, maintype="application", subtype="zip", filename=file_name)
-        elif attachment_path:
+        # A missing ZIP is reported but does not stop the e-mail
+        if attachment_path and not os.path.exists(attachment_path):
             print(f"Attachment Missing: ZIP file not found: {attachment_path}. Email will be sent without attachment.")
+            attachment_path = None
 
-        # Combine all recipients
-        all_recipients = [to_addr] + (cc_list if cc_list else [])
-
-        # Connect to custom SMTP
-        context = ssl.create_default_context()
-        with smtplib.SMTP_SSL(smtp_server_add, smtp_port_add, context=context) as server:
-            server.login(from_addr, password)
-            server.send_message(msg, to_addrs=all_recipients)
+        messages = send_mail(from_addr, password, to_addr, subject, body, attachment_path=attachment_path,
+                             cc_list=cc_list, smtp_server=smtp_server_add or "smtp.gmail.com",
+                             smtp_port=int(smtp_port_add or 465))
 
-        print(f"Email sent successfully to {to_addr}" + (f" and CC: {', '.join(cc_list)}" if cc_list else ""))
-        return True, "Email sent successfully."
+        print(f"Email sent successfully to {to_addr}" + (f" and CC: {', '.join(cc_list)}" if cc_list else "")
+              + (f" in {messages} parts" if messages > 1 else ""))
+        return True, "Email sent successfully." if messages == 1 else f"Email sent successfully in {messages} parts."
     except Exception as e:
         print(f"Failed to send email: {e}")
         return False, f"Failed to send email: {e}"
@@ -0,0 +1,172 @@
+"""
+File: wsgi_server.py
+
+Description:
+------------
+Serving modes for the Flask backend and their graceful shutdown.
+
+    waitress  (default) production WSGI server: a fixed pool of worker threads behind
+              an async I/O loop, so a slow route (report preview, generation) ties up
+              one worker while the other routes keep answering
+    dev       Werkzeug development server, threaded, without the reloader/debugger
+              (the reloader starts a second process, which breaks the PyInstaller
+              build)
+
+Settings come from the environment:
+
+    CUBIVIEW_SERVER              waitress | dev
+    CUBIVIEW_SERVER_THREADS      worker threads (default 8)
+    CUBIVIEW_SERVER_CONNECTIONS  open connections accepted at once (default 100)
+    CUBIVIEW_SERVER_TIMEOUT      seconds an idle keep-alive connection is kept (default 120)
+
+Graceful shutdown (request_shutdown(), called by /shutdown): new requests get a 503,
+requests already running get up to GRACEFUL_TIMEOUT seconds to finish, then the
+server stops and serve() returns, so atexit handlers (report writer flush) run.
+
+Functions Defined:
+------------------
+install_drain_hooks()  -> count in-flight requests and refuse new ones while draining
+serve()                -> run an app with the configured server until shut down
+request_shutdown()     -> drain and stop the running server (non-blocking)
+"""
+
+import os
+import time
+import logging
+import threading
+
+from flask import jsonify, request
+
+SERVER_MODE = os.environ.get("CUBIVIEW_SERVER", "waitress").strip().lower()
+SERVER_THREADS = int(os.environ.get("CUBIVIEW_SERVER_THREADS", 8))
+SERVER_CONNECTIONS = int(os.environ.get("CUBIVIEW_SERVER_CONNECTIONS", 100))
+SERVER_TIMEOUT = int(os.environ.get("CUBIVIEW_SERVER_TIMEOUT", 120))
+GRACEFUL_TIMEOUT = 4.0                # Electron kills the process 5 s after calling /shutdown
+ALWAYS_ALLOWED = ("/health", "/shutdown")
+
+wsgi_server_logger = logging.getLogger('wsgi_server_logger')
+
+
+class _ServerState:
+    def __init__(self):
+        self.lock = threading.Condition()
+        self.in_flight = 0
+        self.draining = False
+        self.stop = threading.Event()
+        self.stopper = None           # callable that makes the running server return
+
+
+_state = _ServerState()
+
+
+def install_drain_hooks(app):
+    """Tracks requests in flight; while draining, answers new ones with 503."""
+
+    @app.before_request
+    def _drain_before_request():
+        if _state.draining and request.path not in ALWAYS_ALLOWED:
+            response = jsonify({"error": "Server is shutting down"})
+            response.status_code = 503
+            return response
+        with _state.lock:
+            _state.in_flight += 1
+        request.environ["cubiview.counted"] = True
+
+    @app.teardown_request
+    def _drain_teardown_request(exc):
+        if request.environ.pop("cubiview.counted", False):
+            with _state.lock:
+                _state.in_flight -= 1
+                _state.lock.notify_all()
+
+
+def _drain_and_stop(timeout):
+    deadline = time.monotonic() + timeout
+    with _state.lock:
+        # The /shutdown request itself is counted until its handler has returned.
+        _state.lock.wait_for(lambda: _state.in_flight <= 0, max(0.0, deadline - time.monotonic()))
+        left = _state.in_flight
+    if left:
+        wsgi_server_logger.warning(f"Stopping with {left} request(s) still running after {timeout}s")
+    _state.stop.set()
+    if _state.stopper:
+        _state.stopper()
+
+
+def request_shutdown(timeout=GRACEFUL_TIMEOUT):
+    """Starts draining and stops the server in the background. Returns False if already stopping."""
+    with _state.lock:
+        if _state.draining:
+            return False
+        _state.draining = True
+    threading.Thread(target=_drain_and_stop, args=(timeout,), name="ServerShutdown", daemon=True).start()
+    return True
+
+
+def _serve_waitress(app, host, port, threads, connections, channel_timeout):
+    from waitress.server import create_server
+
+    server = create_server(app, host=host, port=port, threads=threads, connection_limit=connections,
+                           channel_timeout=channel_timeout, ident="CubiView")
+    _state.stopper = server.pull_trigger              # wakes the I/O loop so it sees the stop flag
+    print(f"[+] Serving on http://{host}:{port} with waitress ({threads} threads, {connections} connections)")
+    # server.run() only returns on KeyboardInterrupt (server.close() from another thread
+    # leaves keep-alive channels turning the loop); drive the loop ourselves so the stop
+    # flag can end it from /shutdown. This uses waitress internals (_map, asyncore,
+    # task_dispatcher), which is why requirements.txt pins the waitress version.
+    try:
+        while not _state.stop.is_set():
+            server.asyncore.loop(timeout=1.0, map=server._map, use_poll=server.adj.asyncore_use_poll, count=1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Responses are written by the I/O loop: keep it turning until what the workers
+        # produced (e.g. the /shutdown reply) has gone out. New connections are still
+        # accepted meanwhile, but only get a 503.
+        deadline = time.monotonic() + 1.0
+        while time.monotonic() < deadline and any(
+                getattr(channel, "total_outbufs_len", 0) or getattr(channel, "requests", None)
+                for channel in list(server._map.values())):
+            server.asyncore.loop(timeout=0.05, map=server._map, use_poll=server.adj.asyncore_use_poll, count=1)
+        server.task_dispatcher.shutdown(cancel_pending=True, timeout=1.0)
+        # Closes the listening socket and the trigger the workers wake the loop with.
+        server.close()
+        for channel in list(server._map.values()):
+            channel.close()
+
+
+def _serve_dev(app, host, port):
+    from werkzeug.serving import make_server
+
+    server = make_server(host, port, app, threaded=True)
+    _state.stopper = server.shutdown
+    print(f"[+] Serving on http://{host}:{port} with the Werkzeug development server")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def serve(app, host, port, mode=None, threads=None, connections=None, channel_timeout=None):
+    """
+    Serves app until request_shutdown() (or Ctrl+C). Falls back to the dev server if
+    waitress is not installed.
+    """
+    mode = mode or SERVER_MODE
+    if mode == "waitress":
+        try:
+            import waitress  # noqa: F401
+        except ImportError:
+            print("[WARNING] waitress is not installed; using the Werkzeug development server.")
+            mode = "dev"
+    _state.stop.clear()
+    with _state.lock:
+        _state.draining = False
+    if mode == "waitress":
+        _serve_waitress(app, host, port, threads or SERVER_THREADS, connections or SERVER_CONNECTIONS,
+                        channel_timeout or SERVER_TIMEOUT)
+    else:
+        _serve_dev(app, host, port)
+    wsgi_server_logger.info("Server stopped.")
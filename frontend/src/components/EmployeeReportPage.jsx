@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { FileText, RefreshCw, ExternalLink, Calendar, User, AlertCircle, CheckCircle, AlertTriangle, Info, Mail, Send } from 'lucide-react';
+import { waitForOperation } from '../operations';
 
 const EmployeeReportPage = ({ apiBaseUrl }) => {
   const [reportHtml, setReportHtml] = useState('');
@@ -9,12 +10,16 @@ const EmployeeReportPage = ({ apiBaseUrl }) => {
   const [isSendingEmail, setIsSendingEmail] = useState(false);
   const [reportDate, setReportDate] = useState(null);
   const [hasReportData, setHasReportData] = useState(false);
+  // Days with several users have one report per user; the preview shows one of them.
+  const [reportUsers, setReportUsers] = useState([]);
+  const [selectedUser, setSelectedUser] = useState('');
 
-  const fetchReport = async () => {
+  const fetchReport = async (user = '') => {
     setIsLoading(true);
     setMessage('');
     try {
-      const metadataResponse = await fetch(`${apiBaseUrl}/reports/daily-html`);
+      const userQuery = user ? `?user=${encodeURIComponent(user)}` : '';
+      const metadataResponse = await fetch(`${apiBaseUrl}/reports/daily-html${userQuery}`);
       if (!metadataResponse.ok) {
         throw new Error('Failed to get report metadata.');
       }
@@ -24,7 +29,17 @@ const EmployeeReportPage = ({ apiBaseUrl }) => {
         setReportDate(metadata.report_date);
         setHasReportData(metadata.has_data);
 
-        const previewResponse = await fetch(`${apiBaseUrl}/reports/preview`);
+        let previewUser = user;
+        if (!user) {
+          // The day index only links to the per-user reports, so preview the first user instead.
+          const users = metadata.users ? Object.keys(metadata.users) : [];
+          setReportUsers(users);
+          previewUser = users.length > 1 ? users[0] : (metadata.user || '');
+          setSelectedUser(previewUser);
+        }
+
+        const previewQuery = previewUser && previewUser !== metadata.user ? `?user=${encodeURIComponent(previewUser)}` : userQuery;
+        const previewResponse = await fetch(`${apiBaseUrl}/reports/preview${previewQuery}`);
         if (!previewResponse.ok) {
           throw new Error('Failed to fetch report HTML preview.');
         }
@@ -53,27 +68,48 @@ const EmployeeReportPage = ({ apiBaseUrl }) => {
     }
   };
 
+  // Polls a report job until it finishes and returns its result.
+  const waitForReportJob = async (jobId) => {
+    while (true) {
+      const response = await fetch(`${apiBaseUrl}/reports/jobs/${jobId}`);
+      const job = await response.json();
+      if (!response.ok) {
+        throw new Error(job.message || 'Failed to fetch report job status');
+      }
+      if (job.status === 'completed' || job.status === 'failed') {
+        return job.result || { status: 'error', message: job.error };
+      }
+      setMessage(`${job.stage || 'Generating report'}... (${job.progress || 0}%)`);
+      setMessageType('success');
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+    }
+  };
+
   const generateReport = async () => {
     setIsLoading(true);
     setMessage('');
     try {
       const response = await fetch(`${apiBaseUrl}/reports/generate`, { method: 'POST' });
-      console.log(response)
-      const data = await response.json();
+      const job = await response.json();
+      console.log('Report generation job:', job);
+      if (!response.ok || !job.job_id) {
+        throw new Error(job.message || 'Failed to start report generation');
+      }
+      const data = await waitForReportJob(job.job_id);
       console.log('Report generation response:', data);
 
-      if (response.ok && data.status === 'success') {
+      if (data.status === 'success') {
         setReportDate(data.report_date);
         setHasReportData(data.has_data);
 
         if (data.has_data) {
-          setMessage(data.message || 'Report generation initiated. Please wait a moment and refresh.');
+          setMessage(data.message || 'Report generated successfully.');
           setMessageType('success');
         } else {
           setMessage('Report generated, but no activity data was found for today. Please ensure monitoring is active.');
           setMessageType('warning');
         }
-        setTimeout(fetchReport, 1500);
+        fetchReport();
       } else {
         throw new Error(data.message || 'Failed to generate report');
       }
@@ -93,7 +129,8 @@ const EmployeeReportPage = ({ apiBaseUrl }) => {
 
   const openFullReportInBrowser = () => {
     if (reportDate) {
-      const reportUrl = `${apiBaseUrl}/reports/view_dated/${reportDate}/CubiView_Summary_Report.html`;
+      const userPath = selectedUser ? `${encodeURIComponent(selectedUser)}/` : '';
+      const reportUrl = `${apiBaseUrl}/reports/view_dated/${reportDate}/${userPath}CubiView_Summary_Report.html`;
       window.open(reportUrl, '_blank');
     } else {
       setMessage('Please generate a report first to open it in a new browser tab.');
@@ -112,10 +149,13 @@ const EmployeeReportPage = ({ apiBaseUrl }) => {
         }
       });
       
-      const data = await response.json();
+      const data = await waitForOperation(apiBaseUrl, await response.json());
       console.log('Email send response:', data);
 
-      if (response.ok && data.success) {
+      if (response.ok && data.queued) {
+        setMessage(data.message);
+        setMessageType('info');
+      } else if (response.ok && data.success) {
         setMessage(`Report sent successfully to ${data.recipients?.to}${data.recipients?.cc?.length > 0 ? ` and CC: ${data.recipients.cc.join(', ')}` : ''}`);
         setMessageType('success');
       } else {
@@ -232,6 +272,21 @@ const EmployeeReportPage = ({ apiBaseUrl }) => {
                 <FileText className="h-5 w-5 text-white" />
               </div>
               <h2 className="text-xl font-semibold text-gray-800">Report Preview</h2>
+              {reportUsers.length > 1 && (
+                <select
+                  className="ml-auto px-3 py-2 border border-gray-300 rounded-lg bg-white text-sm text-gray-700"
+                  value={selectedUser}
+                  onChange={(e) => {
+                    setSelectedUser(e.target.value);
+                    fetchReport(e.target.value);
+                  }}
+                  disabled={isLoading || isSendingEmail}
+                >
+                  {reportUsers.map((user) => (
+                    <option key={user} value={user}>{user}</option>
+                  ))}
+                </select>
+              )}
             </div>
           </div>
           
@@ -20,6 +20,7 @@ import {
 } from 'lucide-react';
 import ConfirmationDialog from './ConfirmationDialog';
 import VpnAuthDialog from './VpnAuthDialog';
+import { waitForOperation } from '../operations';
 
 const featureMapping = {
   "VPN Detection & Blocking": {
@@ -191,7 +192,8 @@ const LimitDevicePage = ({ apiBaseUrl }) => {
               body: JSON.stringify({ confirmed: true }),
             });
             
-            const data = await response.json();
+            // Closing the browsers runs in the background; wait for the operation to finish
+            const data = await waitForOperation(apiBaseUrl, await response.json());
             if (!response.ok || !data.success) {
               throw new Error(data.message || `Failed to ${action} ${featureKey}`);
             }
@@ -290,7 +292,7 @@ const LimitDevicePage = ({ apiBaseUrl }) => {
         body: JSON.stringify({ confirmed: true }),
       });
       
-      const data = await response.json();
+      const data = await waitForOperation(apiBaseUrl, await response.json());
       if (!response.ok || !data.success) {
         throw new Error(data.message || `Failed to ${action} VPN Detection & Blocking`);
       }
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { Mail, Server, Info, Eye, EyeOff, Loader2, Save } from 'lucide-react';
+import { waitForOperation } from '../operations';
 
 const SmtpConfigPage = ({ apiBaseUrl }) => {
   const [config, setConfig] = useState({
@@ -111,7 +112,7 @@ const SmtpConfigPage = ({ apiBaseUrl }) => {
             smtp_port: config.smtp_port,
           }),
         });
-        const testEmailData = await testEmailResponse.json();
+        const testEmailData = await waitForOperation(apiBaseUrl, await testEmailResponse.json());
 
         if (testEmailResponse.ok && testEmailData.success) {
           setMessage(prev => prev + ' Test email sent successfully!');
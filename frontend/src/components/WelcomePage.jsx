@@ -13,6 +13,7 @@ import {
   Activity,
   Settings
 } from 'lucide-react';
+import { waitForOperation } from '../operations';
 
 const WelcomePage = ({ systemId, activationKey, userInfo, apiBaseUrl }) => {
   const [currentActivationKey, setCurrentActivationKey] = useState(activationKey);
@@ -177,7 +178,7 @@ const WelcomePage = ({ systemId, activationKey, userInfo, apiBaseUrl }) => {
         body: JSON.stringify({ version: remoteVersion }),
       });
 
-      const data = await response.json();
+      const data = await waitForOperation(apiBaseUrl, await response.json());
       if (response.ok && data.updated_files) { // Property name changed
         setMessage(data.message || `Updated to v${remoteVersion} successfully!`);
         setMessageType('success');
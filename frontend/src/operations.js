@@ -0,0 +1,20 @@
+// Slow backend actions (closing browsers, VPN monitoring, updates, e-mail) answer 202 with
+// an operation id. waitForOperation polls /operations/<id> until the work has finished and
+// resolves with its result, so callers can treat it like the old synchronous response.
+// Responses without an operation id (validation errors, 503) are returned unchanged.
+export const waitForOperation = async (apiBaseUrl, data, intervalMs = 1000) => {
+  if (!data || !data.operation_id) {
+    return data;
+  }
+  while (true) {
+    const response = await fetch(`${apiBaseUrl}/operations/${data.operation_id}`);
+    const operation = await response.json();
+    if (!response.ok) {
+      throw new Error(operation.message || 'Failed to fetch operation status');
+    }
+    if (operation.status === 'completed' || operation.status === 'failed') {
+      return operation.result || { success: false, message: operation.error };
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+};